@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, send_file, Response
+from flask import Flask, Request, request, jsonify, send_file, Response, g
 from flask_cors import CORS
 import os
 import json
@@ -9,19 +9,57 @@ import shutil
 import uuid
 import threading
 import zipfile
+import random
+import io
+import cProfile
+import pstats
+import gzip
+import hashlib
 from pathlib import Path
 from werkzeug.utils import secure_filename
 from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.http import parse_content_range_header
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
-from correction_engine import CorrectionEngine
+try:
+    import brotli
+except ImportError:  # Optional; compressed responses fall back to gzip
+    brotli = None
+
+from correction_engine import CorrectionEngine, TaskCancelled
+from engine_oracle import shadow_verify
+from engine_registry import registry as engine_registry, AUTO_ENGINE
+from tracing import tracer
+from metrics import registry as metrics_registry
+from dictionary_index import TermIndex, TERM_FIELD, SEARCH_FIELDS, DEFAULT_MIN_SIMILARITY
+from dictionary_sync import ChangeLog, SortedView
+from dictionary_analyzer import analyze_dictionary
+from term_stats import TermStats
+from job_queue import JobQueue, HELD, QUEUED, RUNNING, COMPLETED, CANCELLED
+from scheduler import TaskScheduler, estimate_cost, client_identity, is_interactive
+from archives import (ArchiveReader, ArchiveError, GzipRequestBody, archive_format, scan_archive,
+                      member_filename, DECODED_BODY_KEY, ARCHIVE_MAX_TOTAL_SIZE)
+from upload_sessions import (UploadSession, UploadOffsetError, UploadChecksumError, UPLOAD_SESSION_TIMEOUT,
+                             UPLOAD_POLL_INTERVAL, UPLOAD_MAX_FILES, UPLOAD_MAX_FILE_SIZE, live_upload_files)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+class UploadRequest(Request):
+    """Request whose gzip-encoded body is limited by its decoded size instead of MAX_CONTENT_LENGTH."""
+
+    @property
+    def max_content_length(self):
+        if self.environ.get(DECODED_BODY_KEY):
+            # The compressed body was already held to MAX_CONTENT_LENGTH by GzipRequestBody
+            return ARCHIVE_MAX_TOTAL_SIZE
+        return super().max_content_length
+
 app = Flask(__name__)
+app.request_class = UploadRequest
 app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1)  # For proper IP behind proxy
 # Enable CORS for all routes with specific origins for development
 CORS(app, resources={r"/api/*": {"origins": ["http://localhost:5173", "http://127.0.0.1:5173"]}})
@@ -40,15 +78,30 @@ ALLOWED_EXTENSIONS = {'srt'}
 PROTECTION_DICT_FILE = os.path.join(os.path.dirname(__file__), 'dictionaries', 'protection_dict.json')
 CORRECTION_DICT_FILE = os.path.join(os.path.dirname(__file__), 'dictionaries', 'correction_dict.json')
 TASKS_FILE = os.path.join(os.path.dirname(__file__), 'dictionaries', 'tasks.json')
+DICTIONARY_VERSION_FILE = os.path.join(os.path.dirname(__file__), 'dictionaries', 'dictionary.version')
+TERM_STATS_FILE = os.path.join(os.path.dirname(__file__), 'dictionaries', 'term_stats.db')
+JOB_QUEUE_FILE = os.path.join(os.path.dirname(__file__), 'dictionaries', 'jobs.db')
 MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB max upload size
 FILE_CLEANUP_THRESHOLD = 3600  # Clean up files older than 1 hour
+PENDING_TASK_STATUSES = ('receiving', 'queued', 'processing')  # Tasks whose files are kept regardless of age
 TASK_CLEANUP_THRESHOLD = 86400  # Clean up tasks older than 24 hours
+DEFAULT_ENGINE = os.environ.get('CORRECTION_ENGINE', 'reference')  # Engine used when a request does not choose one
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))  # Fraction of tasks captured with cProfile
+# 'thread' processes tasks inside the web workers; 'queue' only enqueues them for correction_worker.py
+TASK_BACKEND = os.environ.get('TASK_BACKEND', 'thread')
+# Default processing time budget of a task in seconds; 0 means unlimited. Requests may ask for less.
+TASK_TIME_BUDGET = float(os.environ.get('TASK_TIME_BUDGET', '0'))
+PROFILE_STATS_LIMIT = 40  # Number of functions kept in a profile report
+TASK_STAGES = ('upload', 'extract', 'read', 'validate', 'protection', 'compile', 'match', 'write', 'stats', 'verify', 'persist')
+COMPRESS_MIN_BYTES = 1024  # Smaller responses are sent uncompressed
 
 # Security settings
 DICTIONARY_PIN = "1324"  # Default PIN for dictionary modifications
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
+# Uploads may be sent with Content-Encoding: gzip; decoded as the form is parsed
+app.wsgi_app = GzipRequestBody(app.wsgi_app, MAX_FILE_SIZE)
 app.config['JSON_AS_ASCII'] = False  # For proper UTF-8 encoding in responses
 
 # Ensure directories exist
@@ -58,15 +111,225 @@ os.makedirs(os.path.dirname(TASKS_FILE), exist_ok=True)
 # Initialize the correction engine
 correction_engine = CorrectionEngine(
     correction_dict_file=CORRECTION_DICT_FILE,
-    protection_dict_file=PROTECTION_DICT_FILE
+    protection_dict_file=PROTECTION_DICT_FILE,
+    version_file=DICTIONARY_VERSION_FILE
 )
+# Hits per term across all tasks, shared by the workers through SQLite
+correction_engine.term_stats = TermStats(TERM_STATS_FILE)
+# With gunicorn --preload this runs once in the master and the workers inherit a warm engine
+correction_engine.warm_up()
+
+# Search indexes over the dictionaries, kept in sync with the engine's current snapshot
+dictionary_indexes = {'correction': TermIndex(), 'protection': TermIndex()}
+
+def get_dictionary_index(dict_type):
+    """Get the search index of a dictionary, brought up to date with the engine."""
+    index = dictionary_indexes[dict_type]
+    index.sync(correction_engine.correction_dict if dict_type == 'correction' else correction_engine.protection_dict)
+    return index
+
+for _dict_type in dictionary_indexes:
+    get_dictionary_index(_dict_type)
+
+# Change history and sorted listings served by the dictionary GET endpoints
+dictionary_changelogs = {'correction': ChangeLog(), 'protection': ChangeLog()}
+dictionary_views = {'correction': SortedView(), 'protection': SortedView()}
+# Encoded full-dictionary responses, reused until the dictionary is replaced
+dictionary_response_cache = {}
+# Last dictionary analysis, reused until either dictionary is replaced
+dictionary_analysis_cache = {}
+analysis_lock = threading.Lock()
+
+def current_dictionary(dict_type):
+    """Get a dictionary with its version, recording any changes for delta requests."""
+    snapshot = correction_engine.snapshot
+    dictionary = snapshot.correction_dict if dict_type == 'correction' else snapshot.protection_dict
+    dictionary_changelogs[dict_type].sync(dictionary, snapshot.version)
+    return dictionary, snapshot.version
+
+for _dict_type in dictionary_changelogs:
+    current_dictionary(_dict_type)
+
+if DEFAULT_ENGINE != AUTO_ENGINE and DEFAULT_ENGINE not in engine_registry.names():
+    logger.warning(f"Unknown CORRECTION_ENGINE '{DEFAULT_ENGINE}', falling back to the reference engine")
+    DEFAULT_ENGINE = 'reference'
+
+def trace_file_path(task_id):
+    """Path of the dumped trace of a task; kept next to uploads so it is cleaned up with them."""
+    return os.path.join(UPLOAD_FOLDER, f"{secure_filename(task_id)}_trace.json")
+
+def cancel_file_path(task_id):
+    """Path of the marker requesting cancellation of a task; any process running the task sees it."""
+    return os.path.join(UPLOAD_FOLDER, f"{secure_filename(task_id)}_cancel")
+
+def profile_file_path(task_id):
+    """Path of the cProfile report of a task."""
+    return os.path.join(UPLOAD_FOLDER, f"{secure_filename(task_id)}_profile.txt")
+
+# Only one task is profiled at a time; cProfile adds overhead to the whole thread
+profile_lock = threading.Lock()
+
+def start_profile():
+    """Start a cProfile capture for the current thread, or return None if another capture is running."""
+    if not profile_lock.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        profile_lock.release()
+        logger.warning(f"Could not start profiler: {str(e)}")
+        return None
+    return profiler
+
+def finish_profile(profiler, task_id):
+    """Stop a cProfile capture and write the report for the task."""
+    try:
+        profiler.disable()
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(PROFILE_STATS_LIMIT)
+        with open(profile_file_path(task_id), 'w', encoding='utf-8') as f:
+            f.write(stream.getvalue())
+        return True
+    except Exception as e:
+        logger.error(f"Error saving profile for task {task_id}: {str(e)}")
+        return False
+    finally:
+        profile_lock.release()
+
+def get_engine(name):
+    """Get a registered engine bound to the shared dictionaries."""
+    return engine_registry.get(name or 'reference', correction_engine)
+
+# A non-reference default engine is warmed up before forking as well
+if DEFAULT_ENGINE not in (AUTO_ENGINE, 'reference') and hasattr(get_engine(DEFAULT_ENGINE), 'warm_up'):
+    get_engine(DEFAULT_ENGINE).warm_up()
+
+# Metrics exposed at /api/metrics, aggregated across workers
+REQUEST_LATENCY = metrics_registry.histogram(
+    'lumon_http_request_duration_seconds', 'HTTP request latency by route', ['route', 'method', 'status'])
+TASK_QUEUE_DEPTH = metrics_registry.gauge('lumon_task_queue_depth', 'Tasks waiting to be processed')
+ACTIVE_TASKS = metrics_registry.gauge('lumon_active_tasks', 'Tasks currently being processed')
+FILES_PROCESSED = metrics_registry.counter('lumon_files_processed_total', 'Files processed', ['engine', 'status'])
+CUES_PROCESSED = metrics_registry.counter('lumon_cues_processed_total', 'Subtitle cues processed', ['engine'])
+CUE_THROUGHPUT = metrics_registry.histogram(
+    'lumon_file_cues_per_second', 'Per-file correction throughput in cues per second', ['engine'],
+    buckets=(10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000))
+REPLACEMENTS = metrics_registry.counter('lumon_replacements_total', 'Replacements applied', ['engine'])
+COMPILE_TIME = metrics_registry.histogram(
+    'lumon_matcher_compile_seconds', 'Time spent compiling the matcher per file', ['engine'])
+STAGE_TIME = metrics_registry.counter('lumon_stage_seconds_total', 'Time spent per processing stage', ['stage'])
+CACHE_REQUESTS = metrics_registry.counter('lumon_cache_requests_total', 'Cache lookups', ['cache', 'result'])
+metrics_registry.ratio('lumon_cache_hit_ratio', 'Cache hit ratio over all workers', CACHE_REQUESTS)
+TASK_STORE_FLUSH = metrics_registry.histogram('lumon_task_store_flush_seconds', 'Time to write the task store')
+
+def record_file_metrics(result):
+    """Record the metrics of a processed file result."""
+    engine_name = result.get('engine', 'reference')
+    if 'error' in result:
+        FILES_PROCESSED.inc(engine=engine_name, status='error')
+        return
+    FILES_PROCESSED.inc(engine=engine_name, status='completed')
+    REPLACEMENTS.inc(result.get('total_replacements', 0), engine=engine_name)
+    cue_count = result.get('cue_count', 0)
+    CUES_PROCESSED.inc(cue_count, engine=engine_name)
+    if result.get('processing_time'):
+        CUE_THROUGHPUT.observe(cue_count / result['processing_time'], engine=engine_name)
+    if 'matcher_cache' in result:
+        CACHE_REQUESTS.inc(cache='matcher', result=result['matcher_cache'])
+    timings = result.get('timings', {})
+    if 'compile' in timings:
+        COMPILE_TIME.observe(timings['compile'], engine=engine_name)
+    for stage, duration in timings.items():
+        STAGE_TIME.inc(duration, stage=stage)
 
 # Store processing tasks
 processing_tasks = {}
 
+# Durable queue feeding the correction workers when TASK_BACKEND is 'queue'
+job_queue = JobQueue(JOB_QUEUE_FILE)
+if TASK_BACKEND == 'queue':
+    # Jobs are enqueued and claimed by different processes, so count them in the queue itself
+    TASK_QUEUE_DEPTH.set_function(lambda: job_queue.counts().get(QUEUED, 0))
+
+# Order in which this process runs its tasks when TASK_BACKEND is 'thread'
+task_scheduler = TaskScheduler()
+
+def job_task(task_id):
+    """Get the task of a queued job as published by its worker, or None if there is no such job."""
+    job = job_queue.get(task_id)
+    if job is None:
+        return None
+    task = job['state'] or task_snapshot(job['payload'])
+    task['attempts'] = job['attempts']
+    task['scheduling'] = job['payload'].get('scheduling')
+    task['upload'] = job['payload'].get('upload', False)
+    if job['status'] == HELD:
+        # A resumable upload none of whose files is complete yet
+        task['status'] = 'receiving'
+    elif job['status'] == QUEUED:
+        # Waiting for a worker, possibly to retry after a failed attempt
+        task['status'] = 'queued'
+        task['progress'] = 0
+        task['estimate'] = job_queue.estimate(task_id)
+        if job['error']:
+            task['last_error'] = job['error']
+    elif job['status'] == RUNNING:
+        task['status'] = 'processing'
+    elif job['status'] == COMPLETED:
+        task['status'] = task.get('status') if task.get('status') in ('completed', 'error') else 'completed'
+    elif job['status'] == CANCELLED:
+        # Cancelled by its worker, or while it was still queued
+        task['status'] = 'cancelled'
+        task.setdefault('cancel_reason', 'requested')
+    else:
+        task['status'] = 'error'
+        task['error'] = job['error'] or task.get('error', '')
+    return task
+
 # Functions for persistent task storage
+def task_snapshot(task):
+    """Get the storable part of a task: status, timings and results, but no file paths."""
+    snapshot = {
+        'status': task.get('status', 'unknown'),
+        'progress': task.get('progress', 0),
+        'created_at': task.get('created_at', 0),
+        'completed_at': task.get('completed_at', 0),
+        'error': task.get('error', ''),
+        'file_count': task.get('file_count', 0),
+        'files_processed': task.get('files_processed', 0),
+        'engine': task.get('engine', 'reference')
+    }
+
+    # Add stage timings and profile link if available
+    for key in ('timings', 'queue_wait', 'profile_url', 'time_budget', 'cancel_reason'):
+        if key in task:
+            snapshot[key] = task[key]
+
+    # Add results if available
+    if 'results' in task and task['results']:
+        snapshot['results'] = task['results']
+    elif 'result' in task:
+        snapshot['result'] = task['result']
+
+    # Add statistics if available
+    if 'statistics' in task:
+        snapshot['statistics'] = task['statistics']
+
+    # Add file info if available (but exclude file paths for security)
+    if 'file_info' in task and task['file_info']:
+        file_info = []
+        for info in task['file_info']:
+            file_info.append({
+                'original_filename': info.get('original_filename', ''),
+                'output_path': os.path.basename(info.get('output_path', ''))
+            })
+        snapshot['file_info'] = file_info
+    return snapshot
+
 def save_tasks_to_file():
     """Save tasks to a JSON file for persistence."""
+    flush_start = time.time()
     try:
         # Create a copy of the tasks with only the essential data
         tasks_to_save = {}
@@ -76,35 +339,7 @@ def save_tasks_to_file():
                 continue
 
             # Create a simplified version of the task for storage
-            tasks_to_save[task_id] = {
-                'status': task.get('status', 'unknown'),
-                'progress': task.get('progress', 0),
-                'created_at': task.get('created_at', 0),
-                'completed_at': task.get('completed_at', 0),
-                'error': task.get('error', ''),
-                'file_count': task.get('file_count', 0),
-                'files_processed': task.get('files_processed', 0)
-            }
-
-            # Add results if available
-            if 'results' in task and task['results']:
-                tasks_to_save[task_id]['results'] = task['results']
-            elif 'result' in task:
-                tasks_to_save[task_id]['result'] = task['result']
-
-            # Add statistics if available
-            if 'statistics' in task:
-                tasks_to_save[task_id]['statistics'] = task['statistics']
-
-            # Add file info if available (but exclude file paths for security)
-            if 'file_info' in task and task['file_info']:
-                file_info = []
-                for info in task['file_info']:
-                    file_info.append({
-                        'original_filename': info.get('original_filename', ''),
-                        'output_path': os.path.basename(info.get('output_path', ''))
-                    })
-                tasks_to_save[task_id]['file_info'] = file_info
+            tasks_to_save[task_id] = task_snapshot(task)
 
         # Save to file
         with open(TASKS_FILE, 'w', encoding='utf-8') as f:
@@ -115,6 +350,8 @@ def save_tasks_to_file():
     except Exception as e:
         logger.error(f"Error saving tasks to file: {str(e)}")
         return False
+    finally:
+        TASK_STORE_FLUSH.observe(time.time() - flush_start)
 
 def load_tasks_from_file():
     """Load tasks from JSON file."""
@@ -153,14 +390,61 @@ def allowed_file(filename):
     """Check if a filename has an allowed extension."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def archive_file_info(archive_path, fmt, filename):
+    """
+    Describe the SRT members of an uploaded archive as files of a task.
+
+    Args:
+        archive_path (str): The saved archive
+        fmt (str): Format from archive_format()
+        filename (str): Uploaded name of the archive
+
+    Returns:
+        list: File info entries; each member is extracted to its file_path when processed
+
+    Raises:
+        ArchiveError: If the archive is corrupt or over the extraction limits
+    """
+    file_info = []
+    for member, size in scan_archive(archive_path, fmt, filename):
+        original_filename = member_filename(member)
+        unique_filename = generate_unique_filename(secure_filename(original_filename))
+        output_filename = f"{os.path.splitext(unique_filename)[0]}_corrected.srt"
+        file_info.append({
+            'original_filename': original_filename,
+            'file_path': os.path.join(UPLOAD_FOLDER, unique_filename),
+            'output_path': os.path.join(UPLOAD_FOLDER, output_filename),
+            'archive': archive_path,
+            'archive_format': fmt,
+            'member': member,
+            'size': size
+        })
+    return file_info
+
+def pending_task_files():
+    """Paths of the input and output files (and archives) of tasks that have not finished yet."""
+    tasks = [task for task in list(processing_tasks.values()) if task.get('status') in PENDING_TASK_STATUSES]
+    if TASK_BACKEND == 'queue':
+        tasks.extend(job_queue.pending_payloads())
+    paths = set()
+    for task in tasks:
+        for info in task.get('file_info', []):
+            # Archive members are only extracted right before they are corrected
+            for key in ('file_path', 'output_path', 'archive'):
+                if info.get(key):
+                    paths.add(os.path.abspath(info[key]))
+    return paths
+
 def cleanup_old_files():
-    """Clean up old temporary files."""
+    """Clean up old temporary files, except those of tasks still queued or running."""
     now = time.time()
     count = 0
     try:
+        # A task may wait in the queue, and an upload keep coming in, for longer than the threshold
+        keep = pending_task_files() | live_upload_files(UPLOAD_FOLDER)
         for filename in os.listdir(UPLOAD_FOLDER):
             file_path = os.path.join(UPLOAD_FOLDER, filename)
-            if os.path.isfile(file_path):
+            if os.path.isfile(file_path) and os.path.abspath(file_path) not in keep:
                 # If file is older than threshold, delete it
                 if now - os.path.getmtime(file_path) > FILE_CLEANUP_THRESHOLD:
                     os.remove(file_path)
@@ -174,6 +458,104 @@ def generate_unique_filename(original_filename):
     base, ext = os.path.splitext(original_filename)
     return f"{base}_{uuid.uuid4().hex[:8]}{ext}"
 
+def negotiate_encoding():
+    """Pick the response encoding from Accept-Encoding: brotli if available, then gzip."""
+    accepted = request.headers.get('Accept-Encoding', '').lower()
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+def encoded_json_response(body, bodies=None, etag=None):
+    """
+    Build a JSON response with a weak ETag, answering If-None-Match with 304 and
+    compressing bodies above COMPRESS_MIN_BYTES. Encoded bodies are memoized in `bodies`.
+    """
+    etag = etag or hashlib.sha1(body).hexdigest()
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        encoding = negotiate_encoding() if len(body) >= COMPRESS_MIN_BYTES else None
+        bodies = bodies if bodies is not None else {}
+        if encoding not in bodies:
+            if encoding == 'br':
+                bodies[encoding] = brotli.compress(body, quality=5)
+            elif encoding == 'gzip':
+                bodies[encoding] = gzip.compress(body, compresslevel=6)
+            else:
+                bodies[encoding] = body
+        response = Response(bodies[encoding], mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag, weak=True)
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+def dictionary_get_response(dict_type):
+    """
+    Serve a dictionary: whole (default), as a sorted page (sort/limit/offset), or as the
+    changes since a version (since).
+    """
+    dictionary, version = current_dictionary(dict_type)
+    args = request.args
+
+    if 'since' in args:
+        try:
+            since = int(args['since'])
+        except ValueError:
+            return jsonify({"error": "Invalid since version"}), 400
+        delta = dictionary_changelogs[dict_type].since(since) if since <= version else None
+        if delta is None:
+            # The change log does not reach back that far; the client replaces its copy
+            payload = {"version": version, "since": since, "full": True, "upserted": dictionary, "deleted": []}
+        else:
+            upserted, deleted = delta
+            payload = {"version": version, "since": since, "full": False, "upserted": upserted, "deleted": deleted}
+        response = encoded_json_response(app.json.dumps(payload).encode('utf-8'))
+    elif any(name in args for name in ('limit', 'offset', 'sort')):
+        try:
+            limit = int(args['limit']) if args.get('limit') else None
+            offset = int(args.get('offset') or 0)
+        except ValueError:
+            return jsonify({"error": "Invalid limit or offset"}), 400
+        if (limit is not None and limit < 0) or offset < 0:
+            return jsonify({"error": "Invalid limit or offset"}), 400
+        sort = args.get('sort') or 'order'
+        try:
+            entries = dictionary_views[dict_type].page(dictionary, sort, limit, offset)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        payload = {"version": version, "total": len(dictionary), "limit": limit, "offset": offset,
+                   "sort": sort, "entries": entries}
+        response = encoded_json_response(app.json.dumps(payload).encode('utf-8'))
+    else:
+        cached = dictionary_response_cache.get(dict_type)
+        if cached is None or cached['source'] is not dictionary:
+            body = app.json.dumps(dictionary).encode('utf-8')
+            cached = {"source": dictionary, "etag": hashlib.sha1(body).hexdigest(), "bodies": {None: body}}
+            dictionary_response_cache[dict_type] = cached
+        response = encoded_json_response(cached['bodies'][None], cached['bodies'], cached['etag'])
+
+    response.headers['X-Dictionary-Version'] = str(version)
+    return response
+
+def parse_bool_param(value):
+    """Interpret a form or query parameter as a boolean flag."""
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+def verify_processed_file(file_path, output_path, result):
+    """Run the reference engine in shadow mode against an already processed file."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        with open(output_path, 'r', encoding='utf-8') as f:
+            corrected_content = f.read()
+        return shadow_verify(content, corrected_content, result.get('replacements', {}), correction_engine)
+    except Exception as e:
+        logger.error(f"Error verifying file {file_path}: {str(e)}")
+        return {"error": str(e)}
+
 # Task processing
 def process_file_task(task_id, file_path, output_path):
     """Background task to process a single file."""
@@ -220,35 +602,143 @@ def process_file_task(task_id, file_path, output_path):
         # Save error status to file
         save_tasks_to_file()
 
-def process_multiple_files_task(task_id):
-    """Background task to process multiple files."""
+def process_multiple_files_task(task_id, persist=None, pause=None, resume=None):
+    """
+    Background task to process multiple files.
+
+    persist, when given, replaces saving the task store, e.g. for a correction
+    worker publishing the task state to the job queue.
+
+    Files of a resumable upload are processed as they complete. While none is
+    ready the task waits, calling pause() first and resume() once a file is ready
+    again, so the scheduler can run other tasks in the meantime.
+    """
+    profiler = None
+    active = False
+    stage_timings = dict.fromkeys(TASK_STAGES, 0.0)
+    archives = {}  # Open readers of the task's archives, by path
+
+    def persist_tasks():
+        # Save tasks to file, accounting the time to the persist stage
+        persist_start = time.time()
+        (persist or save_tasks_to_file)()
+        stage_timings['persist'] += time.time() - persist_start
+
+    def check_cancelled():
+        # Called between files and, through the progress callbacks, between chunks
+        if os.path.exists(cancel_file_path(task_id)):
+            raise TaskCancelled('requested')
+        # Time spent waiting for uploads is not charged to the budget
+        if task.get('time_budget') and time.time() - start_time - stage_timings['upload'] > task['time_budget']:
+            raise TaskCancelled('time_budget')
+
+    def next_file(pending):
+        # The first pending file ready for processing, waiting for uploads still in progress
+        waiting = False
+        last = time.time()
+
+        def account_wait():
+            # Waiting for the upload, and for a slot afterwards, counts as upload time
+            nonlocal last
+            now = time.time()
+            stage_timings['upload'] += now - last
+            last = now
+
+        while True:
+            if waiting:
+                account_wait()
+            for item in pending:
+                if not item[1].get('upload') or os.path.exists(item[1]['file_path']):
+                    pending.remove(item)
+                    if waiting:
+                        if resume is not None and not resume():
+                            raise TaskCancelled('requested')
+                        account_wait()
+                        task['status'] = 'processing'
+                    return item
+            check_cancelled()
+            if UploadSession(UPLOAD_FOLDER, task_id).idle_seconds() > UPLOAD_SESSION_TIMEOUT:
+                raise TaskCancelled('upload_expired')
+            if not waiting:
+                waiting = True
+                task['status'] = 'receiving'
+                persist_tasks()
+                if pause is not None:
+                    pause()
+            time.sleep(UPLOAD_POLL_INTERVAL)
+
+    def finish_task(status):
+        # Final status and statistics over the files processed
+        elapsed_time = time.time() - start_time
+        task['status'] = status
+        if status == 'completed':
+            task['progress'] = 100
+        task['completed_at'] = time.time()
+        task['processing_time'] = elapsed_time
+
+        # Add statistics
+        task['statistics'] = {
+            'totalFiles': len(task['file_info']),
+            'filesProcessed': task['files_processed'],
+            'totalCorrections': task['total_replacements'],
+            'processingTime': elapsed_time,
+            'engine': task.get('engine', 'reference'),
+            'queueWait': task['queue_wait'],
+            'timings': stage_timings
+        }
+        if task.get('verify'):
+            task['statistics']['verifiedFiles'] = task.get('verified_files', 0)
+            task['statistics']['verificationMismatches'] = task.get('verification_mismatches', 0)
+        return elapsed_time
+
     try:
         # Update task status
         task = processing_tasks[task_id]
+        ACTIVE_TASKS.inc()
+        active = True
         task['status'] = 'processing'
         task['results'] = []
         task['total_replacements'] = 0
+        start_time = time.time()
+        task['timings'] = stage_timings
+        task['queue_wait'] = start_time - task.get('created_at', start_time)
 
         # Save initial task status to file
-        save_tasks_to_file()
+        persist_tasks()
 
         file_info_list = task['file_info']
         total_files = len(file_info_list)
 
-        logger.info(f"Starting processing for task {task_id} with {total_files} files")
-        start_time = time.time()
+        # Cancelled while waiting in the queue
+        check_cancelled()
+
+        # Pick up dictionaries saved by other workers (reloaded in the background)
+        correction_engine.check_for_updates()
+        engine = get_engine(task.get('engine'))
 
-        # Process each file
-        for i, file_info in enumerate(file_info_list):
+        logger.info(f"Starting processing for task {task_id} with {total_files} files using engine '{task.get('engine', 'reference')}'")
+
+        if task.get('trace'):
+            tracer.start(task_id)
+        if task.get('profile'):
+            profiler = start_profile()
+
+        # Process each file; those of an upload in the order they complete
+        pending = list(enumerate(file_info_list))
+        while pending:
+            i, file_info = next_file(pending)
             file_path = file_info['file_path']
             output_path = file_info['output_path']
             original_filename = file_info['original_filename']
 
+            check_cancelled()
+
             # Update progress for overall task
-            base_progress = (i / total_files) * 100
+            base_progress = ((total_files - len(pending) - 1) / total_files) * 100
 
             # Define progress callback for this file
             def file_progress_callback(percent):
+                check_cancelled()
                 # Calculate overall progress: base progress + (file progress / total files)
                 overall_progress = base_progress + (percent / total_files)
                 task['progress'] = overall_progress
@@ -257,17 +747,47 @@ def process_multiple_files_task(task_id):
                     task['last_logged_progress'] = overall_progress
                     logger.info(f"Task {task_id} overall progress: {overall_progress:.2f}% (File {i+1}/{total_files})")
                     # Save progress to file every 5%
-                    save_tasks_to_file()
+                    persist_tasks()
 
             # Process the file
             logger.info(f"Processing file {i+1}/{total_files}: {original_filename}")
+            trace = tracer.current()
+            if trace is not None:
+                trace.event('file', "%d/%d %s", i + 1, total_files, original_filename)
             try:
-                result = correction_engine.process_file(file_path, output_path, file_progress_callback)
+                # Time this file spent waiting behind the task queue and earlier files
+                result_queue_wait = time.time() - task.get('created_at', start_time)
+                if 'member' in file_info:
+                    # Extracted right before it is corrected, so archives are never expanded as a whole
+                    extract_start = time.time()
+                    reader = archives.get(file_info['archive'])
+                    if reader is None:
+                        reader = archives[file_info['archive']] = ArchiveReader(file_info['archive'],
+                                                                                file_info['archive_format'])
+                    reader.extract(file_info['member'], file_path)
+                    stage_timings['extract'] += time.time() - extract_start
+                result = engine.process_file(file_path, output_path, file_progress_callback)
+                result['engine'] = task.get('engine', 'reference')
+                result['queue_wait'] = result_queue_wait
+                result['original_filename'] = original_filename
+                for stage, duration in result.get('timings', {}).items():
+                    stage_timings[stage] = stage_timings.get(stage, 0.0) + duration
+                record_file_metrics(result)
 
                 # Add download URL to result
                 output_filename = os.path.basename(output_path)
                 result['download_url'] = f"/api/download/{output_filename}"
 
+                # Compare against the reference engine in shadow mode if requested
+                if task.get('verify') and 'error' not in result:
+                    verify_start = time.time()
+                    result['verification'] = verify_processed_file(file_path, output_path, result)
+                    stage_timings['verify'] += time.time() - verify_start
+                    if result['verification'].get('identical'):
+                        task['verified_files'] = task.get('verified_files', 0) + 1
+                    else:
+                        task['verification_mismatches'] = task.get('verification_mismatches', 0) + 1
+
                 # Add to results
                 task['results'].append(result)
                 task['total_replacements'] += result.get('total_replacements', 0)
@@ -275,9 +795,12 @@ def process_multiple_files_task(task_id):
 
                 logger.info(f"Processed file {i+1}/{total_files}: {original_filename} with {result.get('total_replacements', 0)} replacements")
                 # Save progress after each file
-                save_tasks_to_file()
+                persist_tasks()
+            except TaskCancelled:
+                raise
             except Exception as e:
                 logger.error(f"Error processing file {original_filename}: {str(e)}")
+                FILES_PROCESSED.inc(engine=task.get('engine', 'reference'), status='error')
                 # Add error result
                 task['results'].append({
                     'original_filename': original_filename,
@@ -285,28 +808,29 @@ def process_multiple_files_task(task_id):
                     'status': 'error'
                 })
                 # Save error status to file
-                save_tasks_to_file()
+                persist_tasks()
 
-        # Update task with final results
-        elapsed_time = time.time() - start_time
-        task['status'] = 'completed'
-        task['progress'] = 100
-        task['completed_at'] = time.time()
-        task['processing_time'] = elapsed_time
+        if profiler is not None:
+            finish_profile(profiler, task_id)
+            profiler = None
+            task['profile_url'] = f"/api/tasks/{task_id}/profile"
 
-        # Add statistics
-        task['statistics'] = {
-            'totalFiles': total_files,
-            'filesProcessed': task['files_processed'],
-            'totalCorrections': task['total_replacements'],
-            'processingTime': elapsed_time
-        }
+        # Update task with final results
+        elapsed_time = finish_task('completed')
 
         logger.info(f"Task {task_id} completed in {elapsed_time:.2f} seconds")
         logger.info(f"Processed {total_files} files with {task['total_replacements']} total replacements")
 
         # Save completed task to file
-        save_tasks_to_file()
+        persist_tasks()
+
+    except TaskCancelled as e:
+        # Keep the results of the files finished before the cancellation
+        task['cancel_reason'] = e.reason
+        elapsed_time = finish_task('cancelled')
+        logger.info(f"Task {task_id} cancelled ({e.reason}) after {elapsed_time:.2f} seconds, "
+                    f"{task['files_processed']}/{len(task['file_info'])} files processed")
+        persist_tasks()
 
     except Exception as e:
         logger.error(f"Error in multi-file task {task_id}: {str(e)}")
@@ -315,7 +839,109 @@ def process_multiple_files_task(task_id):
         processing_tasks[task_id]['completed_at'] = time.time()
 
         # Save error status to file
+        persist_tasks()
+    finally:
+        if active:
+            ACTIVE_TASKS.dec()
+            for stage in ('extract', 'verify', 'persist'):
+                STAGE_TIME.inc(stage_timings[stage], stage=stage)
+        if profiler is not None:
+            finish_profile(profiler, task_id)
+        for reader in archives.values():
+            reader.close()
+
+        # Dump the trace so that any worker can serve it
+        trace = tracer.stop()
+        if trace is not None:
+            tracer.save(trace, trace_file_path(task_id))
+
+        # A cancellation that arrived after the task finished has nothing left to stop
+        try:
+            os.remove(cancel_file_path(task_id))
+        except OSError:
+            pass
+
+def wait_for_turn(task_id, wait):
+    """Wait for a slot through task_scheduler.acquire or .resume; False if the task was cancelled."""
+    # Wait in short rounds, so a cancellation received by another worker process withdraws the task
+    while not wait(task_id, timeout=1.0):
+        if os.path.exists(cancel_file_path(task_id)) or task_id not in processing_tasks:
+            task_scheduler.release(task_id)
+            return False
+    return True
+
+def wait_for_upload(task_id):
+    """
+    Wait until the first file of a resumable upload is complete.
+
+    Returns:
+        str: None once a file is complete, else why the task ends ('requested' or 'upload_expired')
+    """
+    session = UploadSession(UPLOAD_FOLDER, task_id)
+    while task_id in processing_tasks:
+        if any(os.path.exists(info['file_path']) for info in processing_tasks[task_id]['file_info']):
+            return None
+        if os.path.exists(cancel_file_path(task_id)):
+            return 'requested'
+        if session.idle_seconds() > UPLOAD_SESSION_TIMEOUT:
+            return 'upload_expired'
+        time.sleep(UPLOAD_POLL_INTERVAL)
+    return 'requested'
+
+def run_scheduled_task(task_id):
+    """Wait for the task's turn in this process's scheduler, then process it."""
+    task = processing_tasks.get(task_id)
+    if task is not None and task.get('upload'):
+        # Scheduled once there is something to process, so an upload does not hold a slot idle
+        reason = wait_for_upload(task_id)
+        if reason is not None:
+            cancel_queued_task(task_id, reason, queued=False)
+            return
+        TASK_QUEUE_DEPTH.inc()
+        task['status'] = 'queued'
+        task_scheduler.submit(task_id, **task['scheduling'])
+
+    if not wait_for_turn(task_id, task_scheduler.acquire):
+        cancel_queued_task(task_id)
+        return
+    TASK_QUEUE_DEPTH.dec()
+    try:
+        process_multiple_files_task(task_id, pause=lambda: task_scheduler.pause(task_id),
+                                    resume=lambda: wait_for_turn(task_id, task_scheduler.resume))
+    finally:
+        task_scheduler.release(task_id)
+
+def cancel_queued_task(task_id, reason='requested', queued=True):
+    """Record the cancellation of a task that never started; queued if it was counted as waiting."""
+    task = processing_tasks.get(task_id)
+    if task is not None:
+        task['status'] = 'cancelled'
+        task['cancel_reason'] = reason
+        task['completed_at'] = time.time()
         save_tasks_to_file()
+    if queued:
+        TASK_QUEUE_DEPTH.dec()
+    try:
+        os.remove(cancel_file_path(task_id))
+    except OSError:
+        pass
+    logger.info(f"Task {task_id} cancelled before it started ({reason})")
+
+@app.before_request
+def start_request_timer():
+    # Workers are forked after import; make sure this process flushes its own metrics
+    metrics_registry.start()
+    g.request_start = time.time()
+    # Cheap shared version check; a newer dictionary is reloaded in the background
+    correction_engine.check_for_updates()
+
+@app.after_request
+def record_request_latency(response):
+    if 'request_start' in g:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_LATENCY.observe(time.time() - g.request_start,
+                                route=route, method=request.method, status=str(response.status_code))
+    return response
 
 # Routes
 @app.route('/api/health', methods=['GET'])
@@ -340,14 +966,45 @@ def health_check():
     return jsonify({
         "status": "ok",
         "version": "1.0.0",
+        "dictionary_version": correction_engine.dictionary_version,
         "timestamp": time.time()
     })
 
+@app.route('/api/ready', methods=['GET'])
+@limiter.exempt
+def readiness():
+    """Readiness probe: 200 once the correction engine of this worker is warm, 503 before."""
+    warmup = correction_engine.warmup_info
+    ready = warmup is not None
+    return jsonify({
+        "ready": ready,
+        "pid": os.getpid(),
+        "preloaded": ready and warmup['pid'] != os.getpid(),
+        "warmup_seconds": warmup['seconds'] if ready else None,
+        "matcher_compiled": correction_engine.matcher_compiled,
+        "dictionary_version": correction_engine.dictionary_version
+    }), 200 if ready else 503
+
+@app.route('/api/metrics', methods=['GET'])
+@limiter.exempt
+def metrics():
+    """Prometheus metrics aggregated across all workers on this host."""
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/engines', methods=['GET'])
+@limiter.exempt
+def list_engines():
+    """List the registered correction engines with their capabilities and cost."""
+    return jsonify({
+        "default": DEFAULT_ENGINE,
+        "engines": engine_registry.describe()
+    })
+
 @app.route('/api/dictionaries/protection', methods=['GET', 'POST'])
 @limiter.exempt  # Remove rate limit for testing
 def protection_dictionary():
     if request.method == 'GET':
-        return jsonify(correction_engine.protection_dict)
+        return dictionary_get_response('protection')
     elif request.method == 'POST':
         try:
             # Verify PIN code
@@ -380,7 +1037,7 @@ def protection_dictionary():
 @limiter.exempt  # Remove rate limit for testing
 def correction_dictionary():
     if request.method == 'GET':
-        return jsonify(correction_engine.correction_dict)
+        return dictionary_get_response('correction')
     elif request.method == 'POST':
         try:
             # Verify PIN code
@@ -409,9 +1066,130 @@ def correction_dictionary():
             logger.error(f"Error updating correction dictionary: {str(e)}")
             return jsonify({"error": "Invalid request"}), 400
 
+def parse_task_options(params):
+    """
+    Read the processing options of a task from request parameters.
+
+    Args:
+        params (Mapping): Form fields, or the JSON body of a resumable upload
+
+    Returns:
+        dict: verify, trace, profile, engine (as requested) and time_budget
+
+    Raises:
+        ValueError: If an option is invalid
+    """
+    options = {
+        # Optional shadow verification against the reference engine
+        'verify': parse_bool_param(params.get('verify', '')),
+        # Optional per-block/per-term tracing, dumped through /api/tasks/<task_id>/trace
+        'trace': parse_bool_param(params.get('trace', '')),
+        # cProfile capture on request, or for a sampled fraction of tasks
+        'profile': parse_bool_param(params.get('profile', '')) or random.random() < PROFILE_SAMPLE_RATE
+    }
+
+    # Engine requested for this batch, resolved once the batch size is known
+    requested_engine = params.get('engine', '') or DEFAULT_ENGINE
+    if requested_engine != AUTO_ENGINE and requested_engine not in engine_registry.names():
+        raise ValueError(f"Unknown engine: {requested_engine}")
+    options['engine'] = requested_engine
+
+    # Processing time budget in seconds; the task is cancelled with partial results once exceeded
+    options['time_budget'] = TASK_TIME_BUDGET
+    if params.get('time_budget') not in (None, ''):
+        try:
+            requested_budget = float(params['time_budget'])
+        except (TypeError, ValueError):
+            raise ValueError("time_budget must be a number of seconds")
+        if requested_budget <= 0:
+            raise ValueError("time_budget must be positive")
+        options['time_budget'] = min(requested_budget, TASK_TIME_BUDGET) if TASK_TIME_BUDGET > 0 else requested_budget
+    return options
+
+def start_task(task_id, file_info, options, upload=False):
+    """
+    Register a task and hand it to the task backend.
+
+    Args:
+        task_id (str): The task
+        file_info (list): Files of the task
+        options (dict): Options from parse_task_options()
+        upload (bool): The files are still arriving through a resumable upload; the task
+            is scheduled once the first of them is complete
+
+    Returns:
+        dict: The task
+    """
+    # Archive members and uploads in progress are sized by what they declare
+    total_bytes = sum(info['size'] if 'size' in info else os.path.getsize(info['file_path'])
+                      for info in file_info)
+    engine_name = engine_registry.select(
+        options['engine'],
+        file_count=len(file_info),
+        total_bytes=total_bytes
+    )
+
+    # Scheduling: interactive uploads run shortest first, batches share the workers fairly per client
+    client, weight = client_identity(request.headers.get('X-API-Key'), get_remote_address())
+    cost = estimate_cost(total_bytes, len(correction_engine.correction_dict))
+    scheduling = {
+        'client': client,
+        'weight': weight,
+        'cost': cost,
+        'interactive': is_interactive(len(file_info), cost)
+    }
+
+    # Initialize task status
+    task = processing_tasks[task_id] = {
+        'status': 'receiving' if upload else 'queued',
+        'progress': 0,
+        'created_at': time.time(),
+        'file_count': len(file_info),
+        'files_processed': 0,
+        'file_info': file_info,
+        'results': [],
+        'verify': options['verify'],
+        'trace': options['trace'],
+        'profile': options['profile'],
+        'engine': engine_name,
+        'scheduling': scheduling,
+        'time_budget': options['time_budget'],
+        'upload': upload
+    }
+
+    if TASK_BACKEND == 'queue':
+        # A correction worker picks the task up; this tier only reports its status.
+        # An upload is held back until its first file is complete.
+        job_queue.enqueue(task_id, processing_tasks.pop(task_id), hold=upload, **scheduling)
+    else:
+        # Save task to file
+        save_tasks_to_file()
+
+        # Start processing in a background thread once the scheduler admits the task
+        if not upload:
+            TASK_QUEUE_DEPTH.inc()
+            task_scheduler.submit(task_id, **scheduling)
+        thread = threading.Thread(
+            target=run_scheduled_task,
+            args=(task_id,)
+        )
+        thread.daemon = True
+        thread.start()
+    return task
+
+def remove_saved_files(paths):
+    """Remove uploaded files of a rejected request; archive members are not extracted yet."""
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
 @app.route('/api/process', methods=['POST'])
 @limiter.exempt  # Remove rate limit for testing
 def process_files():
+    # Files saved for this request, removed again if the request is rejected
+    saved_paths = []
     try:
         if 'files' not in request.files and 'file' not in request.files:
             return jsonify({"error": "No file part"}), 400
@@ -431,13 +1209,19 @@ def process_files():
         for file in files:
             if file.filename == '':
                 continue
-            if not allowed_file(file.filename):
+            if not allowed_file(file.filename) and not archive_format(file.filename):
                 logger.warning(f"Skipping invalid file type: {file.filename}")
                 continue
             valid_files.append(file)
 
         if not valid_files:
-            return jsonify({"error": "No valid SRT files found. Only SRT files are allowed."}), 400
+            return jsonify({"error": "No valid SRT files found. Only SRT files or archives of them "
+                                     "(.zip, .tar.gz, .srt.gz) are allowed."}), 400
+
+        try:
+            options = parse_task_options(request.form)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
         # Create a task ID
         task_id = str(uuid.uuid4())
@@ -449,8 +1233,20 @@ def process_files():
             safe_filename = secure_filename(file.filename)
             unique_filename = generate_unique_filename(safe_filename)
             file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
+            saved_paths.append(file_path)
             file.save(file_path)
 
+            fmt = archive_format(file.filename)
+            if fmt:
+                # Its SRT members are extracted one by one while the task runs
+                try:
+                    file_info.extend(archive_file_info(file_path, fmt, file.filename))
+                except ArchiveError as e:
+                    remove_saved_files(saved_paths)
+                    logger.warning(f"Rejected archive {file.filename}: {str(e)}")
+                    return jsonify({"error": f"{file.filename}: {str(e)}"}), 400
+                continue
+
             # Generate output filename
             output_filename = f"{os.path.splitext(unique_filename)[0]}_corrected.srt"
             output_path = os.path.join(app.config['UPLOAD_FOLDER'], output_filename)
@@ -461,34 +1257,20 @@ def process_files():
                 'output_path': output_path
             })
 
-        # Initialize task status
-        processing_tasks[task_id] = {
-            'status': 'queued',
-            'progress': 0,
-            'created_at': time.time(),
-            'file_count': len(file_info),
-            'files_processed': 0,
-            'file_info': file_info,
-            'results': []
-        }
-
-        # Save task to file
-        save_tasks_to_file()
-
-        # Start processing in a background thread
-        thread = threading.Thread(
-            target=process_multiple_files_task,
-            args=(task_id,)
-        )
-        thread.daemon = True
-        thread.start()
+        task = start_task(task_id, file_info, options)
 
         return jsonify({
             "status": "success",
             "message": f"Processing started for {len(file_info)} files",
-            "task_id": task_id
+            "task_id": task_id,
+            "engine": task['engine'],
+            "interactive": task['scheduling']['interactive']
         })
 
+    except RequestEntityTooLarge:
+        # Also raised while a gzip-encoded body expands past ARCHIVE_MAX_TOTAL_SIZE
+        remove_saved_files(saved_paths)
+        return jsonify({"error": "Upload too large"}), 413
     except Exception as e:
         logger.error(f"Error in process_files: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -496,10 +1278,17 @@ def process_files():
 @app.route('/api/tasks/<task_id>', methods=['GET'])
 @limiter.exempt  # Remove rate limit for testing
 def get_task_status(task_id):
+    task = None
+    if TASK_BACKEND == 'queue' and task_id not in processing_tasks:
+        # Processed by a correction worker; read the state it published
+        task = job_task(task_id)
+
     # First check in-memory tasks
-    if task_id in processing_tasks:
+    if task is None and task_id in processing_tasks:
         task = processing_tasks[task_id]
-    else:
+        CACHE_REQUESTS.inc(cache='task', result='hit')
+    elif task is None:
+        CACHE_REQUESTS.inc(cache='task', result='miss')
         # If not found in memory, try to load from file
         logger.info(f"Task {task_id} not found in memory, checking file storage")
         try:
@@ -523,7 +1312,8 @@ def get_task_status(task_id):
     response = {
         "status": task.get('status', 'unknown'),
         "progress": task.get('progress', 0),
-        "created_at": task.get('created_at', 0)
+        "created_at": task.get('created_at', 0),
+        "engine": task.get('engine', 'reference')
     }
 
     # Add file name for backward compatibility
@@ -532,8 +1322,9 @@ def get_task_status(task_id):
     elif 'file_info' in task and task['file_info']:
         response['file_name'] = task['file_info'][0]['original_filename']
 
-    # Include results if task is completed
-    if task['status'] == 'completed':
+    # Include results if task is completed, or those of the files finished so far
+    # (before a cancellation, or while the rest of an upload is arriving)
+    if task['status'] in ('completed', 'cancelled') or task.get('results'):
         # Multi-file results
         if 'results' in task and task['results']:
             # Convert tuple keys to strings in replacements dictionary for each result
@@ -574,12 +1365,262 @@ def get_task_status(task_id):
             response['result'] = task['result']
             response['download_url'] = f"/api/download/{os.path.basename(task['output_path'])}"
 
+    # Include stage timings once processing has started
+    if 'timings' in task:
+        response['timings'] = task['timings']
+    if 'profile_url' in task:
+        response['profile_url'] = task['profile_url']
+
+    # Attempts of a queued job, and the error that made it retry
+    for key in ('attempts', 'last_error'):
+        if key in task:
+            response[key] = task[key]
+
+    # Expected start of a waiting task, from the estimated cost of the work ahead of it
+    if task['status'] == 'queued':
+        estimate = task.get('estimate') or task_scheduler.estimate(task_id)
+        if estimate is not None:
+            response.update(estimate)
+        if task.get('scheduling'):
+            response['cost'] = task['scheduling']['cost']
+            response['interactive'] = task['scheduling']['interactive']
+
     # Include error if task failed
     if task['status'] == 'error' and 'error' in task:
         response['error'] = task['error']
 
+    if task.get('time_budget'):
+        response['time_budget'] = task['time_budget']
+    if task['status'] == 'cancelled':
+        response['cancel_reason'] = task.get('cancel_reason', 'requested')
+    if task.get('upload'):
+        response['upload_url'] = f"/api/uploads/{task_id}"
+
     return jsonify(response)
 
+@app.route('/api/tasks/<task_id>', methods=['DELETE'])
+@limiter.exempt
+def cancel_task(task_id):
+    """
+    Cancel a task.
+
+    A task that has not started is cancelled right away. A running task stops at its
+    next check, between files or chunks of a file, and keeps the results of the files
+    it finished.
+    """
+    if TASK_BACKEND == 'queue' and task_id not in processing_tasks:
+        status = job_queue.cancel(task_id)
+        if status in (QUEUED, HELD):
+            logger.info(f"Task {task_id} cancelled before it started")
+            return jsonify({"status": "cancelled", "task_id": task_id})
+        if status == RUNNING:
+            # The correction worker running the job sees the marker and stops
+            open(cancel_file_path(task_id), 'w').close()
+            return jsonify({"status": "cancelling", "task_id": task_id}), 202
+        if status is not None:
+            return jsonify({"error": f"Task already {job_task(task_id)['status']}"}), 409
+
+    task = processing_tasks.get(task_id)
+    if task is None:
+        task = load_tasks_from_file().get(task_id)
+    if task is None:
+        return jsonify({"error": "Task not found"}), 404
+    if task.get('status') in ('completed', 'error', 'cancelled'):
+        return jsonify({"error": f"Task already {task['status']}"}), 409
+
+    # Seen by whichever worker process is running the task or holds it in its scheduler
+    open(cancel_file_path(task_id), 'w').close()
+    if task_id in processing_tasks and task.get('status') == 'queued':
+        # Waiting in this process: withdraw it from the scheduler now
+        task_scheduler.release(task_id)
+    logger.info(f"Cancellation of task {task_id} requested")
+    return jsonify({"status": "cancelling", "task_id": task_id}), 202
+
+def upload_session(upload_id):
+    """Open the session of a resumable upload, or None if there is no such upload."""
+    session = UploadSession(UPLOAD_FOLDER, secure_filename(upload_id))
+    return session if session.exists() else None
+
+@app.route('/api/uploads', methods=['POST'])
+@limiter.exempt
+def create_upload():
+    """
+    Start a resumable upload of a batch of SRT files.
+
+    The JSON body declares the files ({"name", "size", optional "sha256"}) and takes
+    the options of /api/process. The task is created right away and corrects the
+    files as they complete.
+    """
+    try:
+        params = request.get_json(silent=True) or {}
+        files = params.get('files')
+        if not isinstance(files, list) or not files:
+            return jsonify({"error": "files must be a non-empty list of {name, size}"}), 400
+        if len(files) > UPLOAD_MAX_FILES:
+            return jsonify({"error": f"At most {UPLOAD_MAX_FILES} files per upload"}), 400
+
+        try:
+            options = parse_task_options(params)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        task_id = str(uuid.uuid4())
+        declared = []
+        file_info = []
+        for entry in files:
+            name = entry.get('name') if isinstance(entry, dict) else None
+            size = entry.get('size') if isinstance(entry, dict) else None
+            if not name or not allowed_file(name):
+                return jsonify({"error": f"Not an SRT file: {name}"}), 400
+            if not isinstance(size, int) or isinstance(size, bool) or not 0 <= size <= UPLOAD_MAX_FILE_SIZE:
+                return jsonify({"error": f"Size of {name} must be 0 to {UPLOAD_MAX_FILE_SIZE} bytes"}), 400
+            sha256 = entry.get('sha256')
+            if sha256 is not None and not (isinstance(sha256, str) and len(sha256) == 64
+                                           and all(c in '0123456789abcdefABCDEF' for c in sha256)):
+                return jsonify({"error": f"sha256 of {name} must be 64 hex digits"}), 400
+
+            unique_filename = generate_unique_filename(secure_filename(name))
+            file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
+            output_filename = f"{os.path.splitext(unique_filename)[0]}_corrected.srt"
+            declared.append({'name': name, 'size': size, 'path': file_path, 'sha256': sha256})
+            file_info.append({
+                'original_filename': name,
+                'file_path': file_path,
+                'output_path': os.path.join(UPLOAD_FOLDER, output_filename),
+                'size': size,
+                'upload': True
+            })
+
+        UploadSession.create(UPLOAD_FOLDER, task_id, declared)
+        task = start_task(task_id, file_info, options, upload=True)
+        logger.info(f"Started upload {task_id} of {len(file_info)} files")
+
+        return jsonify({
+            "status": "success",
+            "upload_id": task_id,
+            "task_id": task_id,
+            "engine": task['engine'],
+            "interactive": task['scheduling']['interactive'],
+            "files": [{
+                "index": index,
+                "name": entry['name'],
+                "size": entry['size'],
+                "upload_url": f"/api/uploads/{task_id}/files/{index}"
+            } for index, entry in enumerate(declared)]
+        }), 201
+
+    except Exception as e:
+        logger.error(f"Error in create_upload: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+@limiter.exempt
+def get_upload_status(upload_id):
+    """Bytes received of every file of an upload, to resume it."""
+    session = upload_session(upload_id)
+    if session is None:
+        return jsonify({"error": "Upload not found"}), 404
+    files = session.status()
+    return jsonify({
+        "upload_id": session.upload_id,
+        "task_id": session.upload_id,
+        "complete": all(entry['complete'] for entry in files),
+        "files": files
+    })
+
+@app.route('/api/uploads/<upload_id>/files/<int:index>', methods=['PUT'])
+@limiter.exempt
+def upload_chunk(upload_id, index):
+    """
+    Write a chunk of a file of an upload.
+
+    The body holds the bytes given by the Content-Range header (bytes start-end/size);
+    without it the body is the whole file. A chunk may start anywhere up to the bytes
+    received so far; a chunk further on is refused with 409 and the offset to resume at.
+    """
+    session = upload_session(upload_id)
+    if session is None:
+        return jsonify({"error": "Upload not found"}), 404
+    try:
+        entry = session.file(index)
+    except IndexError as e:
+        return jsonify({"error": str(e)}), 404
+
+    length = request.content_length
+    if length is None:
+        return jsonify({"error": "Content-Length required"}), 411
+    start = 0
+    if 'Content-Range' in request.headers:
+        content_range = parse_content_range_header(request.headers['Content-Range'])
+        if content_range is None or content_range.units != 'bytes':
+            return jsonify({"error": "Invalid Content-Range"}), 400
+        if content_range.stop - content_range.start != length:
+            return jsonify({"error": "Content-Range does not match Content-Length"}), 400
+        if content_range.length is not None and content_range.length != entry['size']:
+            return jsonify({"error": f"{entry['name']} was declared with {entry['size']} bytes"}), 400
+        start = content_range.start
+
+    try:
+        received = session.write_chunk(index, start, request.stream, length)
+    except UploadOffsetError as e:
+        return jsonify({"error": str(e), "received": e.received}), 409
+    except UploadChecksumError as e:
+        return jsonify({"error": str(e), "received": 0}), 422
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    complete = received == entry['size']
+    if complete and TASK_BACKEND == 'queue':
+        # First complete file: the correction workers may take the task now
+        job_queue.release(session.upload_id)
+    return jsonify({"index": index, "received": received, "size": entry['size'], "complete": complete})
+
+@app.route('/api/uploads/<upload_id>/finalize', methods=['POST'])
+@limiter.exempt
+def finalize_upload(upload_id):
+    """Confirm that all files of an upload arrived; 409 lists the files still incomplete."""
+    session = upload_session(upload_id)
+    if session is None:
+        return jsonify({"error": "Upload not found"}), 404
+    incomplete = [entry for entry in session.status() if not entry['complete']]
+    if incomplete:
+        return jsonify({"error": f"{len(incomplete)} files incomplete", "files": incomplete}), 409
+    return jsonify({
+        "status": "complete",
+        "upload_id": session.upload_id,
+        "task_id": session.upload_id,
+        "task_url": f"/api/tasks/{session.upload_id}"
+    })
+
+@app.route('/api/tasks/<task_id>/trace', methods=['GET'])
+@limiter.exempt
+def get_task_trace(task_id):
+    """Dump the trace recorded for a task started with trace=true."""
+    trace = tracer.get(task_id)
+    if trace is not None:
+        return jsonify(trace.dump())
+
+    # The task may have run in another worker; serve the dumped trace instead
+    trace_path = trace_file_path(task_id)
+    if not os.path.exists(trace_path):
+        return jsonify({"error": "Trace not found"}), 404
+    try:
+        with open(trace_path, 'r', encoding='utf-8') as f:
+            return jsonify(json.load(f))
+    except Exception as e:
+        logger.error(f"Error loading trace for task {task_id}: {str(e)}")
+        return jsonify({"error": "Trace not available"}), 500
+
+@app.route('/api/tasks/<task_id>/profile', methods=['GET'])
+@limiter.exempt
+def get_task_profile(task_id):
+    """Return the cProfile report captured for a task."""
+    profile_path = profile_file_path(task_id)
+    if not os.path.exists(profile_path):
+        return jsonify({"error": "Profile not found"}), 404
+    with open(profile_path, 'r', encoding='utf-8') as f:
+        return Response(f.read(), mimetype='text/plain')
+
 @app.route('/api/download/<filename>', methods=['GET'])
 def download_file(filename):
     file_path = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(filename))
@@ -614,26 +1655,20 @@ def update_dictionary_term():
 
         # Get the appropriate dictionary
         if dict_type == 'correction':
-            dictionary = correction_engine.correction_dict.copy()
+            dictionary = correction_engine.correction_dict
         else:  # protection
-            dictionary = correction_engine.protection_dict.copy()
-
-        # Perform the requested action
-        if action in ['add', 'update']:
-            dictionary[term] = value
-        elif action == 'delete':
-            if term in dictionary:
-                del dictionary[term]
-            else:
-                return jsonify({"error": "Term not found"}), 404
+            dictionary = correction_engine.protection_dict
 
-        # Save the updated dictionary
-        if dict_type == 'correction':
-            success = correction_engine.update_correction_dict(dictionary)
-        else:  # protection
-            success = correction_engine.update_protection_dict(dictionary)
+        if action == 'delete' and term not in dictionary:
+            return jsonify({"error": "Term not found"}), 404
+
+        # Append the edit to the dictionary journal
+        success = correction_engine.apply_term_edit(dict_type, action, term, value)
 
         if success:
+            dictionary = correction_engine.correction_dict if dict_type == 'correction' else correction_engine.protection_dict
+            dictionary_indexes[dict_type].apply_edit(action, term, value, dictionary)
+            current_dictionary(dict_type)
             return jsonify({
                 "status": "success",
                 "message": f"Term '{term}' {action}ed in {dict_type} dictionary",
@@ -653,6 +1688,8 @@ def search_dictionary():
         # Get parameters
         query = request.args.get('q', '')
         dict_type = request.args.get('type')  # 'correction', 'protection', or 'all'
+        fields = request.args.get('fields', TERM_FIELD)  # 'term', 'value', or 'all'
+        mode = request.args.get('mode', 'substring')  # 'substring' or 'fuzzy'
 
         if not query:
             return jsonify({"error": "Missing search query"}), 400
@@ -660,33 +1697,201 @@ def search_dictionary():
         if dict_type not in ['correction', 'protection', 'all']:
             return jsonify({"error": "Invalid dictionary type"}), 400
 
+        if mode not in ['substring', 'fuzzy']:
+            return jsonify({"error": "Invalid search mode"}), 400
+
+        if mode == 'fuzzy':
+            return fuzzy_search_dictionary(query, dict_type)
+
+        if fields != 'all' and fields not in SEARCH_FIELDS:
+            return jsonify({"error": "Invalid search fields"}), 400
+        fields = SEARCH_FIELDS if fields == 'all' else (fields,)
+
+        try:
+            limit = int(request.args['limit']) if request.args.get('limit') else None
+            offset = int(request.args.get('offset') or 0)
+        except ValueError:
+            return jsonify({"error": "Invalid limit or offset"}), 400
+        if (limit is not None and limit < 0) or offset < 0:
+            return jsonify({"error": "Invalid limit or offset"}), 400
+
         results = {}
+        totals = {}
 
         # Search in correction dictionary
         if dict_type in ['correction', 'all']:
-            correction_results = {}
-            for term, value in correction_engine.correction_dict.items():
-                if query.lower() in term.lower():
-                    correction_results[term] = value
-            results['correction'] = correction_results
+            matches, totals['correction'] = get_dictionary_index('correction').search(query, fields, limit, offset)
+            results['correction'] = dict(matches)
 
         # Search in protection dictionary
         if dict_type in ['protection', 'all']:
-            protection_results = {}
-            for term in correction_engine.protection_dict.keys():
-                if query.lower() in term.lower():
-                    protection_results[term] = ''
-            results['protection'] = protection_results
+            matches, totals['protection'] = get_dictionary_index('protection').search(query, fields, limit, offset)
+            results['protection'] = {term: '' for term, _ in matches}
 
         return jsonify({
             "status": "success",
             "query": query,
-            "results": results
+            "results": results,
+            "total": totals,
+            "limit": limit,
+            "offset": offset
         })
     except Exception as e:
         logger.error(f"Error searching dictionaries: {str(e)}")
         return jsonify({"error": "Invalid request"}), 400
 
+def fuzzy_search_dictionary(query, dict_type):
+    """Return the terms most similar to the query, ranked by edit distance."""
+    try:
+        k = int(request.args.get('k') or 10)
+        min_similarity = float(request.args.get('min_similarity') or DEFAULT_MIN_SIMILARITY)
+    except ValueError:
+        return jsonify({"error": "Invalid k or min_similarity"}), 400
+    if not 0 < k <= 100:
+        return jsonify({"error": "k must be between 1 and 100"}), 400
+
+    results = {}
+    for name in ('correction', 'protection'):
+        if dict_type in [name, 'all']:
+            results[name] = get_dictionary_index(name).similar(query, k, min_similarity)
+
+    return jsonify({
+        "status": "success",
+        "query": query,
+        "mode": "fuzzy",
+        "results": results
+    })
+
+@app.route('/api/dictionaries/analysis', methods=['GET'])
+def dictionary_analysis():
+    """Report dead, duplicate, shadowed and cascading correction entries."""
+    try:
+        details = parse_bool_param(request.args.get('details', 'true'))
+        snapshot = correction_engine.snapshot
+        with analysis_lock:
+            cached = dictionary_analysis_cache.get('analysis')
+            if (cached is None or cached['correction'] is not snapshot.correction_dict
+                    or cached['protection'] is not snapshot.protection_dict):
+                report = analyze_dictionary(snapshot.correction_dict, snapshot.protection_dict,
+                                            correction_engine.should_correct)
+                cached = {"correction": snapshot.correction_dict, "protection": snapshot.protection_dict,
+                          "version": snapshot.version, "report": report}
+                dictionary_analysis_cache['analysis'] = cached
+
+        report = dict(cached['report'], version=cached['version'])
+        if not details:
+            report = {key: report[key] for key in ('entries', 'summary', 'cleanup', 'analysis_time', 'version')}
+            report['cleanup'] = {key: value for key, value in report['cleanup'].items() if key != 'removable_terms'}
+        return jsonify(dict(report, status="success"))
+    except Exception as e:
+        logger.error(f"Error analyzing dictionaries: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+def parse_days_param():
+    """Parse the optional 'days' window of the statistics endpoints."""
+    days = request.args.get('days')
+    if not days:
+        return None
+    days = float(days)
+    if days <= 0:
+        raise ValueError("days must be positive")
+    return days
+
+@app.route('/api/dictionaries/stats', methods=['GET'])
+@limiter.exempt
+def dictionary_stats():
+    """Report how often correction terms were hit, in total or for one term per day."""
+    try:
+        try:
+            days = parse_days_param()
+            limit = int(request.args.get('limit') or 50)
+        except ValueError:
+            return jsonify({"error": "Invalid days or limit"}), 400
+
+        term_stats = correction_engine.term_stats
+        term = request.args.get('term')
+        if term:
+            series = term_stats.series(term, days)
+            return jsonify({
+                "status": "success",
+                "term": term,
+                "days": days,
+                "hits": sum(bucket['hits'] for bucket in series),
+                "series": series
+            })
+
+        hits = term_stats.hits(days)
+        dictionary = correction_engine.correction_dict
+        zero_hit_count = sum(1 for term in dictionary if not hits.get(term))
+        return jsonify({
+            "status": "success",
+            "days": days,
+            "tracking_since": term_stats.tracking_since,
+            "total_hits": sum(hits.values()),
+            "terms_hit": len(hits),
+            "zero_hit_count": zero_hit_count,
+            "index_adapted": correction_engine.load_index_weights() is not None,
+            "top": [{"term": term, "value": dictionary.get(term), "hits": count}
+                    for term, count in list(hits.items())[:limit]]
+        })
+    except Exception as e:
+        logger.error(f"Error reading term statistics: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/dictionaries/stats/zero-hits', methods=['GET'])
+@limiter.exempt
+def dictionary_zero_hits():
+    """List correction terms without hits in the last N days, candidates for pruning."""
+    try:
+        try:
+            days = parse_days_param()
+            limit = int(request.args['limit']) if request.args.get('limit') else None
+            offset = int(request.args.get('offset') or 0)
+        except ValueError:
+            return jsonify({"error": "Invalid days, limit or offset"}), 400
+
+        dictionary = correction_engine.correction_dict
+        terms = correction_engine.term_stats.zero_hits(dictionary, days)
+        page = terms[offset:offset + limit] if limit is not None else terms[offset:]
+        return jsonify({
+            "status": "success",
+            "days": days,
+            "tracking_since": correction_engine.term_stats.tracking_since,
+            "entries": len(dictionary),
+            "total": len(terms),
+            "terms": [{"term": term, "value": dictionary[term]} for term in page],
+            "limit": limit,
+            "offset": offset
+        })
+    except Exception as e:
+        logger.error(f"Error listing zero-hit terms: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/dictionaries/stats/adapt', methods=['POST'])
+def adapt_dictionary_index():
+    """Re-key the compiled matcher index by the observed bigram frequencies (or reset it)."""
+    try:
+        if request.json.get('pin') != DICTIONARY_PIN:
+            return jsonify({"error": "Invalid PIN code"}), 403
+
+        reset = parse_bool_param(request.json.get('reset', False))
+        weights = {} if reset else correction_engine.term_stats.bigram_frequencies()
+        if not reset and not weights:
+            return jsonify({"error": "No term statistics collected yet"}), 409
+
+        start_time = time.time()
+        count = correction_engine.adapt_index(weights)
+        return jsonify({
+            "status": "success",
+            "bigrams": count,
+            "adapted": count > 0,
+            "version": correction_engine.dictionary_version,
+            "compile_time": time.time() - start_time
+        })
+    except Exception as e:
+        logger.error(f"Error adapting the matcher index: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/download-multiple', methods=['POST'])
 @limiter.exempt
 def download_multiple_files():
@@ -0,0 +1,346 @@
+import gzip
+import logging
+import os
+import posixpath
+import struct
+import tarfile
+import zipfile
+import zlib
+from typing import List, Optional, Tuple
+
+from werkzeug.exceptions import RequestEntityTooLarge
+
+logger = logging.getLogger(__name__)
+
+# Upload names accepted as archives of SRT files
+ARCHIVE_EXTENSIONS = ('.zip', '.tar.gz', '.tgz', '.srt.gz')
+
+# SRT files extracted from one archive at most
+ARCHIVE_MAX_MEMBERS = int(os.environ.get('ARCHIVE_MAX_MEMBERS', '500'))
+
+# Uncompressed size of one archive member
+ARCHIVE_MAX_MEMBER_SIZE = int(os.environ.get('ARCHIVE_MAX_MEMBER_SIZE', str(64 * 1024 * 1024)))
+
+# Uncompressed size of a whole archive, and of a gzip-encoded request body
+ARCHIVE_MAX_TOTAL_SIZE = int(os.environ.get('ARCHIVE_MAX_TOTAL_SIZE', str(512 * 1024 * 1024)))
+
+# Members expanding more than this many times their compressed size are taken for zip bombs
+ARCHIVE_MAX_RATIO = float(os.environ.get('ARCHIVE_MAX_RATIO', '100'))
+
+# Members smaller than this are not checked against the ratio; tiny files compress arbitrarily well
+RATIO_MIN_SIZE = 1024 * 1024
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Set in the WSGI environ of requests whose body GzipRequestBody decodes
+DECODED_BODY_KEY = 'lumon.gzip_decoded'
+
+
+class ArchiveError(ValueError):
+    """An archive that is corrupt or exceeds the extraction limits."""
+
+
+def archive_format(filename: str) -> Optional[str]:
+    """
+    Get the archive format of an upload from its name.
+
+    Args:
+        filename (str): Name of the uploaded file
+
+    Returns:
+        str: 'zip', 'tar' (gzip-compressed tar) or 'gzip' (a single gzip-compressed SRT),
+            or None if the file is not an archive
+    """
+    name = filename.lower()
+    if name.endswith('.zip'):
+        return 'zip'
+    if name.endswith(('.tar.gz', '.tgz')):
+        return 'tar'
+    if name.endswith('.srt.gz'):
+        return 'gzip'
+    return None
+
+
+def is_srt_member(name: str) -> bool:
+    """Whether an archive member is an SRT file (skipping macOS resource forks and hidden files)."""
+    base = posixpath.basename(name.replace('\\', '/'))
+    return base.lower().endswith('.srt') and not base.startswith('.') and '__MACOSX/' not in name
+
+
+def member_filename(name: str) -> str:
+    """File name of an archive member, without its directories."""
+    return posixpath.basename(name.replace('\\', '/'))
+
+
+def _check_members(members: List[Tuple[str, int]], total: int):
+    if len(members) > ARCHIVE_MAX_MEMBERS:
+        raise ArchiveError(f"Archive holds more than {ARCHIVE_MAX_MEMBERS} SRT files")
+    if total > ARCHIVE_MAX_TOTAL_SIZE:
+        raise ArchiveError(f"Archive expands to more than {ARCHIVE_MAX_TOTAL_SIZE} bytes")
+    for name, size in members:
+        if size > ARCHIVE_MAX_MEMBER_SIZE:
+            raise ArchiveError(f"{name} expands to more than {ARCHIVE_MAX_MEMBER_SIZE} bytes")
+
+
+def scan_archive(path: str, fmt: str, filename: str = None) -> List[Tuple[str, int]]:
+    """
+    List the SRT members of an archive and check the sizes they declare.
+
+    Zip archives are listed from their central directory and gzip files from their
+    trailer, without decompressing anything. A tar stream has to be decompressed to
+    reach its headers, but no member is written out, and the scan stops at the first
+    header over the limits. The sizes actually extracted are checked again by
+    ArchiveReader, since an archive can lie about them.
+
+    Args:
+        path (str): The saved archive
+        fmt (str): Format from archive_format()
+        filename (str, optional): Uploaded name, used for the member of a gzip file
+
+    Returns:
+        List[Tuple[str, int]]: (member name, uncompressed size) of the SRT members, in archive order
+
+    Raises:
+        ArchiveError: If the archive is corrupt or over the limits
+    """
+    members = []
+    total = 0
+    try:
+        if fmt == 'zip':
+            with zipfile.ZipFile(path) as archive:
+                for info in archive.infolist():
+                    total += info.file_size
+                    if info.is_dir() or not is_srt_member(info.filename):
+                        continue
+                    members.append((info.filename, info.file_size))
+                    if info.file_size > RATIO_MIN_SIZE and info.file_size > ARCHIVE_MAX_RATIO * max(info.compress_size, 1):
+                        raise ArchiveError(f"{info.filename} expands more than {ARCHIVE_MAX_RATIO:g} times")
+        elif fmt == 'tar':
+            with tarfile.open(path, mode='r|gz') as archive:
+                for info in archive:
+                    total += info.size
+                    if info.isfile() and is_srt_member(info.name):
+                        members.append((info.name, info.size))
+                    # Stop before decompressing past the limits
+                    _check_members(members, total)
+        elif fmt == 'gzip':
+            with open(path, 'rb') as f:
+                f.seek(-4, os.SEEK_END)
+                # ISIZE: uncompressed size modulo 2^32
+                total = struct.unpack('<I', f.read(4))[0]
+            name = filename or os.path.basename(path)
+            members.append((name[:-len('.gz')] if name.lower().endswith('.gz') else name, total))
+        else:
+            raise ArchiveError(f"Unsupported archive format: {fmt}")
+    except (zipfile.BadZipFile, tarfile.TarError, OSError, EOFError, zlib.error, struct.error) as e:
+        raise ArchiveError(f"Corrupt archive: {str(e)}")
+
+    _check_members(members, total)
+    if not members:
+        raise ArchiveError("Archive holds no SRT files")
+    return members
+
+
+class _CountingReader:
+    """File wrapper counting the compressed bytes consumed by a decompressor."""
+
+    def __init__(self, f):
+        self._f = f
+        self.consumed = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._f.read(size)
+        self.consumed += len(data)
+        return data
+
+    def close(self):
+        self._f.close()
+
+
+class ArchiveReader:
+    """
+    Extracts the members of an archive one at a time.
+
+    Members are extracted in archive order right before they are corrected, so an
+    archive is never expanded on disk as a whole. A tar archive is read as a single
+    forward stream; zip members are opened directly. Every member is checked against
+    the size, ratio and total limits on the bytes actually decompressed.
+    """
+
+    def __init__(self, path: str, fmt: str):
+        """
+        Open an archive.
+
+        Args:
+            path (str): The saved archive
+            fmt (str): Format from archive_format()
+        """
+        self.path = path
+        self.fmt = fmt
+        self.extracted = 0
+        self._raw = None
+        self._archive = None
+        try:
+            if fmt == 'zip':
+                self._archive = zipfile.ZipFile(path)
+            elif fmt == 'tar':
+                self._raw = _CountingReader(open(path, 'rb'))
+                self._archive = tarfile.open(fileobj=self._raw, mode='r|gz')
+        except (zipfile.BadZipFile, tarfile.TarError, OSError) as e:
+            self.close()
+            raise ArchiveError(f"Corrupt archive: {str(e)}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+        if self._raw is not None:
+            self._raw.close()
+            self._raw = None
+
+    def extract(self, member: str, dest_path: str) -> int:
+        """
+        Extract a member to a file.
+
+        Args:
+            member (str): Member name from scan_archive()
+            dest_path (str): File to write
+
+        Returns:
+            int: Bytes written
+
+        Raises:
+            ArchiveError: If the member is missing, corrupt or over the limits
+        """
+        try:
+            if self.fmt == 'zip':
+                info = self._archive.getinfo(member)
+                with self._archive.open(info) as source:
+                    return self._copy(source, dest_path, member, lambda: info.compress_size)
+            if self.fmt == 'tar':
+                # Forward only: skip to the member, decompressing what lies before it
+                info = self._archive.next()
+                while info is not None and not (info.isfile() and info.name == member):
+                    info = self._archive.next()
+                if info is None:
+                    raise ArchiveError(f"{member} not found in archive")
+                start = self._raw.consumed
+                source = self._archive.extractfile(info)
+                return self._copy(source, dest_path, member, lambda: self._raw.consumed - start)
+            with open(self.path, 'rb') as raw:
+                counter = _CountingReader(raw)
+                with gzip.GzipFile(fileobj=counter, mode='rb') as source:
+                    return self._copy(source, dest_path, member, lambda: counter.consumed)
+        except ArchiveError:
+            raise
+        except (KeyError, zipfile.BadZipFile, tarfile.TarError, OSError, EOFError, zlib.error) as e:
+            raise ArchiveError(f"Cannot extract {member}: {str(e)}")
+
+    def _copy(self, source, dest_path: str, member: str, compressed) -> int:
+        """Copy a member, enforcing the limits on the bytes actually read."""
+        written = 0
+        try:
+            with open(dest_path, 'wb') as dest:
+                while True:
+                    block = source.read(COPY_BUFFER_SIZE)
+                    if not block:
+                        break
+                    written += len(block)
+                    if written > ARCHIVE_MAX_MEMBER_SIZE:
+                        raise ArchiveError(f"{member} expands to more than {ARCHIVE_MAX_MEMBER_SIZE} bytes")
+                    if self.extracted + written > ARCHIVE_MAX_TOTAL_SIZE:
+                        raise ArchiveError(f"Archive expands to more than {ARCHIVE_MAX_TOTAL_SIZE} bytes")
+                    if written > RATIO_MIN_SIZE and written > ARCHIVE_MAX_RATIO * max(compressed(), 1):
+                        raise ArchiveError(f"{member} expands more than {ARCHIVE_MAX_RATIO:g} times")
+                    dest.write(block)
+        except BaseException:
+            if os.path.exists(dest_path):
+                os.remove(dest_path)
+            raise
+        self.extracted += written
+        return written
+
+
+class _GzipInput:
+    """Request body stream decompressing a gzip-encoded body as it is read."""
+
+    def __init__(self, stream, length: Optional[int]):
+        self._stream = stream
+        self._remaining = length
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self._tail = b''
+        self._buffer = b''
+        self._eof = False
+
+    def _fill(self, size: int):
+        while len(self._buffer) < size and not self._eof:
+            if self._tail:
+                raw, self._tail = self._tail, b''
+            else:
+                read_size = COPY_BUFFER_SIZE if self._remaining is None else min(COPY_BUFFER_SIZE, self._remaining)
+                raw = self._stream.read(read_size) if read_size > 0 else b''
+                if self._remaining is not None:
+                    self._remaining -= len(raw)
+                if not raw:
+                    self._buffer += self._decompressor.flush()
+                    self._eof = True
+                    break
+            # Bounded output, so a small compressed chunk cannot expand all at once
+            self._buffer += self._decompressor.decompress(raw, size - len(self._buffer))
+            self._tail = self._decompressor.unconsumed_tail
+            self._eof = self._decompressor.eof
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = ARCHIVE_MAX_TOTAL_SIZE + 1
+        try:
+            self._fill(size)
+        except zlib.error as e:
+            raise ValueError(f"Invalid gzip request body: {str(e)}")
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+class GzipRequestBody:
+    """
+    WSGI middleware decoding request bodies sent with Content-Encoding: gzip.
+
+    The compressed body is limited to max_compressed bytes. The decoded body has no
+    Content-Length any more; it is passed on as a terminated stream, which the
+    application limits to ARCHIVE_MAX_TOTAL_SIZE (see DECODED_BODY_KEY) while parsing.
+    """
+
+    def __init__(self, app, max_compressed: int):
+        """
+        Wrap a WSGI application.
+
+        Args:
+            app: The WSGI application
+            max_compressed (int): Largest compressed body accepted
+        """
+        self.app = app
+        self.max_compressed = max_compressed
+
+    def __call__(self, environ, start_response):
+        if environ.get('HTTP_CONTENT_ENCODING', '').strip().lower() == 'gzip':
+            try:
+                length = int(environ['CONTENT_LENGTH']) if environ.get('CONTENT_LENGTH') else None
+            except ValueError:
+                length = None
+            if length is None and 'wsgi.input_terminated' not in environ:
+                # Without a length the raw stream cannot be read safely
+                length = 0
+            if length is not None and length > self.max_compressed:
+                return RequestEntityTooLarge()(environ, start_response)
+            environ['wsgi.input'] = _GzipInput(environ['wsgi.input'], length)
+            environ.pop('CONTENT_LENGTH', None)
+            environ.pop('HTTP_CONTENT_ENCODING', None)
+            environ['wsgi.input_terminated'] = True
+            environ[DECODED_BODY_KEY] = True
+        return self.app(environ, start_response)
@@ -0,0 +1,280 @@
+"""
+Headless batch correction of SRT directory trees.
+
+    python batch_correct.py /data/subtitles --output-dir /data/corrected --workers 8
+    python batch_correct.py /data/subtitles --report report.json --manifest run.jsonl --resume
+
+Every *.srt file below the inputs is corrected in a process pool. Outputs are written
+next to the input as <name>_corrected.srt, or under --output-dir with the same relative
+path. A file is skipped when its output is newer than both the input and the
+dictionaries (including their edit journals), unless --force is given. Each finished
+file is appended to the manifest, so an interrupted run continues with --resume where
+it stopped. The JSON report summarizes the run.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from correction_engine import CorrectionEngine
+from engine_registry import registry as engine_registry
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CORRECTION_DICT = os.path.join(BACKEND_DIR, 'dictionaries', 'correction_dict.json')
+DEFAULT_PROTECTION_DICT = os.path.join(BACKEND_DIR, 'dictionaries', 'protection_dict.json')
+OUTPUT_SUFFIX = '_corrected'
+TOP_REPLACEMENTS = 50  # Replacements listed in the report
+
+# Engine of a pool worker, created once by the initializer
+_worker_engine = None
+
+
+def find_inputs(paths: List[str]) -> List[Path]:
+    """
+    Collect the SRT files below the given files and directories.
+
+    Outputs of earlier runs (<name>_corrected.srt) are not inputs.
+
+    Args:
+        paths (List[str]): Files or directories
+
+    Returns:
+        List[Path]: SRT files in a stable order
+    """
+    found = set()
+    for path in map(Path, paths):
+        candidates = [path] if path.is_file() else (
+            Path(root) / name for root, _, names in os.walk(path) for name in names)
+        for candidate in candidates:
+            if candidate.suffix.lower() == '.srt' and not candidate.stem.endswith(OUTPUT_SUFFIX):
+                found.add(candidate.resolve())
+    return sorted(found)
+
+
+def output_path_for(input_path: Path, root: Optional[Path], output_dir: Optional[Path]) -> Path:
+    """
+    Get the output path of an input file.
+
+    Args:
+        input_path (Path): The input file
+        root (Path, optional): Input directory the file was found in
+        output_dir (Path, optional): Directory mirroring the input tree
+
+    Returns:
+        Path: Where the corrected file is written
+    """
+    if output_dir is None:
+        return input_path.with_name(f"{input_path.stem}{OUTPUT_SUFFIX}{input_path.suffix}")
+    relative = input_path.relative_to(root) if root is not None else Path(input_path.name)
+    return output_dir / relative
+
+
+def dictionary_mtime(correction_dict_file: str, protection_dict_file: str) -> float:
+    """Latest modification time of the dictionaries and their edit journals."""
+    mtimes = [0.0]
+    for filename in (correction_dict_file, protection_dict_file):
+        for path in (filename, f"{filename}.journal"):
+            try:
+                mtimes.append(os.path.getmtime(path))
+            except OSError:
+                pass
+    return max(mtimes)
+
+
+def load_manifest(path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Read the files completed by an earlier run.
+
+    Args:
+        path (str): Manifest file (JSON lines)
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Manifest entry per input path
+    """
+    done = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Last line of an interrupted run may be incomplete
+                if entry.get('status') == 'completed':
+                    done[entry['input']] = entry
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def _init_worker(correction_dict_file: str, protection_dict_file: str, engine_name: str):
+    """Create the engine of a pool worker; the compiled dictionary is mapped, not rebuilt."""
+    global _worker_engine
+    logging.getLogger().setLevel(logging.WARNING)
+    source = CorrectionEngine(correction_dict_file, protection_dict_file)
+    _worker_engine = engine_registry.get(engine_name, source)
+
+
+def _correct_file(input_path: str, output_path: str) -> Dict[str, Any]:
+    """Correct one file in a pool worker."""
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    result = _worker_engine.process_file(input_path, output_path)
+    result.pop('timings', None)
+    return result
+
+
+def run_batch(inputs: List[str], output_dir: Optional[str] = None, workers: int = None,
+              engine_name: str = 'reference', correction_dict_file: str = DEFAULT_CORRECTION_DICT,
+              protection_dict_file: str = DEFAULT_PROTECTION_DICT, manifest_path: Optional[str] = None,
+              resume: bool = False, force: bool = False) -> Dict[str, Any]:
+    """
+    Correct all SRT files below the inputs.
+
+    Args:
+        inputs (List[str]): Files or directories
+        output_dir (str, optional): Directory mirroring the input trees; next to the inputs if omitted
+        workers (int, optional): Pool size; defaults to the number of CPUs
+        engine_name (str): Registered engine to use
+        correction_dict_file (str): Correction dictionary
+        protection_dict_file (str): Protection dictionary
+        manifest_path (str, optional): JSON lines file recording every finished file
+        resume (bool): Skip the files the manifest records as completed
+        force (bool): Also correct files whose output is up to date
+
+    Returns:
+        Dict[str, Any]: The run report
+    """
+    start_time = time.time()
+    engine_registry.spec(engine_name)
+    output_root = Path(output_dir).resolve() if output_dir else None
+
+    # Plan the run: (input, output) pairs and the files skipped
+    jobs: List[Tuple[Path, Path]] = []
+    skipped_up_to_date: List[str] = []
+    skipped_resumed: List[str] = []
+    completed = load_manifest(manifest_path) if manifest_path and resume else {}
+    dictionaries_changed = dictionary_mtime(correction_dict_file, protection_dict_file)
+    for path in inputs:
+        root = Path(path).resolve() if Path(path).is_dir() else None
+        for input_path in find_inputs([path]):
+            output_path = output_path_for(input_path, root, output_root)
+            entry = completed.get(str(input_path))
+            stat = input_path.stat()
+            if (entry is not None and entry.get('input_mtime') == stat.st_mtime
+                    and entry.get('input_size') == stat.st_size and output_path.exists()):
+                skipped_resumed.append(str(input_path))
+                continue
+            if not force and output_path.exists():
+                output_mtime = output_path.stat().st_mtime
+                if output_mtime > stat.st_mtime and output_mtime > dictionaries_changed:
+                    skipped_up_to_date.append(str(input_path))
+                    continue
+            jobs.append((input_path, output_path))
+
+    logger.info(f"{len(jobs)} files to correct, {len(skipped_up_to_date)} up to date, "
+                f"{len(skipped_resumed)} already done in the resumed run")
+
+    # Build (or map) the compiled dictionary once so that the workers only map it
+    CorrectionEngine(correction_dict_file, protection_dict_file)
+
+    results = []
+    replacements = Counter()
+    manifest = open(manifest_path, 'a' if resume else 'w', encoding='utf-8') if manifest_path else None
+    try:
+        if jobs:
+            with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                                     initargs=(correction_dict_file, protection_dict_file, engine_name)) as pool:
+                futures = {pool.submit(_correct_file, str(input_path), str(output_path)): input_path
+                           for input_path, output_path in jobs}
+                for done_count, future in enumerate(as_completed(futures), 1):
+                    input_path = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {"original_file": str(input_path), "error": str(e)}
+
+                    stat = input_path.stat()
+                    entry = {
+                        "input": str(input_path),
+                        "output": result.get('corrected_file'),
+                        "status": 'failed' if 'error' in result else 'completed',
+                        "error": result.get('error'),
+                        "total_replacements": result.get('total_replacements', 0),
+                        "processing_time": result.get('processing_time'),
+                        "input_mtime": stat.st_mtime,
+                        "input_size": stat.st_size
+                    }
+                    results.append(entry)
+                    for key, count in result.get('replacements', {}).items():
+                        replacements[key] += count
+                    if manifest is not None:
+                        manifest.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                        manifest.flush()
+                    if entry['status'] == 'failed':
+                        logger.error(f"Failed {input_path}: {entry['error']}")
+                    if done_count % 100 == 0 or done_count == len(jobs):
+                        logger.info(f"Corrected {done_count}/{len(jobs)} files")
+    finally:
+        if manifest is not None:
+            manifest.close()
+
+    failed = [entry for entry in results if entry['status'] == 'failed']
+    elapsed_time = time.time() - start_time
+    return {
+        "inputs": inputs,
+        "engine": engine_name,
+        "started_at": start_time,
+        "elapsed_time": elapsed_time,
+        "files_found": len(jobs) + len(skipped_up_to_date) + len(skipped_resumed),
+        "corrected": len(results) - len(failed),
+        "failed": len(failed),
+        "skipped_up_to_date": len(skipped_up_to_date),
+        "skipped_resumed": len(skipped_resumed),
+        "total_replacements": sum(replacements.values()),
+        "files_per_second": len(results) / elapsed_time if elapsed_time else 0.0,
+        "top_replacements": dict(replacements.most_common(TOP_REPLACEMENTS)),
+        "failures": failed,
+        "files": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Correct SRT files in directory trees")
+    parser.add_argument('inputs', nargs='+', help="SRT files or directories")
+    parser.add_argument('--output-dir', help="Write outputs here, mirroring the input directories")
+    parser.add_argument('--workers', type=int, help="Number of worker processes (default: CPU count)")
+    parser.add_argument('--engine', default='reference', choices=engine_registry.names(),
+                        help="Correction engine")
+    parser.add_argument('--correction-dict', default=DEFAULT_CORRECTION_DICT, help="Correction dictionary")
+    parser.add_argument('--protection-dict', default=DEFAULT_PROTECTION_DICT, help="Protection dictionary")
+    parser.add_argument('--manifest', help="Record finished files here (JSON lines)")
+    parser.add_argument('--resume', action='store_true', help="Skip files the manifest records as completed")
+    parser.add_argument('--force', action='store_true', help="Also correct files whose output is up to date")
+    parser.add_argument('--report', help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    if args.resume and not args.manifest:
+        parser.error("--resume requires --manifest")
+
+    report = run_batch(args.inputs, args.output_dir, args.workers, args.engine, args.correction_dict,
+                       args.protection_dict, args.manifest, args.resume, args.force)
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            f.write(output)
+    logger.info(f"Corrected {report['corrected']} files ({report['failed']} failed, "
+                f"{report['skipped_up_to_date']} up to date, {report['skipped_resumed']} resumed) "
+                f"in {report['elapsed_time']:.1f} seconds")
+    sys.exit(1 if report['failed'] else 0)
+
+
+if __name__ == '__main__':
+    main()
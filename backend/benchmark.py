@@ -0,0 +1,219 @@
+"""
+Startup and memory benchmarks for the backend.
+
+    python benchmark.py cold-start [--runs 3] [--sample file.srt]
+    python benchmark.py workers [--workers 4] [--port 5099]
+    python benchmark.py all --output report.json
+
+cold-start imports the app in fresh interpreters, once after deleting the compiled
+dictionary (build) and once with it in place (mapped), and times the import and the
+first file. workers starts gunicorn with and without --preload, waits until every
+worker answers /api/ready and reports RSS/PSS per worker from /proc (Linux only).
+Run it from a deployed backend directory so that the real dictionaries are used.
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, Any, List, Optional
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+COMPILED_DICT_FILE = os.path.join(BACKEND_DIR, 'dictionaries', 'correction_dict.compiled')
+READY_TIMEOUT = 120  # Seconds to wait for all workers to become ready
+
+# Runs in a fresh interpreter inside the backend directory and prints one JSON line
+COLD_START_SCRIPT = r'''
+import json, sys, time
+start = time.time()
+import app
+import_seconds = time.time() - start
+sample = sys.argv[1]
+if sample:
+    with open(sample, 'r', encoding='utf-8') as f:
+        text = f.read()
+else:
+    terms = list(app.correction_engine.correction_dict)[:200]
+    text = ''.join(f"{i + 1}\n00:00:{i % 60:02d},000 --> 00:00:{i % 60:02d},500\n{term} and more text\n\n"
+                   for i, term in enumerate(terms))
+start = time.time()
+app.correction_engine.correct_subtitles(text)
+first_file_seconds = time.time() - start
+with open('/proc/self/status') as f:
+    rss = next((int(line.split()[1]) for line in f if line.startswith('VmRSS:')), None)
+print(json.dumps({"import_seconds": import_seconds, "first_file_seconds": first_file_seconds, "rss_kb": rss}))
+'''
+
+
+def read_memory(pid: int) -> Dict[str, int]:
+    """
+    Read the memory use of a process from /proc.
+
+    Args:
+        pid (int): Process id
+
+    Returns:
+        Dict[str, int]: rss, pss, shared and private sizes in kB
+    """
+    fields = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1])
+    except FileNotFoundError:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    fields['Rss'] = int(line.split()[1])
+    return {
+        "rss_kb": fields.get('Rss', 0),
+        "pss_kb": fields.get('Pss', 0),
+        "shared_kb": fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0),
+        "private_kb": fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    }
+
+
+def child_pids(pid: int) -> List[int]:
+    """List the direct children of a process."""
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(child) for child in f.read().split()]
+    except FileNotFoundError:
+        return []
+
+
+def measure_cold_start(runs: int = 3, sample: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Time app import and the first file in fresh interpreters.
+
+    Args:
+        runs (int): Runs per mode
+        sample (str, optional): SRT file for the first-file timing; generated from the dictionary if omitted
+
+    Returns:
+        Dict[str, Any]: Runs per mode ('build', 'mapped')
+    """
+    report = {}
+    for mode in ('build', 'mapped'):
+        results = []
+        for _ in range(runs):
+            if mode == 'build' and os.path.exists(COMPILED_DICT_FILE):
+                os.remove(COMPILED_DICT_FILE)
+            output = subprocess.run(
+                [sys.executable, '-c', COLD_START_SCRIPT, sample or ''],
+                cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+        report[mode] = {
+            "runs": results,
+            "import_seconds_min": min(r['import_seconds'] for r in results),
+            "first_file_seconds_min": min(r['first_file_seconds'] for r in results)
+        }
+        logger.info(f"Cold start ({mode}): import {report[mode]['import_seconds_min']:.3f}s, "
+                    f"first file {report[mode]['first_file_seconds_min']:.3f}s")
+    return report
+
+
+def wait_until_ready(port: int, workers: List[int], deadline: float) -> bool:
+    """Poll /api/ready until every worker has answered 200."""
+    ready = set()
+    url = f'http://127.0.0.1:{port}/api/ready'
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=5) as response:
+                ready.add(json.loads(response.read())['pid'])
+        except (urllib.error.URLError, ConnectionError, ValueError):
+            time.sleep(0.05)
+            continue
+        if workers and set(workers) <= ready:
+            return True
+    return False
+
+
+def measure_workers(workers: int = 4, port: int = 5099, preload: bool = True) -> Dict[str, Any]:
+    """
+    Start gunicorn and measure time to readiness and memory per worker.
+
+    Args:
+        workers (int): Number of workers
+        port (int): Local port to bind
+        preload (bool): Whether to pass --preload
+
+    Returns:
+        Dict[str, Any]: Readiness time and memory of the master and each worker
+    """
+    command = [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--bind', f'127.0.0.1:{port}']
+    if preload:
+        command.append('--preload')
+    command.append('wsgi:app')
+
+    start_time = time.time()
+    master = subprocess.Popen(command, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = start_time + READY_TIMEOUT
+        pids = []
+        while time.time() < deadline and len(pids) < workers:
+            time.sleep(0.05)
+            pids = child_pids(master.pid)
+        if not wait_until_ready(port, pids, deadline):
+            raise RuntimeError(f"Workers not ready after {READY_TIMEOUT} seconds")
+        ready_seconds = time.time() - start_time
+
+        worker_memory = [dict(pid=pid, **read_memory(pid)) for pid in pids]
+        report = {
+            "preload": preload,
+            "workers": workers,
+            "ready_seconds": ready_seconds,
+            "master": read_memory(master.pid),
+            "worker_memory": worker_memory,
+            "worker_rss_kb_avg": sum(w['rss_kb'] for w in worker_memory) / len(worker_memory),
+            "worker_pss_kb_avg": sum(w['pss_kb'] for w in worker_memory) / len(worker_memory),
+            "worker_private_kb_avg": sum(w['private_kb'] for w in worker_memory) / len(worker_memory)
+        }
+        logger.info(f"gunicorn preload={preload}: ready in {ready_seconds:.2f}s, "
+                    f"worker RSS {report['worker_rss_kb_avg']:.0f} kB, PSS {report['worker_pss_kb_avg']:.0f} kB, "
+                    f"private {report['worker_private_kb_avg']:.0f} kB")
+        return report
+    finally:
+        master.send_signal(signal.SIGTERM)
+        try:
+            master.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            master.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend startup and memory benchmarks")
+    parser.add_argument('benchmark', nargs='?', default='all', choices=['cold-start', 'workers', 'all'])
+    parser.add_argument('--runs', type=int, default=3, help="Cold start runs per mode")
+    parser.add_argument('--sample', help="SRT file used for the first-file timing")
+    parser.add_argument('--workers', type=int, default=4, help="Number of gunicorn workers")
+    parser.add_argument('--port', type=int, default=5099, help="Port used for the gunicorn runs")
+    parser.add_argument('--output', help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = {}
+    if args.benchmark in ('cold-start', 'all'):
+        report['cold_start'] = measure_cold_start(args.runs, args.sample)
+    if args.benchmark in ('workers', 'all'):
+        report['workers'] = [measure_workers(args.workers, args.port, preload) for preload in (False, True)]
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,399 @@
+import bisect
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+import unicodedata
+from array import array
+from typing import Callable, Dict, List, Tuple, Any, Optional
+
+import _sre
+
+try:
+    from re._compiler import _EXTRA_CASES as _IGNORECASE_FIXES  # Python 3.11+
+except ImportError:
+    try:
+        from sre_compile import _ignorecase_fixes as _IGNORECASE_FIXES
+    except ImportError:
+        _IGNORECASE_FIXES = None
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the file layout or the term classification changes
+FORMAT_VERSION = 1
+
+_MAGIC = b'LMCD'
+# magic, format version, little endian, term count, key count, posting count, short term count, blob size, fingerprint
+_HEADER = struct.Struct('<4sHBxIIIII32s')
+_ALIGN = 8
+
+# Term flags
+WORD_BOUNDARY = 1  # ASCII word, matched with \b...\b
+NULL_VALUE = 2     # correction value is None rather than a string
+
+# The candidate index is only exact if it folds case the same way the regex engine does
+PREFILTER = _IGNORECASE_FIXES is not None and hasattr(_sre, 'unicode_tolower')
+
+# Lowercase code point -> representative of its re.IGNORECASE equivalence class (e.g. 's', 'ſ')
+_CANONICAL: Dict[int, int] = {}
+if PREFILTER:
+    for _lower, _others in _IGNORECASE_FIXES.items():
+        _CANONICAL[_lower] = min((_lower,) + tuple(_others))
+
+
+# Folded characters whose class mixes word and non-word characters (iota and U+0345), so
+# that a \w-run in a term may not be a \w-run where it matches
+MIXED_WORD_FOLDS = frozenset(
+    chr(_CANONICAL[_lower]) for _lower, _others in (_IGNORECASE_FIXES or {}).items()
+    if len({re.match(r'\w', chr(_codepoint)) is not None for _codepoint in (_lower,) + tuple(_others)}) > 1
+)
+
+
+class _FoldTable(dict):
+    """str.translate table that maps characters to their case-insensitive class, filled on demand."""
+
+    def __missing__(self, codepoint: int) -> int:
+        lower = _sre.unicode_tolower(codepoint)
+        folded = _CANONICAL.get(lower, lower)
+        self[codepoint] = folded
+        return folded
+
+
+_FOLD = _FoldTable()
+
+
+def fold(text: str) -> str:
+    """
+    Fold text so that a re.IGNORECASE literal can only match where the folded forms are equal.
+
+    Args:
+        text (str): Text to fold
+
+    Returns:
+        str: Folded text of the same length
+    """
+    return text.translate(_FOLD)
+
+
+def _bigram_key(bigram: str) -> int:
+    return (ord(bigram[0]) << 21) | ord(bigram[1])
+
+
+def is_word_term(wrong: str) -> bool:
+    """Check if a term is an English word (ASCII letters only) and needs word boundaries."""
+    return all(c.isalpha() and ord(c) < 128 for c in wrong.strip())
+
+
+def fingerprint(correction_dict: Dict[str, str], protection_dict: Dict[str, str],
+                key_weights: Dict[str, int] = None) -> bytes:
+    """
+    Hash the dictionaries a compiled snapshot is built from.
+
+    Insertion order is part of the hash because it decides the order of equally long
+    terms. The format and Unicode versions are included because they change the folding.
+
+    Args:
+        correction_dict (Dict[str, str]): Correction dictionary
+        protection_dict (Dict[str, str]): Protection dictionary
+        key_weights (Dict[str, int], optional): Bigram frequencies used to choose index keys
+
+    Returns:
+        bytes: SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{FORMAT_VERSION}:{unicodedata.unidata_version}:{PREFILTER}\n".encode('utf-8'))
+    digest.update(json.dumps([list(correction_dict.items()), list(protection_dict.items())],
+                             ensure_ascii=False).encode('utf-8'))
+    if key_weights:
+        digest.update(json.dumps(sorted(key_weights.items()), ensure_ascii=False).encode('utf-8'))
+    return digest.digest()
+
+
+class CompiledDictionary:
+    """
+    Precompiled, memory-mappable form of the correction dictionary.
+
+    The file holds the terms that pass the protection check in the order the engine
+    applies them (longest first, stable), each with its value, folded form and
+    classification, plus an index from folded character bigrams to terms. For each
+    line the engine only runs the regexes of terms whose folded form occurs in the
+    folded line, and those regexes are compiled on first use. Every worker maps the
+    same file, so the index pages are shared and boot does not compile anything.
+    """
+
+    def __init__(self, buffer):
+        """
+        Open a compiled dictionary.
+
+        Args:
+            buffer: The file contents (mmap or bytes)
+
+        Raises:
+            ValueError: If the buffer is not a compiled dictionary of this format
+        """
+        if len(buffer) < _HEADER.size:
+            raise ValueError("Truncated compiled dictionary")
+        (magic, version, little_endian, term_count, key_count, posting_count,
+         short_count, blob_size, digest) = _HEADER.unpack_from(buffer, 0)
+        if magic != _MAGIC or version != FORMAT_VERSION or bool(little_endian) != (sys.byteorder == 'little'):
+            raise ValueError("Incompatible compiled dictionary")
+
+        self._buffer = buffer
+        self.fingerprint = digest
+        view = memoryview(buffer)
+        offset = _HEADER.size
+
+        def section(fmt: str, count: int) -> memoryview:
+            nonlocal offset
+            offset = -(-offset // _ALIGN) * _ALIGN
+            end = offset + count * struct.calcsize(fmt)
+            if end > len(buffer):
+                raise ValueError("Truncated compiled dictionary")
+            data = view[offset:end].cast(fmt)
+            offset = end
+            return data
+
+        self._keys = section('Q', key_count)
+        self._starts = section('I', key_count + 1)
+        self._postings = section('I', posting_count)
+        self._short = section('I', short_count)
+        self._offsets = section('I', 3 * term_count + 1)
+        self._flags = section('B', term_count)
+        self._blob = section('B', blob_size)
+
+        self._terms: List[Optional[Tuple[str, str, Any]]] = [None] * term_count
+        self._folded: List[Optional[str]] = [None] * term_count
+
+    def __len__(self) -> int:
+        return len(self._flags)
+
+    def prefault(self):
+        """Ask the kernel to read the whole file into the page cache ahead of the first lookups."""
+        madvise = getattr(self._buffer, 'madvise', None)
+        if madvise is not None and hasattr(mmap, 'MADV_WILLNEED'):
+            madvise(mmap.MADV_WILLNEED)
+
+    def _string(self, index: int) -> str:
+        return bytes(self._blob[self._offsets[index]:self._offsets[index + 1]]).decode('utf-8')
+
+    def term(self, term_id: int) -> str:
+        """Return a term as written in the dictionary, without compiling its pattern."""
+        term = self._terms[term_id]
+        return term[0] if term is not None else self._string(3 * term_id)
+
+    def folded(self, term_id: int) -> str:
+        """Return the folded form of a term."""
+        folded = self._folded[term_id]
+        if folded is None:
+            folded = self._folded[term_id] = self._string(3 * term_id + 2)
+        return folded
+
+    def item(self, term_id: int) -> Tuple[str, str, Any]:
+        """
+        Get a term with its compiled pattern, compiling it on first use.
+
+        Args:
+            term_id (int): Position of the term in application order
+
+        Returns:
+            Tuple[str, str, Any]: (wrong, correct, pattern)
+        """
+        term = self._terms[term_id]
+        if term is None:
+            wrong = self._string(3 * term_id)
+            flags = self._flags[term_id]
+            correct = None if flags & NULL_VALUE else self._string(3 * term_id + 1)
+            if flags & WORD_BOUNDARY:
+                # For English words, add word boundary markers
+                pattern = re.compile(r'\b' + re.escape(wrong) + r'\b', re.IGNORECASE)
+            else:
+                # For non-English terms (like Chinese), use simple pattern
+                pattern = re.compile(re.escape(wrong), re.IGNORECASE)
+            term = self._terms[term_id] = (wrong, correct, pattern)
+        return term
+
+    def candidates(self, line: str, after: int = -1, prefilter: bool = True) -> List[int]:
+        """
+        Find the terms that can match in a line.
+
+        Every term whose pattern matches the line is returned; a few returned terms
+        may still fail their word-boundary check.
+
+        Args:
+            line (str): The line to search
+            after (int): Only return terms applied after this one
+            prefilter (bool): Use the index; False returns every term, so that each
+                term's regex is tried on the line as the reference loop does
+
+        Returns:
+            List[int]: Term ids in application order
+        """
+        if not (prefilter and PREFILTER):
+            return list(range(after + 1, len(self)))
+
+        folded_line = fold(line)
+        found = set()
+        for term_id in self._short:
+            if term_id > after and self.folded(term_id) in folded_line:
+                found.add(term_id)
+
+        keys = self._keys
+        key_count = len(keys)
+        starts = self._starts
+        postings = self._postings
+        for bigram in {folded_line[i:i + 2] for i in range(len(folded_line) - 1)}:
+            key = _bigram_key(bigram)
+            index = bisect.bisect_left(keys, key)
+            if index == key_count or keys[index] != key:
+                continue
+            for term_id in postings[starts[index]:starts[index + 1]]:
+                if term_id > after and term_id not in found and self.folded(term_id) in folded_line:
+                    found.add(term_id)
+        return sorted(found)
+
+    @staticmethod
+    def build(correction_dict: Dict[str, str], protection_dict: Dict[str, str],
+              should_correct: Callable[[str, Dict[str, str]], bool],
+              timings: Dict[str, float] = None, key_weights: Dict[str, int] = None) -> bytes:
+        """
+        Build the compiled form of a dictionary.
+
+        Each term is indexed under one of its bigrams, and the engine verifies it on
+        every line containing that bigram. Without key_weights the bigram shared by the
+        fewest terms is used; with key_weights (how often each folded bigram occurs in
+        real subtitle lines, see term_stats) the one that occurs least in actual text
+        is, which verifies far fewer terms per line. Either way the result is exact.
+
+        Args:
+            correction_dict (Dict[str, str]): Correction dictionary
+            protection_dict (Dict[str, str]): Protection dictionary
+            should_correct (Callable): Protection check, called as should_correct(wrong, protection_dict)
+            timings (Dict[str, float], optional): Filled with protection and compile durations
+            key_weights (Dict[str, int], optional): Observed text frequency per folded bigram
+
+        Returns:
+            bytes: The file contents
+        """
+        stage_start = time.time()
+        allowed = [(wrong, correct) for wrong, correct in correction_dict.items()
+                   if should_correct(wrong, protection_dict)]
+        protection_time = time.time() - stage_start
+
+        # Sort correction items by length (longest first) for proper matching
+        allowed.sort(key=lambda x: len(x[0]), reverse=True)
+
+        folded_terms = [fold(wrong) for wrong, _ in allowed]
+        term_bigrams = [{folded[i:i + 2] for i in range(len(folded) - 1)} for folded in folded_terms]
+        frequency: Dict[str, int] = {}
+        for bigrams in term_bigrams:
+            for bigram in bigrams:
+                frequency[bigram] = frequency.get(bigram, 0) + 1
+
+        if key_weights:
+            weights = key_weights
+            rank = lambda bigram: (weights.get(bigram, 0), frequency[bigram])
+        else:
+            rank = frequency.__getitem__
+
+        # Index every term under its rarest bigram; shorter terms are checked on every line
+        index: Dict[int, List[int]] = {}
+        short = array('I')
+        for term_id, bigrams in enumerate(term_bigrams):
+            if bigrams:
+                rarest = min(sorted(bigrams), key=rank)
+                index.setdefault(_bigram_key(rarest), []).append(term_id)
+            else:
+                short.append(term_id)
+
+        keys = array('Q', sorted(index))
+        starts = array('I', [0])
+        postings = array('I')
+        for key in keys:
+            postings.extend(index[key])
+            starts.append(len(postings))
+
+        blob = bytearray()
+        offsets = array('I', [0])
+        flags = array('B')
+        for (wrong, correct), folded in zip(allowed, folded_terms):
+            for value in (wrong, correct or '', folded):
+                blob += value.encode('utf-8')
+                offsets.append(len(blob))
+            flags.append((WORD_BOUNDARY if is_word_term(wrong) else 0) | (NULL_VALUE if correct is None else 0))
+
+        data = bytearray(_HEADER.pack(_MAGIC, FORMAT_VERSION, sys.byteorder == 'little', len(allowed),
+                                      len(keys), len(postings), len(short), len(blob),
+                                      fingerprint(correction_dict, protection_dict, key_weights)))
+        for section in (keys, starts, postings, short, offsets, flags, blob):
+            data += bytes(-len(data) % _ALIGN)
+            data += section if isinstance(section, bytearray) else section.tobytes()
+
+        if timings is not None:
+            timings['protection'] = protection_time
+            timings['compile'] = time.time() - stage_start - protection_time
+        return bytes(data)
+
+    @classmethod
+    def open(cls, path: str) -> 'CompiledDictionary':
+        """
+        Memory-map a compiled dictionary file.
+
+        Args:
+            path (str): Path of the compiled file
+
+        Returns:
+            CompiledDictionary: The mapped dictionary
+        """
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer)
+
+    @classmethod
+    def load_or_build(cls, path: str, correction_dict: Dict[str, str], protection_dict: Dict[str, str],
+                      should_correct: Callable[[str, Dict[str, str]], bool],
+                      timings: Dict[str, float] = None,
+                      key_weights: Dict[str, int] = None) -> 'CompiledDictionary':
+        """
+        Map the compiled file if it matches the dictionaries, otherwise rebuild and rewrite it.
+
+        Args:
+            path (str): Path of the compiled file
+            correction_dict (Dict[str, str]): Correction dictionary
+            protection_dict (Dict[str, str]): Protection dictionary
+            should_correct (Callable): Protection check used when rebuilding
+            timings (Dict[str, float], optional): Filled with protection and compile durations
+            key_weights (Dict[str, int], optional): Observed bigram frequencies for choosing index keys
+
+        Returns:
+            CompiledDictionary: The compiled dictionary
+        """
+        stage_start = time.time()
+        digest = fingerprint(correction_dict, protection_dict, key_weights)
+        try:
+            compiled = cls.open(path)
+            if compiled.fingerprint == digest:
+                if timings is not None:
+                    timings['protection'] = 0.0
+                    timings['compile'] = time.time() - stage_start
+                return compiled
+        except (OSError, ValueError):
+            pass
+
+        data = cls.build(correction_dict, protection_dict, should_correct, timings, key_weights)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+            logger.info(f"Wrote compiled dictionary {path} ({len(data)} bytes)")
+            return cls.open(path)
+        except OSError as e:
+            logger.warning(f"Could not write compiled dictionary {path}: {str(e)}")
+            return cls(data)
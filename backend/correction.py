@@ -4,10 +4,14 @@ from collections import Counter
 from typing import Dict, Tuple, Any, List
 import time
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+from correction_engine import CorrectionEngine
+from tracing import tracer
+
 logger = logging.getLogger(__name__)
 
+# Subtitle blocks corrected between two progress callbacks (cancellation and time budget checks)
+BLOCKS_PER_CALLBACK = 20
+
 def validate_srt(text: str) -> bool:
     """
     Validate if the text is a properly formatted SRT file.
@@ -51,7 +55,8 @@ def word_boundary_match(text: str, term: str) -> List[Tuple[int, int]]:
 
     return matches
 
-def correct_subtitles(text: str, correction_dict: Dict[str, str], protection_dict: Dict[str, str]) -> Tuple[str, Dict[str, int]]:
+def correct_subtitles(text: str, correction_dict: Dict[str, str], protection_dict: Dict[str, str],
+                      callback=None) -> Tuple[str, Dict[str, int]]:
     """
     Correct subtitles based on correction and protection dictionaries.
 
@@ -59,6 +64,8 @@ def correct_subtitles(text: str, correction_dict: Dict[str, str], protection_dic
         text (str): The SRT file content
         correction_dict (Dict[str, str]): Dictionary of terms to correct
         protection_dict (Dict[str, str]): Dictionary of terms to protect
+        callback (callable, optional): Called with the progress percentage every
+            BLOCKS_PER_CALLBACK blocks; may raise (e.g. TaskCancelled) to stop
 
     Returns:
         Tuple[str, Dict[str, int]]: (corrected_text, replacements_counter)
@@ -70,13 +77,12 @@ def correct_subtitles(text: str, correction_dict: Dict[str, str], protection_dic
 
     start_time = time.time()
 
-    # Log dictionary sizes
-    logger.info(f"Correction dictionary size: {len(correction_dict)} items")
-    logger.info(f"Protection dictionary size: {len(protection_dict)} items")
+    # Per-block and per-term decisions go to the task trace; None when tracing is off
+    trace = tracer.current()
+    if trace is not None:
+        trace.event('dictionaries', "correction=%d protection=%d",
+                    len(correction_dict), len(protection_dict))
 
-    # Log a sample of the correction dictionary
-    sample_items = list(correction_dict.items())[:5]
-    logger.info(f"Sample correction items: {sample_items}")
     replacements = Counter()
 
     # Pre-process protection dictionary for faster lookup
@@ -137,8 +143,8 @@ def correct_subtitles(text: str, correction_dict: Dict[str, str], protection_dic
 
     # Process the text in chunks for better performance
     def process_subtitle_block(block: str) -> str:
-        # Log the block we're processing
-        logger.info(f"Processing subtitle block: {block}")
+        if trace is not None:
+            trace.event('block', "%r", block)
 
         # Extract the subtitle text part (after the timestamp line)
         lines = block.split('\n')
@@ -153,14 +159,14 @@ def correct_subtitles(text: str, correction_dict: Dict[str, str], protection_dic
                 subtitle_text += line + '\n'
 
         if not subtitle_text.strip():
-            logger.info("No subtitle text found in block")
+            if trace is not None:
+                trace.event('block.skip', "no subtitle text")
             return block
 
-        logger.info(f"Extracted subtitle text: {subtitle_text}")
-
         # Skip blocks that are just parenthetical comments
         if re.match(r'^\s*\([^)]*\)\s*$', subtitle_text):
-            logger.info("Skipping parenthetical block")
+            if trace is not None:
+                trace.event('block.skip', "parenthetical %r", subtitle_text)
             return block
 
         # Process the subtitle text
@@ -169,31 +175,25 @@ def correct_subtitles(text: str, correction_dict: Dict[str, str], protection_dic
 
         # Apply corrections with word boundary matching
         for wrong, correct in sorted_correction_items:
-            # Log the term we're checking
-            logger.info(f"Checking term: '{wrong}' -> '{correct}'")
-
             if should_correct(wrong, subtitle_text):
-                logger.info(f"Term '{wrong}' should be corrected")
                 pattern, replacement = correction_patterns.get(wrong, (None, correct))
                 if not pattern:
-                    logger.info(f"No pattern found for '{wrong}'")
+                    if trace is not None:
+                        trace.sample('term.nopattern', "%r", wrong)
                     continue
 
-                # Log the pattern we're using
-                logger.info(f"Using pattern: {pattern.pattern}")
-
                 # Find all matches
                 matches = list(pattern.finditer(subtitle_text))
-                logger.info(f"Found {len(matches)} matches for '{wrong}'")
+                if trace is not None and matches:
+                    trace.sample('term.match', "%r -> %r: %d matches", wrong, correct, len(matches))
 
                 for match in matches:
                     start, end = match.span()
-                    matched_text = subtitle_text[start:end]
-                    logger.info(f"Match: '{matched_text}' at positions {start}-{end}")
 
                     # Check if this position overlaps with any already replaced position
                     if any(start < pos[1] and end > pos[0] for pos in replaced_positions):
-                        logger.info(f"Skipping overlapping match at {start}-{end}")
+                        if trace is not None:
+                            trace.event('term.overlap', "%r at %d-%d", wrong, start, end)
                         continue
 
                     # Get the matched text to preserve case
@@ -219,11 +219,15 @@ def correct_subtitles(text: str, correction_dict: Dict[str, str], protection_dic
                     replaced_positions.append((start, start + len(final_replacement)))
                     replacements[(wrong, correct)] += 1
 
-                    logger.info(f"Replaced '{matched_text}' with '{final_replacement}'")
+                    if trace is not None:
+                        trace.event('term.replace', "%r -> %r at %d-%d", matched_text, final_replacement, start, end)
+            elif trace is not None:
+                trace.sample('term.protected', "%r", wrong)
 
         # If subtitle text was changed, update the original block
         if original_subtitle_text != subtitle_text:
-            logger.info(f"Subtitle text changed: '{original_subtitle_text}' -> '{subtitle_text}'")
+            if trace is not None:
+                trace.event('block.changed', "%r -> %r", original_subtitle_text, subtitle_text)
 
             # Reconstruct the block with the corrected subtitle text
             new_block = ''
@@ -240,11 +244,15 @@ def correct_subtitles(text: str, correction_dict: Dict[str, str], protection_dic
 
     # Split text into subtitle blocks (separated by blank lines)
     blocks = re.split(r'\n\s*\n', text)
-    logger.info(f"Split text into {len(blocks)} blocks")
-    for i, block in enumerate(blocks):
-        logger.info(f"Block {i}: {block}")
-
-    corrected_blocks = [process_subtitle_block(block) for block in blocks]
+    if trace is not None:
+        trace.event('split', "%d blocks", len(blocks))
+
+    corrected_blocks = []
+    for chunk_start in range(0, len(blocks), BLOCKS_PER_CALLBACK):
+        if callback:
+            callback(chunk_start / len(blocks) * 100)
+        corrected_blocks.extend(process_subtitle_block(block)
+                                for block in blocks[chunk_start:chunk_start + BLOCKS_PER_CALLBACK])
     corrected_text = '\n\n'.join(corrected_blocks)
 
     # Convert Counter to serializable format for JSON
@@ -256,3 +264,39 @@ def correct_subtitles(text: str, correction_dict: Dict[str, str], protection_dic
     logger.info(f"Correction completed in {elapsed_time:.2f} seconds with {sum(replacements.values())} replacements")
 
     return corrected_text, serializable_replacements
+
+
+class BlockCorrectionEngine(CorrectionEngine):
+    """
+    Engine adapter exposing the block-based correct_subtitles function through the
+    CorrectionEngine interface, so it can be selected from the engine registry.
+    """
+
+    def correct_subtitles(self, text: str, callback=None,
+                          timings: Dict[str, float] = None) -> Tuple[str, Dict[str, int]]:
+        """
+        Correct subtitles block by block using the module level correct_subtitles.
+
+        Args:
+            text (str): The SRT file content
+            callback (callable, optional): Callback function for progress updates
+            timings (Dict[str, float], optional): Filled with per-stage durations in seconds;
+                compilation and protection checks are part of the match stage for this engine
+
+        Returns:
+            Tuple[str, Dict[str, int]]: (corrected_text, replacements_counter)
+        """
+        stage_start = time.time()
+        valid = validate_srt(text)
+        if timings is not None:
+            timings['validate'] = time.time() - stage_start
+        if not valid:
+            return text, {}
+
+        stage_start = time.time()
+        corrected_text, replacements = correct_subtitles(text, self.correction_dict, self.protection_dict, callback)
+        if timings is not None:
+            timings['match'] = time.time() - stage_start
+        if callback:
+            callback(100)
+        return corrected_text, replacements
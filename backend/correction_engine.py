@@ -1,45 +1,296 @@
 import re
+import os
 import json
 import logging
 from collections import Counter
 from typing import Dict, Tuple, List, Any
 import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 
+from tracing import tracer
+from dictionary_version import DictionaryVersion
+from dictionary_journal import DictionaryJournal
+from compiled_dictionary import CompiledDictionary
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Files with at least this many lines are corrected in parallel chunks
+PARALLEL_MIN_LINES = int(os.environ.get('PARALLEL_MIN_LINES', '20000'))
+
+# Processes of the chunk pool; 1 turns intra-file parallelism off
+CHUNK_WORKERS = int(os.environ.get('CHUNK_WORKERS', '0')) or os.cpu_count() or 1
+
+# Chunks per worker, so that uneven chunks still keep every worker busy
+CHUNKS_PER_WORKER = 4
+
+# Engine of a chunk pool worker, created once by the initializer
+_chunk_engine = None
+
+
+def cue_aligned_chunks(lines: List[str], chunk_size: int) -> List[Tuple[int, int]]:
+    """
+    Split lines into chunks of about chunk_size lines that end after a blank line.
+
+    Args:
+        lines (List[str]): Lines of an SRT file
+        chunk_size (int): Minimum lines per chunk; the last chunk may be shorter
+
+    Returns:
+        List[Tuple[int, int]]: (start, end) line ranges covering all lines in order
+    """
+    bounds = []
+    start = 0
+    while start < len(lines):
+        end = min(start + max(chunk_size, 1), len(lines))
+        # Extend to the end of the cue, so that no cue is split across chunks
+        while end < len(lines) and lines[end - 1].strip():
+            end += 1
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+def _init_chunk_worker(engine_class: type, correction_dict_file: str, protection_dict_file: str):
+    """Create the engine of a chunk pool worker; the compiled dictionary is mapped, not rebuilt."""
+    global _chunk_engine
+    logging.getLogger().setLevel(logging.WARNING)
+    _chunk_engine = engine_class(correction_dict_file, protection_dict_file)
+
+
+def _correct_chunk(fingerprint: str, lines: List[str]):
+    """
+    Correct a chunk in a pool worker.
+
+    Returns None when the worker's dictionaries differ from the caller's, even after
+    reloading them from disk.
+    """
+    engine = _chunk_engine
+    for attempt in range(2):
+        matcher = engine.compiled_matcher(engine.snapshot)
+        if getattr(matcher, 'compiled', matcher).fingerprint == fingerprint:
+            return engine.correct_lines(lines, matcher)
+        if attempt == 0:
+            engine.load_dictionaries()
+    return None
+
+class TaskCancelled(Exception):
+    """
+    Raised by a progress callback to stop processing.
+
+    The engine checks its callback between chunks of a file, and process_file lets
+    this exception through instead of turning it into an error result.
+    """
+
+    def __init__(self, reason: str = 'requested'):
+        super().__init__(f"Task cancelled ({reason})")
+        self.reason = reason
+
+class DictionarySnapshot:
+    """
+    Correction and protection dictionaries together with the matcher compiled from them.
+
+    The engine replaces whole snapshots instead of mutating them, so a task that picked
+    up a snapshot keeps a consistent dictionary/pattern pair while a reload swaps in
+    the next one.
+    """
+
+    __slots__ = ('correction_dict', 'protection_dict', 'version', 'compiled')
+
+    def __init__(self, correction_dict: Dict[str, str], protection_dict: Dict[str, str],
+                 version: int = 0, compiled: CompiledDictionary = None):
+        self.correction_dict = correction_dict
+        self.protection_dict = protection_dict
+        self.version = version
+        self.compiled = compiled
+
 class CorrectionEngine:
     """
     SRT subtitle correction engine based on sub2024_9.py logic.
     This class handles the core correction functionality with optimizations for web usage.
     """
 
-    def __init__(self, correction_dict_file: str = "terms.json", protection_dict_file: str = "保护terms.json"):
+    def __init__(self, correction_dict_file: str = "terms.json", protection_dict_file: str = "保护terms.json",
+                 version_file: str = None):
         """
         Initialize the correction engine with dictionary files.
 
         Args:
             correction_dict_file (str): Path to the correction dictionary JSON file
             protection_dict_file (str): Path to the protection dictionary JSON file
+            version_file (str, optional): Path of the version stamp shared with other processes;
+                when set, dictionary saves are published and newer versions are reloaded
         """
         self.correction_dict_file = correction_dict_file
         self.protection_dict_file = protection_dict_file
-        self.correction_dict = {}
-        self.protection_dict = {}
+        # Binary matcher regenerated whenever the dictionaries change and shared by all workers
+        self.compiled_dict_file = str(Path(correction_dict_file).with_suffix('.compiled'))
+        # Observed bigram frequencies the compiled index keys are chosen by (see adapt_index)
+        self.index_weights_file = str(Path(correction_dict_file).with_suffix('.weights.json'))
+        # Optional TermStats store; when set, every processed file adds its hits to it
+        self.term_stats = None
+        self.version_stamp = DictionaryVersion(version_file) if version_file else None
+        self._snapshot = DictionarySnapshot({}, {})
+        self._reload_lock = threading.Lock()
+        self._edit_lock = threading.Lock()
+        self._journals = {}
+        # Process pool correcting chunks of very large files, started on first use
+        self._chunk_pool: ProcessPoolExecutor = None
+        self._pool_lock = threading.Lock()
+        # Set by warm_up(); inherited by workers forked after a preloaded warm-up
+        self.warmup_info: Dict[str, Any] = None
         self.load_dictionaries()
 
+    @property
+    def correction_dict(self) -> Dict[str, str]:
+        return self._snapshot.correction_dict
+
+    @correction_dict.setter
+    def correction_dict(self, value: Dict[str, str]):
+        snapshot = self._snapshot
+        self._snapshot = DictionarySnapshot(value, snapshot.protection_dict, snapshot.version)
+
+    @property
+    def protection_dict(self) -> Dict[str, str]:
+        return self._snapshot.protection_dict
+
+    @protection_dict.setter
+    def protection_dict(self, value: Dict[str, str]):
+        snapshot = self._snapshot
+        self._snapshot = DictionarySnapshot(snapshot.correction_dict, value, snapshot.version)
+
+    @property
+    def snapshot(self) -> DictionarySnapshot:
+        """The current dictionaries and their version, read together."""
+        return self._snapshot
+
+    @snapshot.setter
+    def snapshot(self, value: DictionarySnapshot):
+        # Adopted as is, so an engine sharing another's dictionaries also shares its compiled matcher
+        self._snapshot = value
+
+    @property
+    def dictionary_version(self) -> int:
+        """Version stamp of the dictionaries currently in use."""
+        return self._snapshot.version
+
     def load_dictionaries(self):
         """Load both correction and protection dictionaries from files."""
-        self.correction_dict = self.load_dictionary(self.correction_dict_file)
-        self.protection_dict = self.load_dictionary(self.protection_dict_file)
+        version = self.version_stamp.current() if self.version_stamp else 0
+        self._snapshot = DictionarySnapshot(
+            self.load_dictionary(self.correction_dict_file),
+            self.load_dictionary(self.protection_dict_file),
+            version
+        )
         logger.info(f"Loaded correction dictionary with {len(self.correction_dict)} entries")
         logger.info(f"Loaded protection dictionary with {len(self.protection_dict)} entries")
+        # Map (or regenerate) the compiled matcher now so the first request does not pay for it
+        self.compiled_matcher(self._snapshot)
+
+    @property
+    def matcher_compiled(self) -> bool:
+        """Whether the matcher of the current dictionaries is compiled."""
+        return self._snapshot.compiled is not None
+
+    def warm_up(self) -> float:
+        """
+        Compile the matcher of the current dictionaries and fault its pages in.
+
+        Run before gunicorn forks its workers (--preload), the compiled dictionary is
+        mapped once and shared by all workers instead of being built in each of them.
+
+        Returns:
+            float: Seconds spent warming up
+        """
+        start_time = time.time()
+        self.compiled_matcher(self._snapshot).prefault()
+        elapsed_time = time.time() - start_time
+        self.warmup_info = {"pid": os.getpid(), "seconds": elapsed_time, "at": time.time()}
+        logger.info(f"Correction engine warmed up in {elapsed_time:.3f} seconds")
+        return elapsed_time
+
+    def check_for_updates(self) -> bool:
+        """
+        Check the shared version stamp and reload in the background if it changed.
+
+        This is cheap enough to call before every task: it reads the memory-mapped
+        stamp and compares it with the version of the current snapshot.
+
+        Returns:
+            bool: True if a newer version exists and a reload is running
+        """
+        if self.version_stamp is None or self.version_stamp.current() == self._snapshot.version:
+            return False
+        if not self._reload_lock.acquire(blocking=False):
+            return True
+
+        thread = threading.Thread(target=self._reload_in_background, name='dictionary-reload')
+        thread.daemon = True
+        thread.start()
+        return True
+
+    def _reload_in_background(self):
+        """Load and compile the published dictionaries, then swap them in."""
+        try:
+            version = self.version_stamp.current()
+            snapshot = DictionarySnapshot(
+                self.load_dictionary(self.correction_dict_file),
+                self.load_dictionary(self.protection_dict_file),
+                version
+            )
+            self.compiled_matcher(snapshot)
+            if version > self._snapshot.version:
+                self._snapshot = snapshot
+                logger.info(f"Reloaded dictionaries at version {version} "
+                            f"({len(snapshot.correction_dict)} correction entries)")
+        except Exception as e:
+            logger.error(f"Error reloading dictionaries: {str(e)}")
+        finally:
+            self._reload_lock.release()
+
+    def _catch_up(self):
+        """Load the published dictionaries now if another process saved a newer version."""
+        if self.version_stamp is None:
+            return
+        version = self.version_stamp.current()
+        if version == self._snapshot.version:
+            return
+        self._snapshot = DictionarySnapshot(
+            self.load_dictionary(self.correction_dict_file),
+            self.load_dictionary(self.protection_dict_file),
+            version
+        )
+        logger.info(f"Caught up with dictionaries at version {version} before editing")
+
+    def _publish_version(self):
+        """Bump the shared version stamp after this process saved a dictionary."""
+        if self.version_stamp is None:
+            return
+        snapshot = self._snapshot
+        version = self.version_stamp.bump()
+        if version != snapshot.version + 1:
+            # Another process published in between, so the dictionaries here may lack its
+            # edits; keep the old version so that the next check reloads them
+            logger.info(f"Version moved to {version} while saving; reloading")
+            return
+        self._snapshot = DictionarySnapshot(snapshot.correction_dict, snapshot.protection_dict,
+                                            version, snapshot.compiled)
+
+    def journal_for(self, filename: str) -> DictionaryJournal:
+        """Get the edit journal of a dictionary file."""
+        journal = self._journals.get(filename)
+        if journal is None:
+            journal = self._journals.setdefault(filename, DictionaryJournal(filename))
+        return journal
 
     def load_dictionary(self, filename: str) -> Dict[str, str]:
         """
-        Load a dictionary from a JSON file.
+        Load a dictionary from a JSON file, replaying its edit journal.
 
         Args:
             filename (str): Path to the dictionary file
@@ -48,8 +299,7 @@ class CorrectionEngine:
             Dict[str, str]: The loaded dictionary
         """
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return self.journal_for(filename).load()
         except FileNotFoundError:
             logger.warning(f"Dictionary file {filename} not found. Creating empty dictionary.")
             return {}
@@ -59,7 +309,7 @@ class CorrectionEngine:
 
     def save_dictionary(self, dictionary: Dict[str, str], filename: str) -> bool:
         """
-        Save a dictionary to a JSON file.
+        Save a whole dictionary to a JSON file atomically, superseding its edit journal.
 
         Args:
             dictionary (Dict[str, str]): The dictionary to save
@@ -69,8 +319,7 @@ class CorrectionEngine:
             bool: True if successful, False otherwise
         """
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(dictionary, f, ensure_ascii=False, indent=2)
+            self.journal_for(filename).replace(dictionary)
             return True
         except Exception as e:
             logger.error(f"Error saving dictionary to {filename}: {str(e)}")
@@ -87,7 +336,10 @@ class CorrectionEngine:
             bool: True if successful, False otherwise
         """
         self.correction_dict = new_dict
-        return self.save_dictionary(self.correction_dict, self.correction_dict_file)
+        success = self.save_dictionary(self.correction_dict, self.correction_dict_file)
+        if success:
+            self._publish_version()
+        return success
 
     def update_protection_dict(self, new_dict: Dict[str, str]) -> bool:
         """
@@ -100,7 +352,56 @@ class CorrectionEngine:
             bool: True if successful, False otherwise
         """
         self.protection_dict = new_dict
-        return self.save_dictionary(self.protection_dict, self.protection_dict_file)
+        success = self.save_dictionary(self.protection_dict, self.protection_dict_file)
+        if success:
+            self._publish_version()
+        return success
+
+    def apply_term_edit(self, dict_type: str, action: str, term: str, value: str = '') -> bool:
+        """
+        Add, update or delete a single term by appending it to the dictionary's journal.
+
+        The whole dictionary file is only rewritten by background compaction once the
+        journal grows past its threshold.
+
+        Args:
+            dict_type (str): 'correction' or 'protection'
+            action (str): 'add', 'update' or 'delete'
+            term (str): The term to edit
+            value (str): The new value for add/update
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        filename = self.correction_dict_file if dict_type == 'correction' else self.protection_dict_file
+        journal = self.journal_for(filename)
+
+        with self._edit_lock:
+            # Edit on top of the latest published dictionaries, not a stale copy of them
+            self._catch_up()
+
+            # Copy so that snapshots in use by running tasks are never mutated
+            dictionary = dict(self.correction_dict if dict_type == 'correction' else self.protection_dict)
+            if action == 'delete':
+                dictionary.pop(term, None)
+            else:
+                dictionary[term] = value
+
+            try:
+                journal_size = journal.append(action, term, value)
+            except Exception as e:
+                logger.error(f"Error journaling {action} of '{term}' in {filename}: {str(e)}")
+                return False
+
+            if dict_type == 'correction':
+                self.correction_dict = dictionary
+            else:
+                self.protection_dict = dictionary
+            self._publish_version()
+
+        if journal_size >= journal.compact_threshold:
+            journal.compact_in_background()
+        return True
 
     def should_correct(self, wrong: str, protected_words: Dict[str, str]) -> bool:
         """
@@ -124,6 +425,78 @@ class CorrectionEngine:
                 return False
         return True
 
+    def compiled_matcher(self, snapshot: DictionarySnapshot,
+                         timings: Dict[str, float] = None) -> CompiledDictionary:
+        """
+        Get the compiled matcher of a snapshot, loading or building it on first use.
+
+        Args:
+            snapshot (DictionarySnapshot): Dictionaries to compile
+            timings (Dict[str, float], optional): Filled with protection and compile durations
+
+        Returns:
+            CompiledDictionary: Terms in application order with their candidate index
+        """
+        if snapshot.compiled is not None:
+            if timings is not None:
+                timings['protection'] = 0.0
+                timings['compile'] = 0.0
+            return snapshot.compiled
+
+        compiled = CompiledDictionary.load_or_build(
+            self.compiled_dict_file, snapshot.correction_dict, snapshot.protection_dict,
+            self.should_correct, timings, self.load_index_weights()
+        )
+
+        # Concurrent first uses may both compile; either result is equivalent
+        snapshot.compiled = compiled
+        return compiled
+
+    def load_index_weights(self) -> Dict[str, int]:
+        """
+        Load the bigram frequencies saved by adapt_index().
+
+        Returns:
+            Dict[str, int]: Lines per folded bigram, or None if the index is not adapted
+        """
+        try:
+            with open(self.index_weights_file, 'r', encoding='utf-8') as f:
+                return json.load(f) or None
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring index weights {self.index_weights_file}: {str(e)}")
+            return None
+
+    def adapt_index(self, weights: Dict[str, int]) -> int:
+        """
+        Re-key the compiled index by how often bigrams occur in processed subtitles.
+
+        Terms keep their application order, so the output does not change; each term is
+        only verified on lines containing the bigram of it that is rarest in real text.
+        The weights are saved next to the dictionary and the version is published, so
+        every worker switches to the re-keyed matcher (built once, then mapped).
+
+        Args:
+            weights (Dict[str, int]): Lines per folded bigram, from TermStats.bigram_frequencies();
+                empty to go back to keys chosen by dictionary frequency
+
+        Returns:
+            int: Number of bigram weights in use
+        """
+        temp_path = f"{self.index_weights_file}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(weights, f, ensure_ascii=False)
+        os.replace(temp_path, self.index_weights_file)
+
+        snapshot = self._snapshot
+        adapted = DictionarySnapshot(snapshot.correction_dict, snapshot.protection_dict, snapshot.version)
+        self.compiled_matcher(adapted)
+        self._snapshot = adapted
+        self._publish_version()
+        logger.info(f"Adapted the compiled index to {len(weights)} observed bigram frequencies")
+        return len(weights)
+
     def validate_srt(self, text: str) -> bool:
         """
         Validate if the text is a properly formatted SRT file.
@@ -141,102 +514,239 @@ class CorrectionEngine:
             return False
         return True
 
-    def correct_subtitles(self, text: str, callback=None) -> Tuple[str, Dict[Tuple[str, str], int]]:
+    def correct_subtitles(self, text: str, callback=None, timings: Dict[str, float] = None,
+                          prefilter: bool = True) -> Tuple[str, Dict[Tuple[str, str], int]]:
         """
         Correct subtitles based on correction and protection dictionaries.
 
         Args:
             text (str): The SRT file content
             callback (callable, optional): Callback function for progress updates
+            timings (Dict[str, float], optional): Filled with per-stage durations in seconds
+                (validate, protection, compile, match)
+            prefilter (bool): Only try the terms the compiled index finds in a line. False
+                runs every term's regex on every line, serially: the ground truth that
+                verification compares the optimized paths against
 
         Returns:
             Tuple[str, Dict[Tuple[str, str], int]]: (corrected_text, replacements_counter)
         """
-        if not self.validate_srt(text):
+        stage_start = time.time()
+        valid = self.validate_srt(text)
+        if timings is not None:
+            timings['validate'] = time.time() - stage_start
+        if not valid:
             logger.warning("Invalid SRT format detected")
             return text, {}
 
-        # Precompile patterns for better performance
-        patterns = {}
-        for wrong, correct in self.correction_dict.items():
-            if self.should_correct(wrong, self.protection_dict):
-                # Check if the term is an English word (contains only ASCII letters)
-                is_english_word = all(c.isalpha() and ord(c) < 128 for c in wrong.strip())
+        # The matcher is compiled once per dictionary snapshot
+        matcher = self.compiled_matcher(self._snapshot, timings)
+        stage_start = time.time()
 
-                if is_english_word:
-                    # For English words, add word boundary markers
-                    pattern = re.compile(r'\b' + re.escape(wrong) + r'\b', re.IGNORECASE)
-                else:
-                    # For non-English terms (like Chinese), use simple pattern
-                    pattern = re.compile(re.escape(wrong), re.IGNORECASE)
-
-                patterns[wrong] = (pattern, correct)
-
-        # Sort correction items by length (longest first) for proper matching
-        sorted_correction_items = sorted(
-            [(wrong, correct, pattern) for wrong, (pattern, correct) in patterns.items()],
-            key=lambda x: len(x[0]),
-            reverse=True
-        )
-
-        # Process in chunks for better performance and memory usage
-        chunk_size = 1000  # Process 1000 lines at a time
         lines = text.split('\n')
         total_lines = len(lines)
-        corrected_lines = []
-        replacements = Counter()
-
-        for chunk_start in range(0, total_lines, chunk_size):
-            chunk_end = min(chunk_start + chunk_size, total_lines)
-            chunk = lines[chunk_start:chunk_end]
-
-            # Update progress
-            if callback:
-                callback(chunk_start / total_lines * 100)
-
-            for i, line in enumerate(chunk):
-                # Skip timestamp lines
-                if '-->' in line:
-                    corrected_lines.append(line)
-                    continue
-
-                # Skip lines that are just parenthetical comments
-                if re.match(r'^\s*\([^)]*\)\s*$', line):
-                    continue
-
-                original_line = line
-                replaced_positions = []  # Track replaced positions to avoid overlaps
-
-                for wrong, correct, pattern in sorted_correction_items:
-                    def replace_func(match):
-                        start, end = match.span()
-                        # Check if this position overlaps with any already replaced position
-                        if any(start < pos[1] and end > pos[0] for pos in replaced_positions):
-                            return match.group(0)  # If already replaced, return original text
-
-                        replaced = correct if correct else ''
-                        if match.group(0).isupper():
-                            replaced = replaced.upper()
-                        elif match.group(0).istitle():
-                            replaced = replaced.capitalize()
-
-                        # Record this position as replaced
-                        replaced_positions.append((start, end))
-                        return replaced
-
-                    new_line, count = pattern.subn(replace_func, line)
-                    if count > 0:
-                        line = new_line
-                        replacements[(wrong, correct)] += count
 
-                corrected_lines.append(line)
+        # Task trace for per-chunk and per-replacement decisions; None when tracing is off
+        trace = tracer.current()
+        if trace is not None:
+            trace.event('compile', "%d patterns, %d lines", len(matcher), total_lines)
+
+        # Very large files are split at cue boundaries and corrected by the chunk pool;
+        # traced tasks stay serial so that every replacement is recorded in the trace
+        corrected_lines = None
+        if prefilter and trace is None and CHUNK_WORKERS > 1 and total_lines >= PARALLEL_MIN_LINES:
+            corrected_lines, replacements = self._correct_parallel(lines, matcher, callback)
+
+        if corrected_lines is None:
+            # Process in chunks for better performance and memory usage
+            chunk_size = 1000  # Process 1000 lines at a time
+            corrected_lines = []
+            replacements = Counter()
+            for chunk_start in range(0, total_lines, chunk_size):
+                chunk_end = min(chunk_start + chunk_size, total_lines)
+                if trace is not None:
+                    trace.event('chunk', "lines %d-%d", chunk_start, chunk_end)
+
+                # Update progress
+                if callback:
+                    callback(chunk_start / total_lines * 100)
+
+                chunk_lines, chunk_replacements = self.correct_lines(
+                    lines[chunk_start:chunk_end], matcher, trace, chunk_start, prefilter)
+                corrected_lines.extend(chunk_lines)
+                replacements.update(chunk_replacements)
 
         # Final progress update
         if callback:
             callback(100)
 
+        if timings is not None:
+            timings['match'] = time.time() - stage_start
+
         return '\n'.join(corrected_lines), replacements
 
+    def correct_lines(self, lines: List[str], matcher: CompiledDictionary, trace=None,
+                      line_offset: int = 0, prefilter: bool = True) -> Tuple[List[str], Counter]:
+        """
+        Correct a run of subtitle lines.
+
+        Lines are corrected independently of each other, so any split of a file into
+        runs gives the same result as correcting it in one go.
+
+        Args:
+            lines (List[str]): The lines to correct
+            matcher (CompiledDictionary): Compiled matcher of the dictionaries in use
+            trace (optional): Task trace receiving line and replacement events
+            line_offset (int): Line number of the first line, for the trace
+            prefilter (bool): Only try the terms the matcher finds in a line; False tries all
+
+        Returns:
+            Tuple[List[str], Counter]: (corrected lines without dropped lines, replacements_counter)
+        """
+        corrected_lines = []
+        replacements = Counter()
+
+        for i, line in enumerate(lines):
+            # Skip timestamp lines
+            if '-->' in line:
+                corrected_lines.append(line)
+                continue
+
+            # Skip lines that are just parenthetical comments
+            if re.match(r'^\s*\([^)]*\)\s*$', line):
+                if trace is not None:
+                    trace.event('line.drop', "%d: %r", line_offset + i, line)
+                continue
+
+            replaced_positions = []  # Track replaced positions to avoid overlaps
+
+            # Only terms that occur in the line can match; patterns compile on first use
+            candidates = matcher.candidates(line, prefilter=prefilter)
+            index = 0
+            while index < len(candidates):
+                term_id = candidates[index]
+                index += 1
+                wrong, correct, pattern = matcher.item(term_id)
+
+                def replace_func(match):
+                    start, end = match.span()
+                    # Check if this position overlaps with any already replaced position
+                    if any(start < pos[1] and end > pos[0] for pos in replaced_positions):
+                        return match.group(0)  # If already replaced, return original text
+
+                    replaced = correct if correct else ''
+                    if match.group(0).isupper():
+                        replaced = replaced.upper()
+                    elif match.group(0).istitle():
+                        replaced = replaced.capitalize()
+
+                    # Record this position as replaced
+                    replaced_positions.append((start, end))
+                    return replaced
+
+                new_line, count = pattern.subn(replace_func, line)
+                if count > 0:
+                    if trace is not None:
+                        trace.event('term.replace', "%d: %r -> %r x%d", line_offset + i, wrong, correct, count)
+                    if new_line != line:
+                        # Later terms are matched against the corrected line
+                        candidates = matcher.candidates(new_line, after=term_id, prefilter=prefilter)
+                        index = 0
+                    line = new_line
+                    replacements[(wrong, correct)] += count
+
+            corrected_lines.append(line)
+
+        return corrected_lines, replacements
+
+    def chunk_pool(self) -> ProcessPoolExecutor:
+        """
+        Get the process pool correcting chunks of large files, starting it on first use.
+
+        Workers are spawned rather than forked, because the engine runs inside threaded
+        servers, and each maps the compiled dictionary of its own engine instance.
+
+        Returns:
+            ProcessPoolExecutor: The pool
+        """
+        with self._pool_lock:
+            if self._chunk_pool is None:
+                self._chunk_pool = ProcessPoolExecutor(
+                    max_workers=CHUNK_WORKERS, mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_chunk_worker,
+                    initargs=(type(self), self.correction_dict_file, self.protection_dict_file)
+                )
+                logger.info(f"Started chunk pool with {CHUNK_WORKERS} workers")
+            return self._chunk_pool
+
+    def shutdown_chunk_pool(self):
+        """Stop the chunk pool; the next large file starts a new one."""
+        with self._pool_lock:
+            pool, self._chunk_pool = self._chunk_pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _correct_parallel(self, lines: List[str], matcher: CompiledDictionary,
+                          callback=None) -> Tuple[List[str], Counter]:
+        """
+        Correct the lines of a large file in cue-aligned chunks on the chunk pool.
+
+        Workers check that their compiled dictionary has the fingerprint of the caller's
+        matcher; a chunk a worker cannot correct with the same dictionaries is corrected
+        here instead, so the result is always that of the serial path.
+
+        Args:
+            lines (List[str]): All lines of the file
+            matcher (CompiledDictionary): Compiled matcher of the caller's snapshot
+            callback (callable, optional): Callback function for progress updates
+
+        Returns:
+            Tuple[List[str], Counter]: (corrected lines, replacements_counter), or
+                (None, None) if the pool is unavailable
+        """
+        compiled = getattr(matcher, 'compiled', matcher)
+        bounds = cue_aligned_chunks(lines, -(-len(lines) // (CHUNK_WORKERS * CHUNKS_PER_WORKER)))
+        try:
+            pool = self.chunk_pool()
+            futures = {pool.submit(_correct_chunk, compiled.fingerprint, lines[start:end]): index
+                       for index, (start, end) in enumerate(bounds)}
+        except (BrokenProcessPool, RuntimeError) as e:
+            logger.warning(f"Chunk pool unavailable, correcting serially: {str(e)}")
+            self.shutdown_chunk_pool()
+            return None, None
+
+        results = [None] * len(bounds)
+        done_lines = 0
+        try:
+            for future in as_completed(futures):
+                index = futures[future]
+                results[index] = future.result()
+                start, end = bounds[index]
+                done_lines += end - start
+                if callback:
+                    callback(done_lines / len(lines) * 100)
+        except BrokenProcessPool as e:
+            logger.warning(f"Chunk pool failed, correcting serially: {str(e)}")
+            self.shutdown_chunk_pool()
+            return None, None
+        except BaseException:
+            # E.g. TaskCancelled raised by the progress callback: drop the chunks not started yet
+            for future in futures:
+                future.cancel()
+            raise
+
+        # Stitch the chunks back in order
+        corrected_lines = []
+        replacements = Counter()
+        for (start, end), result in zip(bounds, results):
+            if result is None:
+                logger.info(f"Worker dictionaries differ, correcting lines {start}-{end} locally")
+                result = self.correct_lines(lines[start:end], matcher, line_offset=start)
+            corrected_lines.extend(result[0])
+            replacements.update(result[1])
+        logger.info(f"Corrected {len(lines)} lines in {len(bounds)} chunks")
+        return corrected_lines, replacements
+
     def process_file(self, file_path: str, output_path: str = None, callback=None) -> Dict[str, Any]:
         """
         Process a single SRT file and save the corrected version.
@@ -244,20 +754,24 @@ class CorrectionEngine:
         Args:
             file_path (str): Path to the SRT file
             output_path (str, optional): Path to save the corrected file
-            callback (callable, optional): Callback function for progress updates
+            callback (callable, optional): Callback function for progress updates; it may
+                raise TaskCancelled to stop processing, which is passed on to the caller
 
         Returns:
             Dict[str, Any]: Processing results including replacements
         """
         start_time = time.time()
+        timings = {}
 
         try:
             # Read the file
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
+            timings['read'] = time.time() - start_time
 
             # Process the file
-            corrected_content, replacements = self.correct_subtitles(content, callback)
+            matcher_cache = 'hit' if self._snapshot.compiled is not None else 'miss'
+            corrected_content, replacements = self.correct_subtitles(content, callback, timings=timings)
 
             # Determine output path if not provided
             if not output_path:
@@ -265,8 +779,15 @@ class CorrectionEngine:
                 output_path = path.with_name(f"{path.stem}_corrected{path.suffix}")
 
             # Save the corrected file
+            write_start = time.time()
             with open(output_path, 'w', encoding='utf-8') as f:
                 f.write(corrected_content)
+            timings['write'] = time.time() - write_start
+
+            if self.term_stats is not None:
+                stats_start = time.time()
+                self.term_stats.record(replacements, content)
+                timings['stats'] = time.time() - stats_start
 
             elapsed_time = time.time() - start_time
 
@@ -286,12 +807,17 @@ class CorrectionEngine:
                 "corrected_file": str(output_path),
                 "replacements": string_replacements,
                 "total_replacements": sum(replacements.values()),
-                "processing_time": elapsed_time
+                "cue_count": content.count('-->'),
+                "matcher_cache": matcher_cache,
+                "processing_time": elapsed_time,
+                "timings": timings
             }
 
             logger.info(f"Processed {file_path} in {elapsed_time:.2f} seconds with {sum(replacements.values())} replacements")
             return result
 
+        except TaskCancelled:
+            raise
         except Exception as e:
             logger.error(f"Error processing file {file_path}: {str(e)}")
             return {
@@ -6,6 +6,8 @@ from typing import Dict, Tuple, List, Any
 import time
 from pathlib import Path
 
+from correction_engine import TaskCancelled
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -141,18 +143,25 @@ class CorrectionEngine:
             return False
         return True
 
-    def correct_subtitles(self, text: str, callback=None) -> Tuple[str, Dict[Tuple[str, str], int]]:
+    def correct_subtitles(self, text: str, callback=None,
+                          timings: Dict[str, float] = None) -> Tuple[str, Dict[Tuple[str, str], int]]:
         """
         Correct subtitles based on correction and protection dictionaries.
 
         Args:
             text (str): The SRT file content
             callback (callable, optional): Callback function for progress updates
+            timings (Dict[str, float], optional): Filled with per-stage durations in seconds
+                (validate, protection, compile, match)
 
         Returns:
             Tuple[str, Dict[Tuple[str, str], int]]: (corrected_text, replacements_counter)
         """
-        if not self.validate_srt(text):
+        stage_start = time.time()
+        valid = self.validate_srt(text)
+        if timings is not None:
+            timings['validate'] = time.time() - stage_start
+        if not valid:
             logger.warning("Invalid SRT format detected")
             return text, {}
 
@@ -165,8 +174,13 @@ class CorrectionEngine:
 
         # Precompile patterns for better performance
         patterns = {}
+        protection_time = 0.0
+        stage_start = time.time()
         for wrong_lower, correct in case_insensitive_dict.items():
-            if self.should_correct(wrong_lower, self.protection_dict):
+            check_start = time.time()
+            allowed = self.should_correct(wrong_lower, self.protection_dict)
+            protection_time += time.time() - check_start
+            if allowed:
                 # Check if the term is an English word (contains only ASCII letters)
                 is_english_word = all(c.isalpha() and ord(c) < 128 for c in wrong_lower.strip())
 
@@ -185,6 +199,10 @@ class CorrectionEngine:
             key=lambda x: len(x[0]),
             reverse=True
         )
+        if timings is not None:
+            timings['protection'] = protection_time
+            timings['compile'] = time.time() - stage_start - protection_time
+        stage_start = time.time()
 
         # Process in chunks for better performance and memory usage
         chunk_size = 1000  # Process 1000 lines at a time
@@ -239,6 +257,9 @@ class CorrectionEngine:
         if callback:
             callback(100)
 
+        if timings is not None:
+            timings['match'] = time.time() - stage_start
+
         return '\n'.join(corrected_lines), replacements
 
     def process_file(self, file_path: str, output_path: str = None, callback=None) -> Dict[str, Any]:
@@ -254,14 +275,16 @@ class CorrectionEngine:
             Dict[str, Any]: Processing results including replacements
         """
         start_time = time.time()
+        timings = {}
 
         try:
             # Read the file
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
+            timings['read'] = time.time() - start_time
 
             # Process the file
-            corrected_content, replacements = self.correct_subtitles(content, callback)
+            corrected_content, replacements = self.correct_subtitles(content, callback, timings=timings)
 
             # Determine output path if not provided
             if not output_path:
@@ -269,8 +292,10 @@ class CorrectionEngine:
                 output_path = path.with_name(f"{path.stem}_corrected{path.suffix}")
 
             # Save the corrected file
+            write_start = time.time()
             with open(output_path, 'w', encoding='utf-8') as f:
                 f.write(corrected_content)
+            timings['write'] = time.time() - write_start
 
             elapsed_time = time.time() - start_time
 
@@ -290,12 +315,16 @@ class CorrectionEngine:
                 "corrected_file": str(output_path),
                 "replacements": string_replacements,
                 "total_replacements": sum(replacements.values()),
-                "processing_time": elapsed_time
+                "cue_count": content.count('-->'),
+                "processing_time": elapsed_time,
+                "timings": timings
             }
 
             logger.info(f"Processed {file_path} in {elapsed_time:.2f} seconds with {sum(replacements.values())} replacements")
             return result
 
+        except TaskCancelled:
+            raise
         except Exception as e:
             logger.error(f"Error processing file {file_path}: {str(e)}")
             return {
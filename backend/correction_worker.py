@@ -0,0 +1,192 @@
+"""
+Correction worker daemon consuming the durable job queue.
+
+    TASK_BACKEND=queue gunicorn --workers 4 --preload --bind 0.0.0.0:5002 wsgi:app
+    python correction_worker.py
+
+With TASK_BACKEND=queue the web tier only saves uploads, enqueues the task and reports
+its status; workers started with this script do the correction. Each worker leases one
+job at a time, publishes its progress through heartbeats and records the result in the
+queue. A worker that dies loses its lease, and the job is retried by another worker
+(up to JOB_MAX_ATTEMPTS attempts). Start as many workers as there are cores to spare,
+on this host or on other hosts sharing the backend directory.
+
+Jobs are claimed in scheduling order: interactive single-file uploads shortest first,
+batches by weighted fair queuing across clients. Besides its main lane, every worker
+has an express lane that only takes interactive jobs, so they never wait behind a
+batch that is already running.
+
+A job cancelled through DELETE /api/tasks/<id> stops between files or chunks and is
+recorded as cancelled with its partial results, without retrying.
+
+A resumable upload is held in the queue until its first file is complete. The
+worker then corrects its files as they arrive, waiting (with its lease kept alive)
+while the rest of the upload comes in.
+
+SIGTERM and SIGINT stop the worker after the job it is running.
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+import app as web
+from job_queue import JobQueue, LEASE_SECONDS, CANCELLED
+from metrics import registry as metrics_registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 1.0   # Seconds between claims while the queue is empty
+PURGE_INTERVAL = 3600         # Seconds between purges of finished jobs
+
+
+class CorrectionWorker:
+    """Claims jobs from the queue and runs them as web tasks, one at a time per lane."""
+
+    def __init__(self, queue: JobQueue, worker_id: str = None, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 lease_seconds: float = LEASE_SECONDS, express: bool = True):
+        """
+        Initialize the worker.
+
+        Args:
+            queue (JobQueue): Queue shared with the web tier
+            worker_id (str, optional): Lease owner name; defaults to host:pid
+            poll_interval (float): Seconds between claims while the queue is empty
+            lease_seconds (float): Lease duration, renewed every third of it
+            express (bool): Run an express lane for interactive jobs next to the main lane
+        """
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.express = express
+        self.stats = {'completed': 0, 'failed': 0, 'cancelled': 0}
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._last_purge = 0.0
+
+    def stop(self):
+        self._stop.set()
+
+    def _keep_lease(self, job_id: str, worker_id: str, done: threading.Event):
+        """Renew the lease while a job runs, also during long files without progress updates."""
+        while not done.wait(self.lease_seconds / 3):
+            if not self.queue.heartbeat(job_id, worker_id, lease_seconds=self.lease_seconds):
+                logger.warning(f"Lost the lease of job {job_id}")
+                return
+
+    def run_job(self, job, worker_id: str = None):
+        """
+        Run a claimed job and record its outcome in the queue.
+
+        Args:
+            job (Dict[str, Any]): Job returned by JobQueue.claim()
+            worker_id (str, optional): Lease owner that claimed the job; defaults to the worker id
+        """
+        worker_id = worker_id or self.worker_id
+        job_id = job['id']
+        task = dict(job['payload'], status='queued', progress=0, files_processed=0, results=[])
+        web.processing_tasks[job_id] = task
+        logger.info(f"Running job {job_id} (attempt {job['attempts']}/{job['max_attempts']}, "
+                    f"{task.get('file_count', 0)} files)")
+
+        def publish():
+            self.queue.heartbeat(job_id, worker_id, web.task_snapshot(task), self.lease_seconds)
+
+        done = threading.Event()
+        keeper = threading.Thread(target=self._keep_lease, args=(job_id, worker_id, done), daemon=True)
+        keeper.start()
+        try:
+            web.process_multiple_files_task(job_id, persist=publish)
+        finally:
+            done.set()
+            keeper.join()
+            web.processing_tasks.pop(job_id, None)
+
+        if task.get('status') == 'completed':
+            self.queue.complete(job_id, worker_id, web.task_snapshot(task))
+            outcome = 'completed'
+        elif task.get('status') == 'cancelled':
+            # Cancelled on request or out of time budget; another attempt would not help
+            self.queue.complete(job_id, worker_id, web.task_snapshot(task), status=CANCELLED)
+            outcome = 'cancelled'
+        else:
+            self.queue.fail(job_id, worker_id, task.get('error') or 'Task failed', web.task_snapshot(task))
+            outcome = 'failed'
+        with self._stats_lock:
+            self.stats[outcome] += 1
+
+    def run_once(self, interactive_only: bool = False) -> bool:
+        """
+        Claim and run one job.
+
+        Args:
+            interactive_only (bool): Only take interactive jobs (the express lane)
+
+        Returns:
+            bool: False if no job was ready
+        """
+        worker_id = f"{self.worker_id}/express" if interactive_only else self.worker_id
+        job = self.queue.claim(worker_id, self.lease_seconds, interactive_only)
+        if job is None:
+            return False
+        self.run_job(job, worker_id)
+        return True
+
+    def _run_lane(self, interactive_only: bool):
+        while not self._stop.is_set():
+            try:
+                if self.run_once(interactive_only):
+                    continue
+            except Exception as e:
+                logger.error(f"Error running job: {str(e)}")
+            self._stop.wait(self.poll_interval)
+
+    def run(self):
+        """Run jobs until stop() is called."""
+        logger.info(f"Correction worker {self.worker_id} consuming {self.queue.path}")
+        express = None
+        if self.express:
+            express = threading.Thread(target=self._run_lane, args=(True,), daemon=True)
+            express.start()
+        while not self._stop.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except Exception as e:
+                logger.error(f"Error running job: {str(e)}")
+
+            if time.time() - self._last_purge > PURGE_INTERVAL:
+                self._last_purge = time.time()
+                purged = self.queue.purge(web.TASK_CLEANUP_THRESHOLD)
+                if purged:
+                    logger.info(f"Purged {purged} finished jobs")
+            self._stop.wait(self.poll_interval)
+        if express is not None:
+            express.join()
+        logger.info(f"Stopped worker {self.worker_id}: {self.stats['completed']} completed, "
+                    f"{self.stats['failed']} failed, {self.stats['cancelled']} cancelled")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process correction tasks queued by the web app")
+    parser.add_argument('--queue', default=web.JOB_QUEUE_FILE, help="Job queue database")
+    parser.add_argument('--interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help="Seconds between claims while the queue is empty")
+    parser.add_argument('--worker-id', help="Name of this worker in job leases (default: host:pid)")
+    parser.add_argument('--no-express', action='store_true', help="Do not run the express lane for interactive jobs")
+    args = parser.parse_args()
+
+    # Metrics of this process are aggregated with the web workers' on this host
+    metrics_registry.start()
+    worker = CorrectionWorker(JobQueue(args.queue), args.worker_id, args.interval, express=not args.no_express)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: worker.stop())
+    worker.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+import logging
+import time
+from typing import Callable, Dict, List, Any
+
+from compiled_dictionary import CompiledDictionary
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of related terms listed per reported entry
+MAX_RELATED = 10
+
+
+def analyze_dictionary(correction_dict: Dict[str, str], protection_dict: Dict[str, str],
+                       should_correct: Callable[[str, Dict[str, str]], bool]) -> Dict[str, Any]:
+    """
+    Report correction entries that cost matcher time without (always) doing anything.
+
+    The analysis follows the engine's semantics: terms are applied longest first (in
+    dictionary order for equal lengths) with case-insensitive regexes, and a term does
+    not replace text that overlaps an earlier replacement. It finds
+
+    - dead entries: filtered out by the protection dictionary, so never compiled;
+    - duplicates: case variants of an earlier term; the earlier one replaces every
+      occurrence first, so the variant never changes the text;
+    - shadowed entries: terms that also match inside a longer term, and so never
+      fire where that longer term occurs;
+    - cascading entries: terms whose replacement is matched again by a later term.
+
+    Instead of comparing all pairs, every term and every replacement is looked up in
+    the candidate index of the compiled dictionary, which returns exactly the later
+    terms that can match inside it.
+
+    Args:
+        correction_dict (Dict[str, str]): Correction dictionary
+        protection_dict (Dict[str, str]): Protection dictionary
+        should_correct (Callable): Protection check, called as should_correct(wrong, protection_dict)
+
+    Returns:
+        Dict[str, Any]: Findings per category, a summary and the effect of a cleanup
+    """
+    start_time = time.time()
+    compiled_data = CompiledDictionary.build(correction_dict, protection_dict, should_correct)
+    compiled = CompiledDictionary(compiled_data)
+
+    dead = [{"term": wrong, "value": correct, "reason": "protected"}
+            for wrong, correct in correction_dict.items() if not should_correct(wrong, protection_dict)]
+
+    duplicate_of: Dict[int, int] = {}
+    shadowed_by: Dict[int, List[int]] = {}
+    cascades: Dict[int, List[int]] = {}
+    cascade_targets = set()
+
+    for term_id in range(len(compiled)):
+        wrong, correct, _ = compiled.item(term_id)
+        folded = compiled.folded(term_id)
+
+        # Later terms that match inside this term
+        for other_id in compiled.candidates(wrong, after=term_id):
+            other_wrong, _, other_pattern = compiled.item(other_id)
+            if compiled.folded(other_id) == folded:
+                duplicate_of.setdefault(other_id, term_id)
+            elif other_pattern.search(wrong):
+                shadowed_by.setdefault(other_id, []).append(term_id)
+
+        # Later terms that match inside this term's replacement
+        if correct:
+            for other_id in compiled.candidates(correct, after=term_id):
+                if compiled.item(other_id)[2].search(correct):
+                    cascades.setdefault(term_id, []).append(other_id)
+                    cascade_targets.add(other_id)
+
+    def entry(term_id: int) -> Dict[str, Any]:
+        wrong, correct, _ = compiled.item(term_id)
+        return {"term": wrong, "value": correct}
+
+    duplicate_groups: Dict[int, List[int]] = {}
+    for variant_id, kept_id in duplicate_of.items():
+        duplicate_groups.setdefault(kept_id, []).append(variant_id)
+    duplicates = []
+    removable_variants = []
+    for kept_id, variant_ids in sorted(duplicate_groups.items()):
+        kept = entry(kept_id)
+        variants = []
+        for variant_id in sorted(variant_ids):
+            variant = entry(variant_id)
+            variant["conflicting"] = (variant["value"] or '').lower() != (kept["value"] or '').lower()
+            # A variant that another replacement produces can still fire on that output
+            variant["removable"] = variant_id not in cascade_targets
+            if variant["removable"]:
+                removable_variants.append(variant["term"])
+            variants.append(variant)
+        duplicates.append(dict(kept, variants=variants))
+
+    shadowed = [dict(entry(term_id), shadow_count=len(longer_ids),
+                     shadowed_by=[compiled.item(longer_id)[0] for longer_id in longer_ids[:MAX_RELATED]])
+                for term_id, longer_ids in sorted(shadowed_by.items())]
+
+    cascading = [dict(entry(term_id),
+                      triggers=[compiled.item(other_id)[0] for other_id in other_ids[:MAX_RELATED]])
+                 for term_id, other_ids in sorted(cascades.items())]
+
+    # Effect of removing the dead entries and the removable duplicates
+    removed = {item["term"] for item in dead}
+    removed.update(removable_variants)
+    cleaned = {wrong: correct for wrong, correct in correction_dict.items() if wrong not in removed}
+    cleaned_data = CompiledDictionary.build(cleaned, protection_dict, should_correct)
+    cleaned_count = len(CompiledDictionary(cleaned_data))
+
+    elapsed_time = time.time() - start_time
+    logger.info(f"Analyzed {len(correction_dict)} dictionary entries in {elapsed_time:.2f} seconds")
+    return {
+        "entries": len(correction_dict),
+        "dead": dead,
+        "duplicates": duplicates,
+        "shadowed": shadowed,
+        "cascading": cascading,
+        "summary": {
+            "dead": len(dead),
+            "duplicates": len(duplicate_of),
+            "shadowed": len(shadowed),
+            "cascading": len(cascading),
+            "removable": len(removed)
+        },
+        "cleanup": {
+            "removable_terms": sorted(removed),
+            "patterns_before": len(compiled),
+            "patterns_after": cleaned_count,
+            "compiled_bytes_before": len(compiled_data),
+            "compiled_bytes_after": len(cleaned_data)
+        },
+        "analysis_time": elapsed_time
+    }
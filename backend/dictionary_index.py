@@ -0,0 +1,286 @@
+import heapq
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple, Any
+
+logger = logging.getLogger(__name__)
+
+# Searchable fields of a dictionary entry
+TERM_FIELD = 'term'
+VALUE_FIELD = 'value'
+SEARCH_FIELDS = (TERM_FIELD, VALUE_FIELD)
+
+# Fuzzy search: candidates kept for edit-distance re-ranking per requested result
+RERANK_FACTOR = 5
+DEFAULT_MIN_SIMILARITY = 0.3
+
+
+def ngrams(text: str) -> Set[str]:
+    """
+    Get the index keys of a normalized string: its trigrams, or its characters if it is shorter.
+
+    Args:
+        text (str): Normalized text
+
+    Returns:
+        Set[str]: Trigrams and single characters
+    """
+    grams = set(text)
+    grams.update(text[i:i + 3] for i in range(len(text) - 2))
+    return grams
+
+
+def normalize_term(term: str) -> str:
+    """Normalize a term for similarity: case and whitespace are ignored ('# Child' == '#child')."""
+    return ''.join(term.lower().split())
+
+
+def padded_trigrams(text: str) -> Set[str]:
+    """Trigrams of a normalized term padded at both ends, so that short terms still have several."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str) -> int:
+    """
+    Compute the Levenshtein distance between two strings.
+
+    Args:
+        a (str): First string
+        b (str): Second string
+
+    Returns:
+        int: Minimum number of insertions, deletions and substitutions
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+class TermIndex:
+    """
+    Inverted index over the terms and values of a dictionary for substring search.
+
+    Every entry is indexed under the trigrams and the characters of its lower-cased
+    term and value. A query is answered by intersecting the posting sets of its
+    trigrams (or characters, for queries shorter than three characters), smallest
+    first, and checking the remaining candidates with a plain substring test, so
+    the results are exactly those of a linear "query in text" scan.
+
+    Entry ids grow with insertion, so sorting matches by id gives dictionary order.
+    The index follows a dictionary incrementally: sync() only re-indexes the entries
+    that were added, changed or removed.
+
+    A second index maps the padded trigrams of each normalized term to its entry for
+    fuzzy search: candidates are ranked by trigram (Dice) similarity and the best ones
+    re-ranked by edit distance.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._source: Optional[Dict[str, str]] = None
+        self._ids: Dict[str, int] = {}
+        self._entries: Dict[int, Tuple[str, str]] = {}
+        self._lowered: Dict[int, Tuple[str, str]] = {}
+        self._postings: Dict[str, Dict[str, Set[int]]] = {field: {} for field in SEARCH_FIELDS}
+        self._normalized: Dict[int, str] = {}
+        self._similarity_postings: Dict[str, Set[int]] = {}
+        self._similarity_sizes: Dict[int, int] = {}
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _index(self, entry_id: int, term: str, value: str):
+        lowered = (term.lower(), value.lower())
+        self._entries[entry_id] = (term, value)
+        self._lowered[entry_id] = lowered
+        for field, text in zip(SEARCH_FIELDS, lowered):
+            postings = self._postings[field]
+            for gram in ngrams(text):
+                postings.setdefault(gram, set()).add(entry_id)
+
+        normalized = self._normalized[entry_id] = normalize_term(term)
+        grams = padded_trigrams(normalized)
+        self._similarity_sizes[entry_id] = len(grams)
+        for gram in grams:
+            self._similarity_postings.setdefault(gram, set()).add(entry_id)
+
+    def _unindex(self, entry_id: int):
+        del self._entries[entry_id]
+        for field, text in zip(SEARCH_FIELDS, self._lowered.pop(entry_id)):
+            postings = self._postings[field]
+            for gram in ngrams(text):
+                ids = postings.get(gram)
+                if ids is not None:
+                    ids.discard(entry_id)
+                    if not ids:
+                        del postings[gram]
+
+        del self._similarity_sizes[entry_id]
+        for gram in padded_trigrams(self._normalized.pop(entry_id)):
+            ids = self._similarity_postings.get(gram)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self._similarity_postings[gram]
+
+    def _set(self, term: str, value: str) -> bool:
+        value = value if isinstance(value, str) else ''
+        entry_id = self._ids.get(term)
+        if entry_id is None:
+            # New terms are appended to the dictionary, so they get the next id
+            entry_id = self._ids[term] = self._next_id
+            self._next_id += 1
+        elif self._entries[entry_id][1] == value:
+            return False
+        else:
+            self._unindex(entry_id)
+        self._index(entry_id, term, value)
+        return True
+
+    def _delete(self, term: str) -> bool:
+        entry_id = self._ids.pop(term, None)
+        if entry_id is None:
+            return False
+        self._unindex(entry_id)
+        return True
+
+    def sync(self, dictionary: Dict[str, str]) -> int:
+        """
+        Bring the index up to date with a dictionary.
+
+        Dictionaries are replaced rather than mutated by the engine, so an unchanged
+        dictionary is recognized by identity and costs nothing.
+
+        Args:
+            dictionary (Dict[str, str]): Current dictionary
+
+        Returns:
+            int: Number of entries re-indexed
+        """
+        if dictionary is self._source:
+            return 0
+        with self._lock:
+            if dictionary is self._source:
+                return 0
+            changed = 0
+            for term in [term for term in self._ids if term not in dictionary]:
+                changed += self._delete(term)
+            for term, value in dictionary.items():
+                changed += self._set(term, value)
+            self._source = dictionary
+        if changed:
+            logger.info(f"Re-indexed {changed} dictionary entries for search")
+        return changed
+
+    def apply_edit(self, action: str, term: str, value: str, dictionary: Dict[str, str]):
+        """
+        Apply a single term edit that produced a new dictionary, without diffing it.
+
+        Does nothing before the first sync(); that sync indexes the whole dictionary.
+
+        Args:
+            action (str): 'add', 'update' or 'delete'
+            term (str): The edited term
+            value (str): The new value for add/update
+            dictionary (Dict[str, str]): The dictionary after the edit
+        """
+        with self._lock:
+            if self._source is None:
+                return
+            if action == 'delete':
+                self._delete(term)
+            else:
+                self._set(term, value)
+            self._source = dictionary
+
+    def search(self, query: str, fields: Tuple[str, ...] = (TERM_FIELD,),
+               limit: Optional[int] = None, offset: int = 0) -> Tuple[List[Tuple[str, str]], int]:
+        """
+        Find the entries whose term or value contains the query, ignoring case.
+
+        Args:
+            query (str): Substring to look for
+            fields (Tuple[str, ...]): Fields to search ('term', 'value')
+            limit (int, optional): Maximum number of entries to return
+            offset (int): Number of matching entries to skip
+
+        Returns:
+            Tuple[List[Tuple[str, str]], int]: (term, value) pairs in dictionary order, and the total match count
+        """
+        query = query.lower()
+        if len(query) >= 3:
+            grams = {query[i:i + 3] for i in range(len(query) - 2)}
+        else:
+            grams = set(query)
+
+        with self._lock:
+            matches: Set[int] = set()
+            for field in fields:
+                postings = self._postings[field]
+                sets = sorted((postings.get(gram, set()) for gram in grams), key=len)
+                if not sets or not sets[0]:
+                    continue
+                candidates = sets[0].intersection(*sets[1:]) if len(sets) > 1 else sets[0]
+                position = SEARCH_FIELDS.index(field)
+                lowered = self._lowered
+                matches.update(entry_id for entry_id in candidates
+                               if entry_id not in matches and query in lowered[entry_id][position])
+
+            ordered = sorted(matches)
+            total = len(ordered)
+            page = ordered[offset:offset + limit] if limit is not None else ordered[offset:]
+            return [self._entries[entry_id] for entry_id in page], total
+
+    def similar(self, query: str, k: int = 10,
+                min_similarity: float = DEFAULT_MIN_SIMILARITY) -> List[Dict[str, Any]]:
+        """
+        Find the terms most similar to a query, e.g. to warn about near-duplicate entries.
+
+        Args:
+            query (str): Term to compare against
+            k (int): Maximum number of terms to return
+            min_similarity (float): Minimum trigram similarity of a candidate (0-1)
+
+        Returns:
+            List[Dict[str, Any]]: Entries with term, value, similarity (1 - normalized edit
+                distance), distance and trigram similarity, most similar first
+        """
+        normalized = normalize_term(query)
+        if not normalized or k <= 0:
+            return []
+        grams = padded_trigrams(normalized)
+
+        with self._lock:
+            shared = Counter()
+            for gram in grams:
+                shared.update(self._similarity_postings.get(gram, ()))
+
+            sizes = self._similarity_sizes
+            scored = ((2.0 * count / (len(grams) + sizes[entry_id]), entry_id)
+                      for entry_id, count in shared.items())
+            candidates = heapq.nlargest(k * RERANK_FACTOR, (item for item in scored if item[0] >= min_similarity))
+
+            results = []
+            for trigram_similarity, entry_id in candidates:
+                other = self._normalized[entry_id]
+                distance = edit_distance(normalized, other)
+                term, value = self._entries[entry_id]
+                results.append({
+                    "term": term,
+                    "value": value,
+                    "similarity": round(1.0 - distance / max(len(normalized), len(other), 1), 4),
+                    "distance": distance,
+                    "trigram_similarity": round(trigram_similarity, 4)
+                })
+
+        results.sort(key=lambda result: (-result['similarity'], -result['trigram_similarity'], result['term']))
+        return results[:k]
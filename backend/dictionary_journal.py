@@ -0,0 +1,232 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows (desktop GUI); journals are only shared between gunicorn workers
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Journal size at which the snapshot is rewritten and the journal emptied
+COMPACT_THRESHOLD_BYTES = int(os.environ.get('JOURNAL_COMPACT_BYTES', str(64 * 1024)))
+
+
+class DictionaryJournal:
+    """
+    Append-only journal of term edits on top of a JSON dictionary snapshot.
+
+    Each add/update/delete appends one JSON line to <snapshot>.journal, so an edit
+    costs O(record) instead of rewriting the whole dictionary. Loading reads the
+    snapshot and replays the journal. Compaction folds the journal into a new snapshot
+    written atomically (temporary file + rename) and empties the journal.
+
+    Every record sets or deletes a single key (or replaces the whole dictionary), so
+    replaying records that are already contained in the snapshot is harmless; this is
+    what makes a crash between writing the snapshot and emptying the journal safe.
+    """
+
+    def __init__(self, snapshot_path: str, compact_threshold: int = COMPACT_THRESHOLD_BYTES):
+        """
+        Initialize the journal of a dictionary file.
+
+        Args:
+            snapshot_path (str): Path to the JSON dictionary snapshot
+            compact_threshold (int): Journal size in bytes that triggers compaction
+        """
+        self.snapshot_path = snapshot_path
+        self.path = f"{snapshot_path}.journal"
+        self.lock_path = f"{snapshot_path}.lock"
+        self.compact_threshold = compact_threshold
+        self._compacting = threading.Lock()
+
+    @contextmanager
+    def _locked(self, exclusive: bool = True):
+        # Serialize appends and compaction across processes sharing the files
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _apply(self, dictionary: Dict[str, str], record: Dict[str, Any]) -> Dict[str, str]:
+        op = record.get('op')
+        if op in ('add', 'update'):
+            dictionary[record['term']] = record.get('value', '')
+        elif op == 'delete':
+            dictionary.pop(record['term'], None)
+        elif op == 'replace':
+            dictionary = dict(record.get('dictionary', {}))
+        else:
+            logger.warning(f"Ignoring unknown journal operation {op!r} in {self.path}")
+        return dictionary
+
+    def _read_snapshot(self) -> Optional[Dict[str, str]]:
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _replay(self, dictionary: Dict[str, str]) -> Dict[str, str]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line_number, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final record from a crash mid-append; earlier records are intact
+                        logger.warning(f"Skipping unreadable record {line_number} in {self.path}")
+                        continue
+                    dictionary = self._apply(dictionary, record)
+        except FileNotFoundError:
+            pass
+        return dictionary
+
+    def load(self) -> Dict[str, str]:
+        """
+        Load the snapshot and replay the journal on top of it.
+
+        Returns:
+            Dict[str, str]: The current dictionary
+
+        Raises:
+            FileNotFoundError: If neither the snapshot nor the journal exists
+            json.JSONDecodeError: If the snapshot is not valid JSON
+        """
+        with self._locked(exclusive=False):
+            snapshot = self._read_snapshot()
+            if snapshot is None and not os.path.exists(self.path):
+                raise FileNotFoundError(self.snapshot_path)
+            return self._replay(snapshot or {})
+
+    @staticmethod
+    def _end_torn_record(fd: int):
+        # A crash mid-append can leave a last record without its newline; end it first so
+        # that the new record starts on its own line instead of being glued onto it
+        size = os.fstat(fd).st_size
+        if size == 0:
+            return
+        os.lseek(fd, size - 1, os.SEEK_SET)
+        if os.read(fd, 1) != b'\n':
+            os.write(fd, b'\n')
+
+    def append(self, op: str, term: str, value: str = '') -> int:
+        """
+        Append a term edit to the journal and flush it to disk.
+
+        Args:
+            op (str): 'add', 'update' or 'delete'
+            term (str): The term being edited
+            value (str): The new value for add/update
+
+        Returns:
+            int: Size of the journal in bytes after the append
+        """
+        record = {"op": op, "term": term, "ts": time.time()}
+        if op != 'delete':
+            record["value"] = value
+        data = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._locked():
+            fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                self._end_torn_record(fd)
+                os.write(fd, data)
+                os.fsync(fd)
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+        return size
+
+    def _write_snapshot(self, dictionary: Dict[str, str]):
+        temp_path = f"{self.snapshot_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(dictionary, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.snapshot_path)
+
+    def _truncate(self):
+        if os.path.exists(self.path):
+            with open(self.path, 'w', encoding='utf-8'):
+                pass
+
+    def replace(self, dictionary: Dict[str, str]):
+        """
+        Replace the whole dictionary.
+
+        Pending journal records are superseded by a 'replace' record first, so they can
+        never be replayed over the new snapshot even if the process dies mid-save.
+
+        Args:
+            dictionary (Dict[str, str]): The new dictionary
+        """
+        with self._locked():
+            if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                data = (json.dumps({"op": "replace", "dictionary": dictionary, "ts": time.time()},
+                                   ensure_ascii=False) + '\n').encode('utf-8')
+                fd = os.open(self.path, os.O_RDWR | os.O_APPEND)
+                try:
+                    self._end_torn_record(fd)
+                    os.write(fd, data)
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            self._write_snapshot(dictionary)
+            self._truncate()
+
+    def compact(self) -> bool:
+        """
+        Fold the journal into a new snapshot.
+
+        The state is rebuilt from disk rather than from memory, so edits appended by
+        other processes are never lost.
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            with self._locked():
+                if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+                    return True
+                dictionary = self._replay(self._read_snapshot() or {})
+                self._write_snapshot(dictionary)
+                self._truncate()
+            logger.info(f"Compacted journal of {self.snapshot_path} ({len(dictionary)} entries)")
+            return True
+        except Exception as e:
+            logger.error(f"Error compacting journal of {self.snapshot_path}: {str(e)}")
+            return False
+
+    def compact_in_background(self) -> bool:
+        """
+        Start a background compaction unless one is already running in this process.
+
+        Returns:
+            bool: True if a compaction was started
+        """
+        if not self._compacting.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                self.compact()
+            finally:
+                self._compacting.release()
+
+        thread = threading.Thread(target=run, name='journal-compaction')
+        thread.daemon = True
+        thread.start()
+        return True
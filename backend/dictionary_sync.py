@@ -0,0 +1,139 @@
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple, Any
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of term changes remembered for delta requests
+MAX_CHANGES = 50000
+
+# Sort orders of paginated dictionary listings; prefix with '-' for descending
+SORT_KEYS = ('order', 'term', 'value', 'length')
+
+
+class ChangeLog:
+    """
+    Record of term changes per dictionary version, for clients that sync deltas.
+
+    The log follows the engine's dictionary snapshots: whenever a new dictionary
+    object shows up, it is diffed against the previous one and every added, changed
+    or removed term is recorded with the snapshot's version. A snapshot may briefly
+    carry the version before its own edit is published, so changes at the requested
+    version itself are included too; re-sending a change is harmless because each one
+    is the term's state at that point.
+
+    Versions before the first snapshot this process saw, or that fell out of the log,
+    cannot be answered with a delta; the caller then sends the whole dictionary.
+    """
+
+    def __init__(self, max_changes: int = MAX_CHANGES):
+        self._lock = threading.Lock()
+        self._source: Optional[Dict[str, str]] = None
+        self._changes: List[Tuple[int, str, Optional[str]]] = []
+        self._max_changes = max_changes
+        self.oldest_version: Optional[int] = None
+
+    def sync(self, dictionary: Dict[str, str], version: int) -> int:
+        """
+        Record the changes between the last seen dictionary and this one.
+
+        Args:
+            dictionary (Dict[str, str]): Current dictionary
+            version (int): Version of the snapshot it belongs to
+
+        Returns:
+            int: Number of changes recorded
+        """
+        if dictionary is self._source:
+            return 0
+        with self._lock:
+            if dictionary is self._source:
+                return 0
+            previous = self._source
+            self._source = dictionary
+            if previous is None:
+                self.oldest_version = version
+                return 0
+
+            changes = [(version, term, None) for term in previous if term not in dictionary]
+            changes.extend((version, term, value) for term, value in dictionary.items()
+                           if term not in previous or previous[term] != value)
+            self._changes.extend(changes)
+            if len(self._changes) > self._max_changes:
+                dropped = len(self._changes) - self._max_changes
+                # Deltas since a dropped version would be incomplete
+                self.oldest_version = self._changes[dropped - 1][0] + 1
+                del self._changes[:dropped]
+            return len(changes)
+
+    def since(self, version: int) -> Optional[Tuple[Dict[str, str], List[str]]]:
+        """
+        Collect the changes made at or after a version.
+
+        Args:
+            version (int): Version the client last synced
+
+        Returns:
+            Optional[Tuple[Dict[str, str], List[str]]]: (upserted terms, deleted terms), or None
+                if the log does not reach back to that version
+        """
+        with self._lock:
+            if self.oldest_version is None or version < self.oldest_version:
+                return None
+            latest: Dict[str, Optional[str]] = {}
+            for change_version, term, value in self._changes:
+                if change_version >= version:
+                    latest.pop(term, None)
+                    latest[term] = value
+
+        upserted = {term: value for term, value in latest.items() if value is not None}
+        deleted = [term for term, value in latest.items() if value is None]
+        return upserted, deleted
+
+
+class SortedView:
+    """Sorted term orders of a dictionary, cached until the dictionary object is replaced."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._orders: Dict[str, Tuple[Dict[str, str], List[str]]] = {}
+
+    def page(self, dictionary: Dict[str, str], sort: str = 'order', limit: Optional[int] = None,
+             offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Get a page of dictionary entries in the requested order.
+
+        Args:
+            dictionary (Dict[str, str]): The dictionary
+            sort (str): One of SORT_KEYS, optionally prefixed with '-' for descending
+            limit (int, optional): Maximum number of entries
+            offset (int): Number of entries to skip
+
+        Returns:
+            List[Dict[str, Any]]: Entries with term and value
+
+        Raises:
+            ValueError: If the sort key is unknown
+        """
+        key = sort.lstrip('-')
+        if key not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key '{sort}'")
+
+        with self._lock:
+            cached = self._orders.get(sort)
+            if cached is not None and cached[0] is dictionary:
+                terms = cached[1]
+            else:
+                terms = list(dictionary)
+                if key == 'term':
+                    terms.sort(key=str.lower)
+                elif key == 'value':
+                    terms.sort(key=lambda term: (str(dictionary[term] or '').lower(), term.lower()))
+                elif key == 'length':
+                    terms.sort(key=len)
+                if sort.startswith('-'):
+                    terms.reverse()
+                self._orders[sort] = (dictionary, terms)
+
+        page = terms[offset:offset + limit] if limit is not None else terms[offset:]
+        return [{"term": term, "value": dictionary[term]} for term in page]
@@ -0,0 +1,64 @@
+import logging
+import mmap
+import os
+import struct
+
+try:
+    import fcntl
+except ImportError:  # Windows (desktop GUI); version stamps are only shared between gunicorn workers
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_STAMP = struct.Struct('<Q')
+
+
+class DictionaryVersion:
+    """
+    Monotonic dictionary version stamp shared by all processes through a memory-mapped file.
+
+    Reading the current version is a single unpack from the shared mapping (no system
+    call), so workers can check it before every task. Writers bump the stamp under an
+    exclusive file lock after saving a dictionary.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open (and create if needed) the version file.
+
+        Args:
+            path (str): Path of the version file
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < _STAMP.size:
+                os.ftruncate(fd, _STAMP.size)
+            self._mmap = mmap.mmap(fd, _STAMP.size, access=mmap.ACCESS_WRITE)
+        finally:
+            os.close(fd)
+
+    def current(self) -> int:
+        """Return the current version stamp."""
+        return _STAMP.unpack_from(self._mmap, 0)[0]
+
+    def bump(self) -> int:
+        """
+        Increment the version stamp.
+
+        Returns:
+            int: The new version
+        """
+        with open(self.path, 'r+b') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                version = self.current() + 1
+                _STAMP.pack_into(self._mmap, 0, version)
+                self._mmap.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        logger.info(f"Dictionary version bumped to {version}")
+        return version
@@ -0,0 +1,227 @@
+import difflib
+import logging
+import threading
+import time
+import weakref
+from typing import Dict, Any, List, Optional
+
+from correction_engine import CorrectionEngine
+
+logger = logging.getLogger(__name__)
+
+# Reference engines built for candidates that no shared reference engine matches, one per candidate
+_references = weakref.WeakKeyDictionary()
+_references_lock = threading.Lock()
+
+
+def replacement_key(key: Any) -> str:
+    """
+    Convert a replacement counter key to the "wrong -> correct" string form.
+
+    Args:
+        key (Any): A (wrong, correct) tuple or an already formatted string
+
+    Returns:
+        str: The string key used in task results
+    """
+    if isinstance(key, tuple):
+        wrong, correct = key
+        return f"{wrong} -> {correct}"
+    return str(key)
+
+
+def normalize_replacements(replacements: Dict[Any, int]) -> Dict[str, int]:
+    """
+    Normalize a replacements counter so that engines with tuple keys and
+    engines with string keys can be compared.
+
+    Args:
+        replacements (Dict[Any, int]): Replacement counts from an engine
+
+    Returns:
+        Dict[str, int]: Replacement counts keyed by "wrong -> correct"
+    """
+    normalized = {}
+    for key, value in (replacements or {}).items():
+        string_key = replacement_key(key)
+        normalized[string_key] = normalized.get(string_key, 0) + value
+    return normalized
+
+
+def diff_results(reference_text: str, reference_replacements: Dict[Any, int],
+                 candidate_text: str, candidate_replacements: Dict[Any, int],
+                 max_differences: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Compare the output of the reference engine with the output of a candidate engine.
+
+    Lines are aligned with a sequence matcher so that a line dropped by one engine
+    (e.g. a parenthetical comment) does not turn every following line into a difference.
+
+    Args:
+        reference_text (str): Corrected text produced by the reference engine
+        reference_replacements (Dict[Any, int]): Replacement counts from the reference engine
+        candidate_text (str): Corrected text produced by the candidate engine
+        candidate_replacements (Dict[Any, int]): Replacement counts from the candidate engine
+        max_differences (int, optional): Maximum number of line differences to report
+
+    Returns:
+        Dict[str, Any]: Verification report
+    """
+    reference_lines = reference_text.split('\n')
+    candidate_lines = candidate_text.split('\n')
+
+    line_differences: List[Dict[str, Any]] = []
+    difference_count = 0
+    if reference_text != candidate_text:
+        matcher = difflib.SequenceMatcher(None, reference_lines, candidate_lines, autojunk=False)
+        for tag, ref_start, ref_end, cand_start, cand_end in matcher.get_opcodes():
+            if tag == 'equal':
+                continue
+            for offset in range(max(ref_end - ref_start, cand_end - cand_start)):
+                ref_index = ref_start + offset
+                cand_index = cand_start + offset
+                difference_count += 1
+                if max_differences is not None and len(line_differences) >= max_differences:
+                    continue
+                line_differences.append({
+                    "reference_line": ref_index + 1 if ref_index < ref_end else None,
+                    "candidate_line": cand_index + 1 if cand_index < cand_end else None,
+                    "reference": reference_lines[ref_index] if ref_index < ref_end else None,
+                    "candidate": candidate_lines[cand_index] if cand_index < cand_end else None
+                })
+
+    reference_counts = normalize_replacements(reference_replacements)
+    candidate_counts = normalize_replacements(candidate_replacements)
+    replacement_differences = []
+    for key in sorted(set(reference_counts) | set(candidate_counts)):
+        ref_count = reference_counts.get(key, 0)
+        cand_count = candidate_counts.get(key, 0)
+        if ref_count != cand_count:
+            replacement_differences.append({
+                "term": key,
+                "reference": ref_count,
+                "candidate": cand_count
+            })
+
+    output_identical = reference_text == candidate_text
+    replacements_identical = not replacement_differences
+    return {
+        "identical": output_identical and replacements_identical,
+        "output_identical": output_identical,
+        "replacements_identical": replacements_identical,
+        "reference_line_count": len(reference_lines),
+        "candidate_line_count": len(candidate_lines),
+        "differing_lines": difference_count,
+        "line_differences": line_differences,
+        "truncated": difference_count > len(line_differences),
+        "replacement_differences": replacement_differences,
+        "reference_total_replacements": sum(reference_counts.values()),
+        "candidate_total_replacements": sum(candidate_counts.values())
+    }
+
+
+def reference_engine_for(candidate: Any, source: Optional[CorrectionEngine] = None) -> CorrectionEngine:
+    """
+    Get a reference engine that uses the same in-memory dictionaries as a candidate.
+
+    The shared reference engine is reused when the candidate is bound to its dictionaries,
+    as the engine registry does. Otherwise a reference engine is built once per candidate
+    and only rebound when the candidate's dictionaries change. The oracle runs it with
+    prefilter=False, so that its output does not depend on the candidate index the
+    optimized engines share.
+
+    Args:
+        candidate (Any): The engine under test
+        source (CorrectionEngine, optional): Shared reference engine, e.g. the one the candidate was bound to
+
+    Returns:
+        CorrectionEngine: A reference engine sharing the candidate's dictionaries
+    """
+    if type(candidate) is CorrectionEngine:
+        return candidate
+    if (source is not None and type(source) is CorrectionEngine
+            and source.correction_dict is candidate.correction_dict
+            and source.protection_dict is candidate.protection_dict):
+        return source
+
+    with _references_lock:
+        reference = _references.get(candidate)
+        if reference is None:
+            reference = _references[candidate] = CorrectionEngine(
+                correction_dict_file=candidate.correction_dict_file,
+                protection_dict_file=candidate.protection_dict_file
+            )
+        if isinstance(candidate, CorrectionEngine):
+            # The whole snapshot, so the compiled matcher is shared as well
+            if reference.snapshot is not candidate.snapshot:
+                reference.snapshot = candidate.snapshot
+        elif (reference.correction_dict is not candidate.correction_dict
+              or reference.protection_dict is not candidate.protection_dict):
+            reference.correction_dict = candidate.correction_dict
+            reference.protection_dict = candidate.protection_dict
+    return reference
+
+
+def verify_engine(candidate: Any, text: str, reference: Optional[CorrectionEngine] = None,
+                  max_differences: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Run the reference engine and a candidate engine on the same input and compare them.
+
+    Args:
+        candidate (Any): Engine exposing correct_subtitles(text) -> (text, replacements)
+        text (str): The SRT file content
+        reference (CorrectionEngine, optional): Reference engine, from reference_engine_for if omitted
+        max_differences (int, optional): Maximum number of line differences to report
+
+    Returns:
+        Dict[str, Any]: Verification report including timings of both engines
+    """
+    if reference is None:
+        reference = reference_engine_for(candidate)
+
+    start_time = time.time()
+    reference_text, reference_replacements = reference.correct_subtitles(text, prefilter=False)
+    reference_time = time.time() - start_time
+
+    start_time = time.time()
+    candidate_text, candidate_replacements = candidate.correct_subtitles(text)
+    candidate_time = time.time() - start_time
+
+    report = diff_results(reference_text, reference_replacements,
+                          candidate_text, candidate_replacements, max_differences)
+    report["reference_time"] = reference_time
+    report["candidate_time"] = candidate_time
+    return report
+
+
+def shadow_verify(text: str, candidate_text: str, candidate_replacements: Dict[Any, int],
+                  reference: CorrectionEngine, max_differences: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Compare an output that has already been produced against the reference engine.
+
+    This is the shadow mode used by tasks: the candidate output is served as usual and
+    the reference engine is only run to check it, with every term's regex tried on every
+    line rather than the candidates of the compiled index.
+
+    Args:
+        text (str): The original SRT file content
+        candidate_text (str): Corrected text produced by the serving engine
+        candidate_replacements (Dict[Any, int]): Replacement counts from the serving engine
+        reference (CorrectionEngine): Reference engine
+        max_differences (int, optional): Maximum number of line differences to report
+
+    Returns:
+        Dict[str, Any]: Verification report
+    """
+    start_time = time.time()
+    reference_text, reference_replacements = reference.correct_subtitles(text, prefilter=False)
+    reference_time = time.time() - start_time
+
+    report = diff_results(reference_text, reference_replacements,
+                          candidate_text, candidate_replacements, max_differences)
+    report["reference_time"] = reference_time
+
+    if not report["identical"]:
+        logger.warning(f"Shadow verification found {report['differing_lines']} differing lines "
+                       f"and {len(report['replacement_differences'])} differing replacement counts")
+    return report
@@ -0,0 +1,247 @@
+import logging
+import threading
+from typing import Dict, Any, List, Callable, Optional
+
+from correction_engine import CorrectionEngine
+
+logger = logging.getLogger(__name__)
+
+# Name of the engine whose output defines correct behaviour
+REFERENCE_ENGINE = 'reference'
+
+# Pseudo engine name that lets the registry pick an engine for a batch
+AUTO_ENGINE = 'auto'
+
+# Batches at or above either threshold are routed to the cheapest compatible engine
+AUTO_BATCH_FILES = 10
+AUTO_BATCH_BYTES = 2 * 1024 * 1024
+
+
+class EngineSpec:
+    """
+    Description of a registered correction engine.
+
+    Capabilities describe what the engine does with the dictionaries (case
+    preservation, case-insensitive deduplication, block-based processing, ...).
+    Cost describes how expensive it is relative to the reference engine, so that
+    large batches can be routed to the cheapest engine that is still compatible.
+    """
+
+    def __init__(self, name: str, factory: Callable[[str, str], Any], description: str = '',
+                 capabilities: Optional[Dict[str, Any]] = None, cost: Optional[Dict[str, Any]] = None):
+        """
+        Initialize an engine specification.
+
+        Args:
+            name (str): Registry name used in configuration and requests
+            factory (Callable[[str, str], Any]): Builds an engine from (correction_dict_file, protection_dict_file)
+            description (str): Human readable description
+            capabilities (Dict[str, Any], optional): Capability flags of the engine
+            cost (Dict[str, Any], optional): Cost characteristics; relative_cost is 1.0 for the reference engine
+        """
+        self.name = name
+        self.factory = factory
+        self.description = description
+        self.capabilities = capabilities or {}
+        self.cost = cost or {}
+
+    @property
+    def relative_cost(self) -> float:
+        return float(self.cost.get('relative_cost', 1.0))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "description": self.description,
+            "capabilities": self.capabilities,
+            "cost": self.cost
+        }
+
+
+class EngineRegistry:
+    """
+    Registry of correction engines sharing a common interface:
+    correct_subtitles(text, callback=None) and process_file(file_path, output_path, callback).
+
+    Engine instances are created lazily and bound to the dictionaries of a source
+    engine, so dictionary edits made through the source engine apply to every engine.
+    """
+
+    def __init__(self):
+        self._specs: Dict[str, EngineSpec] = {}
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[str, str], Any], description: str = '',
+                 capabilities: Optional[Dict[str, Any]] = None, cost: Optional[Dict[str, Any]] = None) -> EngineSpec:
+        """
+        Register an engine under a name.
+
+        Args:
+            name (str): Registry name
+            factory (Callable[[str, str], Any]): Builds an engine from (correction_dict_file, protection_dict_file)
+            description (str): Human readable description
+            capabilities (Dict[str, Any], optional): Capability flags of the engine
+            cost (Dict[str, Any], optional): Cost characteristics of the engine
+
+        Returns:
+            EngineSpec: The registered specification
+        """
+        spec = EngineSpec(name, factory, description, capabilities, cost)
+        with self._lock:
+            self._specs[name] = spec
+            self._instances.pop(name, None)
+        return spec
+
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    def spec(self, name: str) -> EngineSpec:
+        if name not in self._specs:
+            raise KeyError(f"Unknown correction engine: {name}")
+        return self._specs[name]
+
+    def describe(self) -> List[Dict[str, Any]]:
+        return [spec.to_dict() for spec in self._specs.values()]
+
+    def get(self, name: str, source: CorrectionEngine) -> Any:
+        """
+        Get an engine instance bound to the dictionaries of a source engine.
+
+        Args:
+            name (str): Registry name
+            source (CorrectionEngine): Engine that owns the dictionaries
+
+        Returns:
+            Any: The engine instance
+        """
+        spec = self.spec(name)
+        if name == REFERENCE_ENGINE:
+            return source
+
+        with self._lock:
+            engine = self._instances.get(name)
+            if engine is None:
+                engine = spec.factory(source.correction_dict_file, source.protection_dict_file)
+                self._instances[name] = engine
+                logger.info(f"Created correction engine '{name}'")
+
+        # Share the source dictionaries instead of keeping separate copies. They are only
+        # rebound when the source has swapped them, since rebinding drops compiled matchers.
+        snapshot = source.snapshot
+        if isinstance(engine, CorrectionEngine):
+            # The whole snapshot, so the version and compiled matcher carry over as well
+            if engine.snapshot is not snapshot:
+                engine.snapshot = snapshot
+        elif engine.correction_dict is not snapshot.correction_dict or engine.protection_dict is not snapshot.protection_dict:
+            engine.correction_dict = snapshot.correction_dict
+            engine.protection_dict = snapshot.protection_dict
+        if hasattr(engine, 'term_stats'):
+            engine.term_stats = source.term_stats
+        return engine
+
+    def select(self, requested: Optional[str], file_count: int = 1, total_bytes: int = 0) -> str:
+        """
+        Resolve a requested engine name to a registered engine.
+
+        'auto' routes large batches to the cheapest engine that is output compatible
+        with the reference engine, and everything else to the reference engine.
+
+        Args:
+            requested (str, optional): Requested engine name, 'auto' or None for the reference engine
+            file_count (int): Number of files in the batch
+            total_bytes (int): Total size of the batch in bytes
+
+        Returns:
+            str: Name of a registered engine
+        """
+        if not requested:
+            return REFERENCE_ENGINE
+        if requested != AUTO_ENGINE:
+            self.spec(requested)
+            return requested
+
+        if file_count < AUTO_BATCH_FILES and total_bytes < AUTO_BATCH_BYTES:
+            return REFERENCE_ENGINE
+
+        compatible = [spec for spec in self._specs.values()
+                      if spec.capabilities.get('reference_compatible')]
+        if not compatible:
+            return REFERENCE_ENGINE
+        return min(compatible, key=lambda spec: spec.relative_cost).name
+
+
+def _casefold_engine_factory(correction_dict_file: str, protection_dict_file: str) -> Any:
+    from correction_engine_fix import CorrectionEngine as CaseFoldCorrectionEngine
+    return CaseFoldCorrectionEngine(correction_dict_file, protection_dict_file)
+
+
+def _block_engine_factory(correction_dict_file: str, protection_dict_file: str) -> Any:
+    from correction import BlockCorrectionEngine
+    return BlockCorrectionEngine(correction_dict_file, protection_dict_file)
+
+
+def _hybrid_engine_factory(correction_dict_file: str, protection_dict_file: str) -> Any:
+    from hybrid_matcher import HybridCorrectionEngine
+    return HybridCorrectionEngine(correction_dict_file, protection_dict_file)
+
+
+def register_default_engines(engine_registry: EngineRegistry):
+    """Register the engines shipped with the backend."""
+    engine_registry.register(
+        REFERENCE_ENGINE,
+        CorrectionEngine,
+        description="Line-based regex engine; its output defines correct behaviour",
+        capabilities={
+            "reference_compatible": True,
+            "preserves_case": True,
+            "case_insensitive_dedup": False,
+            "block_based": False,
+            "removes_parenthetical_lines": True
+        },
+        cost={"relative_cost": 1.0, "scales_with": "lines x candidate terms", "compile": "per dictionary version"}
+    )
+    engine_registry.register(
+        'hybrid',
+        _hybrid_engine_factory,
+        description="Reference engine semantics with candidates planned by entry shape: "
+                    "word hash, sentence hash and phrase automaton",
+        capabilities={
+            "reference_compatible": True,
+            "preserves_case": True,
+            "case_insensitive_dedup": False,
+            "block_based": False,
+            "removes_parenthetical_lines": True
+        },
+        cost={"relative_cost": 0.3, "scales_with": "line length + candidate terms", "compile": "per dictionary version"}
+    )
+    engine_registry.register(
+        'casefold',
+        _casefold_engine_factory,
+        description="Line-based regex engine that merges case variants and does not preserve case",
+        capabilities={
+            "reference_compatible": False,
+            "preserves_case": False,
+            "case_insensitive_dedup": True,
+            "block_based": False,
+            "removes_parenthetical_lines": True
+        },
+        cost={"relative_cost": 50.0, "scales_with": "lines x distinct lower-case terms", "compile": "per file"}
+    )
+    engine_registry.register(
+        'block',
+        _block_engine_factory,
+        description="Block-based engine that checks protected terms per subtitle block",
+        capabilities={
+            "reference_compatible": False,
+            "preserves_case": True,
+            "case_insensitive_dedup": False,
+            "block_based": True,
+            "removes_parenthetical_lines": False
+        },
+        cost={"relative_cost": 150.0, "scales_with": "blocks x terms x protected terms", "compile": "per file"}
+    )
+
+
+registry = EngineRegistry()
+register_default_engines(registry)
@@ -0,0 +1,269 @@
+import logging
+import re
+import time
+from collections import deque
+from typing import Dict, List, Set, Tuple, Any
+
+from compiled_dictionary import CompiledDictionary, MIXED_WORD_FOLDS, PREFILTER, fold
+from correction_engine import CorrectionEngine, DictionarySnapshot
+
+logger = logging.getLogger(__name__)
+
+# Entry classes of the planner
+WORD_CLASS = 'word'          # single ASCII word, found by token hash lookup
+SENTENCE_CLASS = 'sentence'  # whole sentence, found by line hash or anchor token lookup
+PHRASE_CLASS = 'phrase'      # phrases, CJK fragments and everything else, found by the automaton
+
+# Entries with at least this many words are planned as sentences
+SENTENCE_MIN_WORDS = 4
+
+_WORD_RUN = re.compile(r'\w+')
+
+
+def anchor_token(folded: str) -> str:
+    """
+    Find the longest word of a folded term that is delimited on both sides inside the term.
+
+    Wherever the term occurs, such a word is a complete word of the line as well, so it
+    can be looked up in the line's token hash. Words at the ends of the term are not
+    delimited: the line may continue them. Words touching a character whose case class
+    mixes word and non-word characters are skipped for the same reason.
+
+    Args:
+        folded (str): Folded term
+
+    Returns:
+        str: The anchor word, or '' if the term has none
+    """
+    anchor = ''
+    for match in _WORD_RUN.finditer(folded):
+        start, end = match.span()
+        if (start > 0 and end < len(folded) and end - start > len(anchor)
+                and not MIXED_WORD_FOLDS.intersection(folded[start - 1:end + 1])):
+            anchor = match.group()
+    return anchor
+
+
+class Automaton:
+    """
+    Aho-Corasick automaton over folded terms.
+
+    One pass over a folded line reports every term that occurs in it, however many
+    terms there are, which suits phrases and CJK fragments that have no word
+    boundaries to hash on.
+    """
+
+    def __init__(self, keys: List[Tuple[str, int]]):
+        """
+        Build the automaton.
+
+        Args:
+            keys (List[Tuple[str, int]]): (folded term, term id) pairs
+        """
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[Tuple[int, ...]] = [()]
+        for text, term_id in keys:
+            state = 0
+            for char in text:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = goto[state][char] = len(goto)
+                    goto.append({})
+                    outputs.append(())
+                state = next_state
+            outputs[state] += (term_id,)
+
+        # Failure links, and output links to the nearest failure state with outputs
+        fail = [0] * len(goto)
+        output_link = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                target = fail[state]
+                while target and char not in goto[target]:
+                    target = fail[target]
+                fallback = goto[target].get(char, 0)
+                fail[next_state] = fallback if fallback != next_state else 0
+                output_link[next_state] = fail[next_state] if outputs[fail[next_state]] else output_link[fail[next_state]]
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = outputs
+        self._output_link = output_link
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def search(self, text: str) -> Set[int]:
+        """
+        Find the terms that occur in a folded text.
+
+        Args:
+            text (str): Folded text
+
+        Returns:
+            Set[int]: Term ids
+        """
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        output_link = self._output_link
+        found: Set[int] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+            link = output_link[state]
+            while link:
+                found.update(outputs[link])
+                link = output_link[link]
+        return found
+
+
+class HybridMatcher:
+    """
+    Candidate planner that routes every correction entry to the lookup that suits its shape.
+
+    - single ASCII words are matched with \\b...\\b, so they can only match a complete
+      word of the line: they are found by looking up the line's folded words in a hash;
+    - whole sentences are found by looking up the folded line in a hash, or, when they
+      are embedded in a longer line, through their longest inner word;
+    - phrases, CJK fragments and all other entries are found by one automaton pass.
+
+    The candidates of all routes are merged into application order, and the engine
+    applies them with the usual longest-first, non-overlapping rules, so the output is
+    that of the reference engine. Terms and patterns come from the compiled dictionary.
+    """
+
+    def __init__(self, compiled: CompiledDictionary):
+        """
+        Plan the terms of a compiled dictionary.
+
+        Args:
+            compiled (CompiledDictionary): Terms in application order
+        """
+        start_time = time.time()
+        self.compiled = compiled
+        self._words: Dict[str, List[int]] = {}
+        self._lines: Dict[str, List[int]] = {}
+        self._anchors: Dict[str, List[int]] = {}
+        automaton_keys = []
+        counts = {WORD_CLASS: 0, SENTENCE_CLASS: 0, PHRASE_CLASS: 0}
+
+        for term_id in range(len(compiled)):
+            wrong = compiled.term(term_id)
+            folded = compiled.folded(term_id)
+            if not folded:
+                # An empty term matches everywhere; leave it to the automaton's caller
+                automaton_keys.append((folded, term_id))
+                counts[PHRASE_CLASS] += 1
+            elif wrong.isascii() and wrong.isalpha():
+                self._words.setdefault(folded, []).append(term_id)
+                counts[WORD_CLASS] += 1
+            elif len(folded.split()) >= SENTENCE_MIN_WORDS and anchor_token(folded):
+                self._lines.setdefault(folded.strip(), []).append(term_id)
+                self._anchors.setdefault(anchor_token(folded), []).append(term_id)
+                counts[SENTENCE_CLASS] += 1
+            else:
+                automaton_keys.append((folded, term_id))
+                counts[PHRASE_CLASS] += 1
+
+        self._empty = [term_id for folded, term_id in automaton_keys if not folded]
+        self._automaton = Automaton([key for key in automaton_keys if key[0]])
+        self.plan = dict(counts, automaton_states=len(self._automaton), plan_time=time.time() - start_time)
+        logger.info(f"Planned {len(compiled)} terms: {counts[WORD_CLASS]} words, "
+                    f"{counts[SENTENCE_CLASS]} sentences, {counts[PHRASE_CLASS]} phrases "
+                    f"in {self.plan['plan_time']:.2f} seconds")
+
+    def __len__(self) -> int:
+        return len(self.compiled)
+
+    def prefault(self):
+        self.compiled.prefault()
+
+    def item(self, term_id: int) -> Tuple[str, str, Any]:
+        return self.compiled.item(term_id)
+
+    def candidates(self, line: str, after: int = -1, prefilter: bool = True) -> List[int]:
+        """
+        Find the terms that can match in a line.
+
+        Args:
+            line (str): The line to search
+            after (int): Only return terms applied after this one
+            prefilter (bool): Use the planned lookups; False returns every term
+
+        Returns:
+            List[int]: Term ids in application order
+        """
+        if not (prefilter and PREFILTER):
+            return list(range(after + 1, len(self)))
+
+        folded_line = fold(line)
+        found = self._automaton.search(folded_line)
+        found.update(self._empty)
+        found.update(self._lines.get(folded_line.strip(), ()))
+
+        words = self._words
+        anchors = self._anchors
+        compiled = self.compiled
+        for match in _WORD_RUN.finditer(line):
+            token = folded_line[match.start():match.end()]
+            term_ids = words.get(token)
+            if term_ids:
+                found.update(term_ids)
+            term_ids = anchors.get(token)
+            if term_ids:
+                found.update(term_id for term_id in term_ids if compiled.folded(term_id) in folded_line)
+        return sorted(term_id for term_id in found if term_id > after)
+
+
+class HybridCorrectionEngine(CorrectionEngine):
+    """
+    Correction engine with the reference engine's semantics and the hybrid candidate planner.
+
+    The planner is built once per dictionary version on top of the shared compiled
+    dictionary, and kept as long as the dictionaries it was built from are in use.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._plan: Tuple[Dict[str, str], Dict[str, str], HybridMatcher] = None
+        super().__init__(*args, **kwargs)
+
+    def compiled_matcher(self, snapshot: DictionarySnapshot,
+                         timings: Dict[str, float] = None) -> HybridMatcher:
+        """
+        Get the hybrid matcher of a snapshot, planning it on first use.
+
+        Args:
+            snapshot (DictionarySnapshot): Dictionaries to compile
+            timings (Dict[str, float], optional): Filled with protection and compile durations
+
+        Returns:
+            HybridMatcher: Planned matcher over the compiled dictionary
+        """
+        plan = self._plan
+        if plan is not None and plan[0] is snapshot.correction_dict and plan[1] is snapshot.protection_dict:
+            if snapshot.compiled is None:
+                snapshot.compiled = plan[2].compiled
+            if timings is not None:
+                timings['protection'] = 0.0
+                timings['compile'] = 0.0
+            return plan[2]
+
+        compiled = super().compiled_matcher(snapshot, timings)
+        if plan is not None and plan[2].compiled.fingerprint == compiled.fingerprint:
+            # Equal dictionaries in new objects, e.g. the registry sharing the source engine's
+            matcher = plan[2]
+        else:
+            stage_start = time.time()
+            matcher = HybridMatcher(compiled)
+            if timings is not None:
+                timings['compile'] = timings.get('compile', 0.0) + time.time() - stage_start
+        self._plan = (snapshot.correction_dict, snapshot.protection_dict, matcher)
+        return matcher
@@ -0,0 +1,466 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+from scheduler import (fair_tags, schedule_key, expected_start, BATCH_MAX_WAIT_SECONDS,
+                       DEFAULT_SECONDS_PER_COST, RATE_WINDOW)
+
+logger = logging.getLogger(__name__)
+
+# Seconds a claimed job stays leased without a heartbeat before another worker may take it
+LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', '60'))
+
+# Attempts before a job is marked failed for good
+MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '3'))
+
+# Delay before the first retry; doubled for every further attempt
+RETRY_BACKOFF_SECONDS = float(os.environ.get('JOB_RETRY_BACKOFF_SECONDS', '5'))
+
+# Job states
+HELD = 'held'  # Enqueued before its input is complete; claimable once released
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    started_at REAL,
+    finished_at REAL,
+    state TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, available_at);
+CREATE TABLE IF NOT EXISTS fair_clients (
+    client TEXT PRIMARY KEY,
+    finish REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+# Scheduling columns, added to queues created before scheduling existed
+_SCHEDULING_COLUMNS = {
+    'client': "TEXT NOT NULL DEFAULT ''",
+    'cost': "REAL NOT NULL DEFAULT 0",
+    'interactive': "INTEGER NOT NULL DEFAULT 0",
+    'start_tag': "REAL NOT NULL DEFAULT 0",
+    'finish_tag': "REAL NOT NULL DEFAULT 0",
+    'worker': "TEXT"
+}
+
+# Seconds a worker counts as active after it last finished a job, for start estimates
+ACTIVE_WORKER_SECONDS = 300
+
+# Claim order of schedule_key(): interactive and aged tasks shortest first, then batches by finish tag
+_CLAIM_ORDER = """
+    CASE WHEN interactive OR created_at < :aged THEN 0 ELSE 1 END,
+    CASE WHEN interactive OR created_at < :aged THEN cost ELSE finish_tag END,
+    CASE WHEN interactive OR created_at < :aged THEN finish_tag ELSE cost END,
+    created_at
+"""
+
+
+class JobQueue:
+    """
+    Durable queue of correction jobs shared by the web tier and the correction workers.
+
+    A worker claims a job by taking a lease on it and keeps the lease alive with
+    heartbeats, which also publish the job's progress. When a worker dies its lease
+    expires and the next claim puts the job back in the queue, or fails it once it
+    used up its attempts. Failed attempts are retried with exponential backoff.
+
+    Jobs are claimed in scheduling order (see scheduler.schedule_key): interactive
+    jobs shortest first, then batches by weighted fair queuing across clients. The
+    fair queuing state (virtual time and each client's finish tag) is kept in the
+    database as well.
+
+    The queue lives in SQLite, so any process on any host that shares the file
+    (on storage with working file locks) can enqueue, claim and read jobs.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open (and create if needed) the queue database.
+
+        Args:
+            path (str): Path of the SQLite database
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+            columns = {row['name'] for row in connection.execute("PRAGMA table_info(jobs)")}
+            for name, definition in _SCHEDULING_COLUMNS.items():
+                if name not in columns:
+                    connection.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            yield connection
+        finally:
+            connection.close()
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers never claim the same job
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    @staticmethod
+    def _job(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['state'] = json.loads(job['state']) if job['state'] else None
+        return job
+
+    def enqueue(self, job_id: str, payload: Dict[str, Any], max_attempts: int = None, client: str = '',
+                weight: float = 1.0, cost: float = 0.0, interactive: bool = False,
+                hold: bool = False) -> Dict[str, Any]:
+        """
+        Add a job to the queue.
+
+        Args:
+            job_id (str): Unique job id (the task id)
+            payload (Dict[str, Any]): JSON serializable job description
+            max_attempts (int, optional): Attempts before the job fails; defaults to MAX_ATTEMPTS
+            client (str): Client key the job is fairly queued under
+            weight (float): Weight of the client
+            cost (float): Estimated cost of the job
+            interactive (bool): Whether the job is served shortest job first
+            hold (bool): Keep the job from being claimed until release() is called
+
+        Returns:
+            Dict[str, Any]: The queued job
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute("SELECT value FROM meta WHERE key = 'virtual_time'").fetchone()
+            virtual_time = row['value'] if row else 0.0
+            row = connection.execute("SELECT finish FROM fair_clients WHERE client = ?", (client,)).fetchone()
+            start, finish = fair_tags(virtual_time, row['finish'] if row else 0.0, cost, weight)
+            connection.execute(
+                "INSERT INTO fair_clients (client, finish) VALUES (?, ?) "
+                "ON CONFLICT (client) DO UPDATE SET finish = excluded.finish",
+                (client, finish)
+            )
+            connection.execute(
+                "INSERT INTO jobs (id, payload, status, max_attempts, created_at, available_at, "
+                "client, cost, interactive, start_tag, finish_tag) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, json.dumps(payload, ensure_ascii=False), HELD if hold else QUEUED,
+                 max_attempts or MAX_ATTEMPTS, now, now, client, cost, int(interactive), start, finish)
+            )
+        return self.get(job_id)
+
+    def release(self, job_id: str) -> bool:
+        """
+        Let a held job be claimed.
+
+        Args:
+            job_id (str): The job
+
+        Returns:
+            bool: False if the job was not held (e.g. already released)
+        """
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = ?, available_at = ? WHERE id = ? AND status = ?",
+                (QUEUED, time.time(), job_id, HELD)
+            )
+            return cursor.rowcount == 1
+
+    def _recover_expired(self, connection: sqlite3.Connection, now: float) -> int:
+        """Requeue (or fail) jobs whose worker stopped renewing the lease."""
+        expired = connection.execute(
+            "SELECT id, attempts, max_attempts, lease_owner FROM jobs WHERE status = ? AND lease_expires < ?",
+            (RUNNING, now)
+        ).fetchall()
+        for row in expired:
+            logger.warning(f"Lease of job {row['id']} held by {row['lease_owner']} expired")
+            self._retry_or_fail(connection, row['id'], row['attempts'], row['max_attempts'],
+                                f"Worker {row['lease_owner']} stopped responding", now)
+        return len(expired)
+
+    def _retry_or_fail(self, connection: sqlite3.Connection, job_id: str, attempts: int,
+                       max_attempts: int, error: str, now: float):
+        if attempts < max_attempts:
+            connection.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, lease_owner = NULL, lease_expires = NULL, "
+                "error = ? WHERE id = ?",
+                (QUEUED, now + RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1), error, job_id)
+            )
+        else:
+            connection.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, lease_owner = NULL, lease_expires = NULL, "
+                "error = ? WHERE id = ?",
+                (FAILED, now, error, job_id)
+            )
+
+    def claim(self, worker_id: str, lease_seconds: float = LEASE_SECONDS,
+              interactive_only: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Lease the first ready job in scheduling order.
+
+        Args:
+            worker_id (str): Id of the claiming worker
+            lease_seconds (float): Lease duration; renewed by heartbeat()
+            interactive_only (bool): Only claim interactive jobs (for a worker's express lane)
+
+        Returns:
+            Dict[str, Any]: The claimed job, or None if no job is ready
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            self._recover_expired(connection, now)
+            row = connection.execute(
+                f"SELECT id, start_tag FROM jobs WHERE status = :status AND available_at <= :now "
+                f"{'AND interactive ' if interactive_only else ''}ORDER BY {_CLAIM_ORDER} LIMIT 1",
+                {'status': QUEUED, 'now': now, 'aged': now - BATCH_MAX_WAIT_SECONDS}
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_expires = ?, "
+                "started_at = ?, worker = ? WHERE id = ?",
+                (RUNNING, worker_id, now + lease_seconds, now, worker_id, row['id'])
+            )
+            # Virtual time advances to the start tag of the job put in service
+            connection.execute(
+                "INSERT INTO meta (key, value) VALUES ('virtual_time', ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = MAX(value, excluded.value)",
+                (row['start_tag'],)
+            )
+            return self._job(connection.execute("SELECT * FROM jobs WHERE id = ?", (row['id'],)).fetchone())
+
+    def heartbeat(self, job_id: str, worker_id: str, state: Dict[str, Any] = None,
+                  lease_seconds: float = LEASE_SECONDS) -> bool:
+        """
+        Renew the lease of a running job, optionally publishing its current state.
+
+        Args:
+            job_id (str): The job
+            worker_id (str): Worker holding the lease
+            state (Dict[str, Any], optional): JSON serializable task state
+            lease_seconds (float): New lease duration from now
+
+        Returns:
+            bool: False if the worker no longer holds the lease
+        """
+        with self._transaction() as connection:
+            if state is None:
+                cursor = connection.execute(
+                    "UPDATE jobs SET lease_expires = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+                    (time.time() + lease_seconds, job_id, RUNNING, worker_id)
+                )
+            else:
+                cursor = connection.execute(
+                    "UPDATE jobs SET lease_expires = ?, state = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+                    (time.time() + lease_seconds, json.dumps(state, ensure_ascii=False), job_id, RUNNING, worker_id)
+                )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, state: Dict[str, Any] = None,
+                 status: str = COMPLETED) -> bool:
+        """
+        Mark a leased job as finished.
+
+        Args:
+            job_id (str): The job
+            worker_id (str): Worker holding the lease
+            state (Dict[str, Any], optional): Final task state
+            status (str): COMPLETED, or CANCELLED for a job stopped before it finished
+
+        Returns:
+            bool: False if the worker no longer held the lease
+        """
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, lease_owner = NULL, lease_expires = NULL, "
+                "state = COALESCE(?, state), error = NULL WHERE id = ? AND status = ? AND lease_owner = ?",
+                (status, time.time(), json.dumps(state, ensure_ascii=False) if state is not None else None,
+                 job_id, RUNNING, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """
+        Cancel a job that has not started yet.
+
+        A running job is left to its worker, which stops it between files or chunks
+        once the web tier has asked it to (see app.cancel_file_path).
+
+        Args:
+            job_id (str): The job
+
+        Returns:
+            str: Status of the job before the call (QUEUED or HELD if it is now cancelled),
+                or None if the job is unknown
+        """
+        with self._transaction() as connection:
+            row = connection.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            if row['status'] not in (QUEUED, HELD):
+                return row['status']
+            connection.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ?",
+                (CANCELLED, time.time(), job_id)
+            )
+            return row['status']
+
+    def fail(self, job_id: str, worker_id: str, error: str, state: Dict[str, Any] = None,
+             retry: bool = True) -> bool:
+        """
+        Record a failed attempt; the job is retried after a backoff until it runs out of attempts.
+
+        Args:
+            job_id (str): The job
+            worker_id (str): Worker holding the lease
+            error (str): What went wrong
+            state (Dict[str, Any], optional): Task state at the time of the failure
+            retry (bool): Whether another attempt may succeed
+
+        Returns:
+            bool: False if the worker no longer held the lease
+        """
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND status = ? AND lease_owner = ?",
+                (job_id, RUNNING, worker_id)
+            ).fetchone()
+            if row is None:
+                return False
+            if state is not None:
+                connection.execute("UPDATE jobs SET state = ? WHERE id = ?",
+                                   (json.dumps(state, ensure_ascii=False), job_id))
+            self._retry_or_fail(connection, job_id, row['attempts'],
+                                row['max_attempts'] if retry else row['attempts'], error, time.time())
+            return True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Read a job.
+
+        Args:
+            job_id (str): The job
+
+        Returns:
+            Dict[str, Any]: The job with decoded payload and state, or None if unknown
+        """
+        with self._connect() as connection:
+            row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row is not None else None
+
+    def estimate(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Estimate when a queued job starts.
+
+        The work ahead of the job (running jobs' remaining time and the queued jobs
+        that come first in scheduling order) is spread over the workers active
+        recently, at the processing rate measured on recently completed jobs.
+
+        Args:
+            job_id (str): The job
+
+        Returns:
+            Dict[str, Any]: queue_position and expected_start (epoch seconds), or None if
+                the job is not queued
+        """
+        now = time.time()
+        with self._connect() as connection:
+            queued = connection.execute(
+                "SELECT id, cost, interactive, finish_tag, created_at, available_at FROM jobs WHERE status = ?",
+                (QUEUED,)
+            ).fetchall()
+            running = connection.execute(
+                "SELECT cost, started_at, interactive FROM jobs WHERE status = ?", (RUNNING,)
+            ).fetchall()
+            measured = connection.execute(
+                "SELECT SUM(finished_at - started_at), SUM(cost) FROM (SELECT finished_at, started_at, cost "
+                "FROM jobs WHERE status = ? AND cost > 0 ORDER BY finished_at DESC LIMIT ?)",
+                (COMPLETED, RATE_WINDOW)
+            ).fetchone()
+            workers = connection.execute(
+                "SELECT COUNT(DISTINCT worker) FROM jobs WHERE (status = ? OR finished_at > ?) "
+                "AND worker NOT LIKE '%/express'",
+                (RUNNING, now - ACTIVE_WORKER_SECONDS)
+            ).fetchone()[0]
+
+        jobs = {row['id']: row for row in queued}
+        job = jobs.get(job_id)
+        if job is None:
+            return None
+
+        def key(row):
+            # A job waiting out a retry backoff cannot start before its backoff ends
+            return (max(row['available_at'], now),) + schedule_key(
+                bool(row['interactive']), row['cost'], row['finish_tag'], row['created_at'], now)
+
+        ahead = [row for row in queued if key(row) < key(job)]
+        if job['interactive']:
+            # Interactive jobs also run in the workers' express lanes, behind interactive jobs only
+            ahead = [row for row in ahead if row['interactive']]
+            running = [row for row in running if row['interactive']]
+        seconds_per_cost = measured[0] / measured[1] if measured[1] else DEFAULT_SECONDS_PER_COST
+        estimate = expected_start(now, [row['cost'] for row in ahead],
+                                  [(row['cost'], row['started_at']) for row in running],
+                                  seconds_per_cost, workers or 1)
+        estimate['expected_start'] = max(estimate['expected_start'], job['available_at'])
+        return estimate
+
+    def pending_payloads(self) -> List[Dict[str, Any]]:
+        """Payloads of the jobs that have not finished (held, queued or running)."""
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT payload FROM jobs WHERE status IN (?, ?, ?)", (HELD, QUEUED, RUNNING)
+            ).fetchall()
+        return [json.loads(row['payload']) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        with self._connect() as connection:
+            rows = connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def purge(self, older_than: float) -> int:
+        """
+        Delete finished jobs, and held jobs never released.
+
+        Args:
+            older_than (float): Age in seconds of the oldest finished (or held) job kept
+
+        Returns:
+            int: Number of jobs deleted
+        """
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "DELETE FROM jobs WHERE (status IN (?, ?, ?) AND finished_at < ?) OR (status = ? AND created_at < ?)",
+                (COMPLETED, FAILED, CANCELLED, time.time() - older_than, HELD, time.time() - older_than)
+            )
+            return cursor.rowcount
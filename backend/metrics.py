@@ -0,0 +1,425 @@
+import atexit
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Any, List, Tuple, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Directory shared by all workers on the host; each process writes its own file
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'metrics'))
+
+# Seconds between background flushes of a process' metrics file
+FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', '1.0'))
+
+# Name of the file that accumulates counters of processes that have exited
+ARCHIVE_FILE = 'archive.json'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labelnames: Sequence[str], labels: Dict[str, Any]) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, '')) for name in labelnames)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames: Sequence[str], key: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, key)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """Base class of a metric family with a fixed set of label names."""
+
+    kind = 'untyped'
+
+    def __init__(self, registry: 'MetricsRegistry', name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Tuple[str, ...], Any] = {}
+
+    def describe(self) -> Dict[str, Any]:
+        return {"type": self.kind, "help": self.documentation, "labels": list(self.labelnames)}
+
+    def snapshot(self) -> List[List[Any]]:
+        return [[list(key), value] for key, value in self.values.items()]
+
+
+class Counter(Metric):
+    """Monotonic counter, summed across all processes including exited ones."""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+            self.registry.dirty = True
+
+
+class Gauge(Metric):
+    """Current value, summed across live processes only."""
+
+    kind = 'gauge'
+
+    def __init__(self, registry: 'MetricsRegistry', name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(registry, name, documentation, labelnames)
+        self.function: Optional[Callable[[], float]] = None
+
+    def set_function(self, function: Callable[[], float]):
+        """
+        Compute the value when the metrics are rendered instead of tracking it per process.
+
+        For values kept in a store shared by all processes, which a per-process gauge
+        would count twice or lose across restarts. Only unlabelled gauges are supported.
+
+        Args:
+            function (Callable[[], float]): Returns the current value
+        """
+        self.function = function
+
+    def snapshot(self) -> List[List[Any]]:
+        if self.function is not None:
+            return []
+        return super().snapshot()
+
+    def set(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.registry.lock:
+            self.values[key] = float(value)
+            self.registry.dirty = True
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+            self.registry.dirty = True
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """Bucketed distribution of observations, summed across all processes."""
+
+    kind = 'histogram'
+
+    def __init__(self, registry: 'MetricsRegistry', name: str, documentation: str,
+                 labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def describe(self) -> Dict[str, Any]:
+        description = super().describe()
+        description["buckets"] = list(self.buckets)
+        return description
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.registry.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self.values[key] = state
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["buckets"][index] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+            self.registry.dirty = True
+
+    def snapshot(self) -> List[List[Any]]:
+        return [[list(key), {"buckets": list(state["buckets"]), "sum": state["sum"], "count": state["count"]}]
+                for key, state in self.values.items()]
+
+
+class MetricsRegistry:
+    """
+    Process-local metrics that are aggregated across workers through a shared directory.
+
+    Updates only touch memory. A background thread writes the process' values to
+    <METRICS_DIR>/<pid>.json when they changed, and render() merges the files of all
+    processes: counters and histograms are summed over every file, gauges only over
+    processes that are still alive. Files of exited processes are folded into an
+    archive file so the directory does not grow with worker restarts.
+    """
+
+    def __init__(self, directory: str = METRICS_DIR, flush_interval: float = FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.metrics: Dict[str, Metric] = {}
+        self.ratios: List[Tuple[str, str, str, str, str]] = []
+        self._flusher_pid = None
+        self._flusher_lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(self, name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def start(self):
+        """Start the background flusher for this process; safe to call again after a fork."""
+        pid = os.getpid()
+        with self._flusher_lock:
+            if self._flusher_pid == pid:
+                return
+            if self._flusher_pid is not None:
+                # Forked child: values inherited from the parent belong to the parent's file
+                with self.lock:
+                    for metric in self.metrics.values():
+                        metric.values.clear()
+            self._flusher_pid = pid
+        thread = threading.Thread(target=self._flush_loop, name='metrics-flusher')
+        thread.daemon = True
+        thread.start()
+
+    def _flush_loop(self):
+        pid = os.getpid()
+        while self._flusher_pid == pid:
+            time.sleep(self.flush_interval)
+            if self.dirty:
+                self.flush()
+
+    def _process_file(self, pid: int) -> str:
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def flush(self) -> bool:
+        """
+        Write this process' metrics to its file in the shared directory.
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        with self.lock:
+            data = {
+                "pid": os.getpid(),
+                "metrics": {name: {"describe": metric.describe(), "samples": metric.snapshot()}
+                            for name, metric in self.metrics.items()}
+            }
+            self.dirty = False
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._process_file(data["pid"])
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+            return True
+        except Exception as e:
+            logger.error(f"Error flushing metrics: {str(e)}")
+            self.dirty = True
+            return False
+
+    @staticmethod
+    def _is_alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    @staticmethod
+    def _read(path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    @staticmethod
+    def _merge(target: Dict[str, Any], data: Dict[str, Any], include_gauges: bool):
+        for name, family in data.get("metrics", {}).items():
+            describe = family["describe"]
+            if describe["type"] == 'gauge' and not include_gauges:
+                continue
+            merged = target.setdefault(name, {"describe": describe, "samples": {}})
+            for key, value in family["samples"]:
+                key = tuple(key)
+                if describe["type"] == 'histogram':
+                    state = merged["samples"].get(key)
+                    if state is None or len(state["buckets"]) != len(value["buckets"]):
+                        merged["samples"][key] = {"buckets": list(value["buckets"]),
+                                                  "sum": value["sum"], "count": value["count"]}
+                    else:
+                        state["buckets"] = [a + b for a, b in zip(state["buckets"], value["buckets"])]
+                        state["sum"] += value["sum"]
+                        state["count"] += value["count"]
+                else:
+                    merged["samples"][key] = merged["samples"].get(key, 0.0) + value
+
+    def _archive_dead_processes(self, files: List[str]):
+        """Fold the counters of exited processes into the archive file and remove their files."""
+        lock_path = os.path.join(self.directory, 'archive.lock')
+        with open(lock_path, 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                archive_path = os.path.join(self.directory, ARCHIVE_FILE)
+                merged: Dict[str, Any] = {}
+                archive = self._read(archive_path)
+                if archive:
+                    self._merge(merged, archive, include_gauges=False)
+                for path in files:
+                    data = self._read(path)
+                    if data:
+                        self._merge(merged, data, include_gauges=False)
+                archive_data = {"metrics": {name: {"describe": family["describe"],
+                                                   "samples": [[list(key), value] for key, value in family["samples"].items()]}
+                                            for name, family in merged.items()}}
+                temp_path = f"{archive_path}.tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(archive_data, f, ensure_ascii=False)
+                os.replace(temp_path, archive_path)
+                for path in files:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def collect(self) -> Dict[str, Any]:
+        """
+        Merge the metrics of all processes sharing the directory.
+
+        Returns:
+            Dict[str, Any]: Metric families keyed by name with merged samples
+        """
+        self.flush()
+        merged: Dict[str, Any] = {}
+        dead_files = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json') or filename == ARCHIVE_FILE:
+                continue
+            try:
+                pid = int(filename[:-len('.json')])
+            except ValueError:
+                continue
+            path = os.path.join(self.directory, filename)
+            if not self._is_alive(pid):
+                dead_files.append(path)
+                continue
+            data = self._read(path)
+            if data:
+                self._merge(merged, data, include_gauges=True)
+
+        if dead_files:
+            try:
+                self._archive_dead_processes(dead_files)
+            except Exception as e:
+                logger.error(f"Error archiving metrics of exited workers: {str(e)}")
+
+        archive = self._read(os.path.join(self.directory, ARCHIVE_FILE))
+        if archive:
+            self._merge(merged, archive, include_gauges=False)
+
+        # Families registered in this process are always rendered, even without samples
+        for name, metric in self.metrics.items():
+            family = merged.setdefault(name, {"describe": metric.describe(), "samples": {}})
+            if getattr(metric, 'function', None) is not None:
+                try:
+                    family["samples"] = {(): float(metric.function())}
+                except Exception as e:
+                    logger.error(f"Error computing metric {name}: {str(e)}")
+        return merged
+
+    def render(self) -> str:
+        """
+        Render the merged metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text
+        """
+        collected = self.collect()
+        lines = []
+        for name, family in sorted(collected.items()):
+            describe = family["describe"]
+            labelnames = describe.get("labels", [])
+            lines.append(f"# HELP {name} {describe['help']}")
+            lines.append(f"# TYPE {name} {describe['type']}")
+            for key, value in sorted(family["samples"].items()):
+                if describe["type"] == 'histogram':
+                    cumulative = 0
+                    for bound, count in zip(describe["buckets"], value["buckets"]):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(labelnames, key, ('le', _format_value(bound)))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(labelnames, key, ('le', '+Inf'))} {value['count']}")
+                    lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_value(value['sum'])}")
+                    lines.append(f"{name}_count{_format_labels(labelnames, key)} {value['count']}")
+                else:
+                    lines.append(f"{name}{_format_labels(labelnames, key)} {_format_value(value)}")
+
+        for ratio_name, documentation, counter_name, label, hit_value in self.ratios:
+            lines.extend(self._render_ratio(collected.get(counter_name), ratio_name, documentation, label, hit_value))
+        return '\n'.join(lines) + '\n'
+
+    def ratio(self, name: str, documentation: str, counter: Counter, label: str = 'result', hit_value: str = 'hit'):
+        """
+        Expose hits / total of a counter as a gauge computed from the aggregated values.
+
+        Args:
+            name (str): Name of the derived gauge
+            documentation (str): Help text
+            counter (Counter): Counter with a label distinguishing hits from misses
+            label (str): Name of that label
+            hit_value (str): Label value counted as a hit
+        """
+        self.ratios.append((name, documentation, counter.name, label, hit_value))
+
+    @staticmethod
+    def _render_ratio(family: Optional[Dict[str, Any]], name: str, documentation: str,
+                      label: str, hit_value: str) -> List[str]:
+        lines = [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+        if not family:
+            return lines
+        labelnames = family["describe"].get("labels", [])
+        if label not in labelnames:
+            return lines
+        label_index = labelnames.index(label)
+        other_names = [n for i, n in enumerate(labelnames) if i != label_index]
+        totals: Dict[Tuple[str, ...], List[float]] = {}
+        for key, value in family["samples"].items():
+            group = tuple(v for i, v in enumerate(key) if i != label_index)
+            hits_total = totals.setdefault(group, [0.0, 0.0])
+            hits_total[1] += value
+            if key[label_index] == hit_value:
+                hits_total[0] += value
+        for group, (hits, total) in sorted(totals.items()):
+            if total:
+                lines.append(f"{name}{_format_labels(other_names, group)} {_format_value(hits / total)}")
+        return lines
+
+
+registry = MetricsRegistry()
+atexit.register(registry.flush)
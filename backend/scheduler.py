@@ -0,0 +1,300 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Cost of a task: total file bytes x correction dictionary entries, in units of 10^9
+COST_UNIT = 1e9
+
+# Single-file tasks up to this cost are interactive and run shortest job first
+INTERACTIVE_MAX_COST = float(os.environ.get('SCHEDULER_INTERACTIVE_MAX_COST', '2.0'))
+
+# Batch tasks waiting longer than this are served with the interactive ones, so they cannot starve
+BATCH_MAX_WAIT_SECONDS = float(os.environ.get('SCHEDULER_BATCH_MAX_WAIT', '300'))
+
+# Processing seconds per cost unit assumed until enough tasks have been measured
+DEFAULT_SECONDS_PER_COST = float(os.environ.get('SCHEDULER_SECONDS_PER_COST', '0.5'))
+
+# Share of the processing time per client, e.g. {"<api key>": 4, "10.0.0.5": 2}; others weigh 1
+CLIENT_WEIGHTS: Dict[str, float] = json.loads(os.environ.get('SCHEDULER_CLIENT_WEIGHTS', '{}'))
+
+# Tasks running at the same time in one process when tasks run in the web workers
+TASK_CONCURRENCY = int(os.environ.get('TASK_CONCURRENCY', '1'))
+
+# Measured tasks kept for the cost rate
+RATE_WINDOW = 50
+
+
+def estimate_cost(total_bytes: int, dictionary_size: int) -> float:
+    """
+    Estimate the cost of a task.
+
+    Args:
+        total_bytes (int): Size of all files of the task
+        dictionary_size (int): Entries of the correction dictionary
+
+    Returns:
+        float: Cost in COST_UNIT byte-entries
+    """
+    return total_bytes * max(dictionary_size, 1) / COST_UNIT
+
+
+def client_identity(api_key: Optional[str], address: Optional[str]) -> Tuple[str, float]:
+    """
+    Get the fair queuing identity and weight of a client.
+
+    API keys identify a client across addresses; they are stored hashed.
+
+    Args:
+        api_key (str, optional): The X-API-Key header
+        address (str, optional): The client address
+
+    Returns:
+        Tuple[str, float]: (client key, weight)
+    """
+    if api_key:
+        weight = CLIENT_WEIGHTS.get(api_key, 1.0)
+        return 'key:' + hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16], float(weight)
+    address = address or 'unknown'
+    return 'ip:' + address, float(CLIENT_WEIGHTS.get(address, 1.0))
+
+
+def is_interactive(file_count: int, cost: float) -> bool:
+    """Whether a task is served shortest job first instead of by fair share."""
+    return file_count == 1 and cost <= INTERACTIVE_MAX_COST
+
+
+def fair_tags(virtual_time: float, client_finish: float, cost: float, weight: float) -> Tuple[float, float]:
+    """
+    Start and finish tags of a task under start-time fair queuing.
+
+    A client's tasks are queued behind its earlier ones, and each advances the
+    client's finish tag by its cost divided by the client's weight, so a client with
+    a 50-file batch queues far behind another client's single file.
+
+    Args:
+        virtual_time (float): Start tag of the task dispatched last
+        client_finish (float): Finish tag of the client's previous task
+        cost (float): Cost of the task
+        weight (float): Weight of the client
+
+    Returns:
+        Tuple[float, float]: (start tag, finish tag)
+    """
+    start = max(virtual_time, client_finish)
+    return start, start + cost / max(weight, 1e-6)
+
+
+def schedule_key(interactive: bool, cost: float, finish: float, enqueued_at: float,
+                 now: float = None) -> Tuple[int, float, float, float]:
+    """
+    Sort key of a waiting task; the smallest key runs next.
+
+    Interactive tasks (and batch tasks that waited too long) come first, shortest
+    first. Batch tasks follow in order of their fair queuing finish tags.
+    """
+    now = time.time() if now is None else now
+    if interactive or now - enqueued_at > BATCH_MAX_WAIT_SECONDS:
+        return (0, cost, finish, enqueued_at)
+    return (1, finish, cost, enqueued_at)
+
+
+class TaskScheduler:
+    """
+    Admission of tasks run inside a web worker process.
+
+    Every task thread waits in acquire() until it is the first waiting task by
+    schedule_key and one of the concurrency slots is free. Interactive tasks also have
+    an express slot of their own, so a single file never waits for a running batch.
+    The scheduler measures processing seconds per cost unit to estimate when waiting
+    tasks will start.
+    """
+
+    def __init__(self, slots: int = TASK_CONCURRENCY):
+        """
+        Initialize the scheduler.
+
+        Args:
+            slots (int): Tasks allowed to run at the same time
+        """
+        self.slots = max(1, slots)
+        self._condition = threading.Condition()
+        self._waiting: Dict[str, Dict[str, Any]] = {}
+        self._running: Dict[str, Dict[str, Any]] = {}
+        self._paused: Dict[str, Dict[str, Any]] = {}
+        self._virtual_time = 0.0
+        self._client_finish: Dict[str, float] = {}
+        self._samples = []
+
+    def submit(self, task_id: str, client: str, weight: float, cost: float, interactive: bool) -> Dict[str, Any]:
+        """
+        Register a task that will call acquire().
+
+        Args:
+            task_id (str): The task
+            client (str): Client key from client_identity()
+            weight (float): Weight of the client
+            cost (float): Estimated cost of the task
+            interactive (bool): Whether the task is served shortest job first
+
+        Returns:
+            Dict[str, Any]: Scheduling information of the task
+        """
+        with self._condition:
+            start, finish = fair_tags(self._virtual_time, self._client_finish.get(client, 0.0), cost, weight)
+            self._client_finish[client] = finish
+            entry = {'client': client, 'cost': cost, 'interactive': interactive,
+                     'start': start, 'finish': finish, 'enqueued_at': time.time()}
+            self._waiting[task_id] = entry
+            return entry
+
+    def _next(self) -> Optional[str]:
+        now = time.time()
+        return min(self._waiting, default=None, key=lambda task_id: schedule_key(
+            self._waiting[task_id]['interactive'], self._waiting[task_id]['cost'],
+            self._waiting[task_id]['finish'], self._waiting[task_id]['enqueued_at'], now))
+
+    def acquire(self, task_id: str, timeout: float = None) -> bool:
+        """
+        Wait until the task may run.
+
+        Args:
+            task_id (str): A submitted task
+            timeout (float, optional): Seconds to wait at most
+
+        Returns:
+            bool: False if the task was withdrawn or the timeout expired
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        with self._condition:
+            while True:
+                if task_id not in self._waiting:
+                    return False
+                express = (self._waiting[task_id]['interactive']
+                           and not any(entry.get('express') for entry in self._running.values()))
+                if (len(self._running) < self.slots or express) and self._next() == task_id:
+                    entry = self._waiting.pop(task_id)
+                    entry['express'] = len(self._running) >= self.slots
+                    entry['started_at'] = time.time()
+                    self._running[task_id] = entry
+                    self._virtual_time = max(self._virtual_time, entry['start'])
+                    self._condition.notify_all()
+                    return True
+                remaining = deadline - time.time() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                # Batch tasks age into the interactive class, so wake up to re-evaluate
+                self._condition.wait(min(remaining, 1.0) if remaining is not None else 1.0)
+
+    def pause(self, task_id: str):
+        """
+        Free the slot of a running task that has to wait for its input, e.g. files still being uploaded.
+
+        The task keeps its fair queuing tags; resume() puts it back in line.
+
+        Args:
+            task_id (str): The task
+        """
+        with self._condition:
+            entry = self._running.pop(task_id, None)
+            if entry is not None:
+                entry['busy'] = entry.get('busy', 0.0) + time.time() - entry['started_at']
+                self._paused[task_id] = entry
+            self._condition.notify_all()
+
+    def resume(self, task_id: str, timeout: float = None) -> bool:
+        """
+        Wait until a paused task may run again.
+
+        Args:
+            task_id (str): A paused task
+            timeout (float, optional): Seconds to wait at most
+
+        Returns:
+            bool: False if the task was withdrawn or the timeout expired
+        """
+        with self._condition:
+            entry = self._paused.pop(task_id, None)
+            if entry is not None:
+                self._waiting[task_id] = entry
+        return self.acquire(task_id, timeout)
+
+    def release(self, task_id: str):
+        """
+        Free the slot of a running task, or withdraw a waiting one.
+
+        Args:
+            task_id (str): The task
+        """
+        with self._condition:
+            self._waiting.pop(task_id, None)
+            self._paused.pop(task_id, None)
+            entry = self._running.pop(task_id, None)
+            if entry is not None and entry['cost'] > 0:
+                busy = entry.get('busy', 0.0) + time.time() - entry['started_at']
+                self._samples.append((busy, entry['cost']))
+                del self._samples[:-RATE_WINDOW]
+            self._condition.notify_all()
+
+    @property
+    def seconds_per_cost(self) -> float:
+        """Measured processing seconds per cost unit."""
+        seconds = sum(sample[0] for sample in self._samples)
+        cost = sum(sample[1] for sample in self._samples)
+        return seconds / cost if cost > 0 else DEFAULT_SECONDS_PER_COST
+
+    def estimate(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Estimate when a waiting task starts.
+
+        Args:
+            task_id (str): The task
+
+        Returns:
+            Dict[str, Any]: queue_position and expected_start (epoch seconds), or None if
+                the task is not waiting
+        """
+        with self._condition:
+            entry = self._waiting.get(task_id)
+            if entry is None:
+                return None
+            now = time.time()
+            key = schedule_key(entry['interactive'], entry['cost'], entry['finish'], entry['enqueued_at'], now)
+            ahead = [other for other in self._waiting.values() if schedule_key(
+                other['interactive'], other['cost'], other['finish'], other['enqueued_at'], now) < key]
+            running = self._running.values()
+            if entry['interactive']:
+                # Only interactive tasks ahead hold up the express slot
+                ahead = [other for other in ahead if other['interactive']]
+                running = [other for other in running if other['interactive']]
+            return expected_start(now, [e['cost'] for e in ahead],
+                                  [(e['cost'], e['started_at']) for e in running],
+                                  self.seconds_per_cost, self.slots)
+
+
+def expected_start(now: float, ahead_costs, running, seconds_per_cost: float, slots: int) -> Dict[str, Any]:
+    """
+    Estimate the start of a waiting task from the work ahead of it.
+
+    Args:
+        now (float): Current time
+        ahead_costs (Iterable[float]): Costs of the tasks that run before it
+        running (Iterable[Tuple[float, float]]): (cost, started_at) of the running tasks
+        seconds_per_cost (float): Processing seconds per cost unit
+        slots (int): Tasks processed at the same time
+
+    Returns:
+        Dict[str, Any]: queue_position and expected_start (epoch seconds)
+    """
+    ahead_costs = list(ahead_costs)
+    remaining = sum(max(0.0, cost * seconds_per_cost - (now - started_at)) for cost, started_at in running)
+    work = remaining + sum(ahead_costs) * seconds_per_cost
+    return {
+        "queue_position": len(ahead_costs) + 1,
+        "expected_start": now + work / max(1, slots)
+    }
@@ -1,18 +1,40 @@
-import re
+import os
 import json
+import queue
 import tkinter as tk
 from tkinter import filedialog, ttk, scrolledtext, messagebox
 from pathlib import Path
 import threading
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from tkinter import font as tkfont
 import pickle
 from tkinter import TclError
 
+from correction_engine import CorrectionEngine
+from dictionary_index import TermIndex, TERM_FIELD, SEARCH_FIELDS
+
 # 词典文件路径
 CORRECTION_DICT_FILE = "terms.json"
 PROTECTION_DICT_FILE = "保护terms.json"
 CONFIG_FILE = "config.pkl"
+EVENT_POLL_MS = 100  # 主线程轮询处理进度队列的间隔
+
+# 进程池中每个工作进程的修正引擎，由 _init_worker 创建
+_worker_engine = None
+
+def _init_worker(correction_dict_file, protection_dict_file):
+    # 编译词典已由主进程生成，工作进程只需映射，不会重新编译
+    global _worker_engine
+    _worker_engine = CorrectionEngine(correction_dict_file, protection_dict_file)
+
+def _correct_file(file_path, output_file):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    corrected_content, replacements = _worker_engine.correct_subtitles(content)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(corrected_content)
+    return dict(replacements)
 
 class SubtitleCorrectorGUI:
     def __init__(self, master):
@@ -92,6 +114,10 @@ class SubtitleCorrectorGUI:
         self.log_text.pack(fill=tk.BOTH, expand=True)
         
         self.total_replacements = Counter()
+        # 后台线程通过队列发送进度，主线程用 after() 轮询并更新界面
+        self.events = queue.Queue()
+        self.processing = False
+        self.engine = None
 
         # 加载词典和配置
         self.load_config()  # 先加载配置
@@ -216,119 +242,94 @@ class SubtitleCorrectorGUI:
         valid_files = [f for f in files if f.lower().endswith('.srt')]
         self.add_files(valid_files)
 
+    def output_file_for(self, file_path):
+        if self.use_source_folder:
+            return Path(file_path).with_name(Path(file_path).stem + '_corrected.srt')
+        return Path(self.default_output_folder) / (Path(file_path).stem + '_corrected.srt')
+
     def start_processing(self):
+        if self.processing:
+            return
         if not self.file_paths:
             self.status_label.config(text="请选择文件")
             self.log("错误: 未选择文件")
             return
         
+        self.processing = True
         self.show_stats_button.config(state=tk.DISABLED)
         self.total_replacements.clear()
+        self.progress['maximum'] = len(self.file_paths)
+        self.progress['value'] = 0
         self.log("开始处理...")
-        threading.Thread(target=self.process_files).start()
+        jobs = [(file_path, self.output_file_for(file_path)) for file_path in self.file_paths]
+        threading.Thread(target=self.process_files, args=(jobs,), daemon=True).start()
+        self.master.after(EVENT_POLL_MS, self.poll_events)
 
-    def process_files(self):
+    def process_files(self, jobs):
+        # 在后台线程中运行，只通过 self.events 与界面通信
         try:
-            total_files = len(self.file_paths)
-            self.log(f"开始处理 {total_files} 个字幕文件")
-            
-            self.progress['maximum'] = total_files
-            self.progress['value'] = 0
-            
-            for i, file_path in enumerate(self.file_paths):
-                self.log(f"处理文件 ({i+1}/{total_files}): {Path(file_path).name}")
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                corrected_content, replacements = self.correct_subtitles(content)
+            total_files = len(jobs)
+            self.events.put(('log', f"开始处理 {total_files} 个字幕文件"))
+
+            # 在主进程中编译一次词典，工作进程直接映射编译文件
+            self.engine = CorrectionEngine(self.correction_dict_file, self.protection_dict_file)
+            workers = min(total_files, os.cpu_count() or 1)
+            self.events.put(('log', f"使用 {workers} 个进程并行处理"))
+
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(self.correction_dict_file, self.protection_dict_file)) as pool:
+                futures = {pool.submit(_correct_file, file_path, str(output_file)): (file_path, output_file)
+                           for file_path, output_file in jobs}
+                for done, future in enumerate(as_completed(futures), 1):
+                    file_path, output_file = futures[future]
+                    try:
+                        self.events.put(('file', (file_path, output_file, future.result())))
+                    except Exception as e:
+                        self.events.put(('log', f"处理失败: {Path(file_path).name}: {str(e)}"))
+                    self.events.put(('progress', done))
+
+            self.events.put(('done', total_files))
+        except Exception as e:
+            self.events.put(('error', str(e)))
+
+    def poll_events(self):
+        # 在主线程中处理后台线程发来的所有事件
+        while True:
+            try:
+                kind, data = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'log':
+                self.log(data)
+            elif kind == 'progress':
+                self.progress['value'] = data
+            elif kind == 'file':
+                file_path, output_file, replacements = data
                 self.total_replacements.update(replacements)
-                
-                if self.use_source_folder:
-                    output_file = Path(file_path).with_name(Path(file_path).stem + '_corrected.srt')
-                else:
-                    output_file = Path(self.default_output_folder) / Path(file_path).with_name(Path(file_path).stem + '_corrected.srt').name
-                
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    f.write(corrected_content)
-                
-                self.log(f"文件处理完成: {output_file.name}")
+                self.log(f"文件处理完成: {Path(output_file).name}")
                 self.log("本文件替换详情:")
                 for (wrong, correct), count in replacements.items():
                     self.log(f"  '{wrong}' -> '{correct}': {count} 次")
                 self.log(f"本文件总替换次数: {sum(replacements.values())}")
                 self.log("------------------------")
-                
-                self.progress['value'] = i + 1
-                self.master.update_idletasks()
-            
-            self.log("所有文件处理完成!")
-            self.log(f"总替换次数: {sum(self.total_replacements.values())}")
-            self.status_label.config(text=f"处理完成！共处理 {total_files} 个文件。")
-            self.show_stats_button.config(state=tk.NORMAL)
-        except Exception as e:
-            self.log(f"发生错误: {str(e)}")
-            self.status_label.config(text=f"发生错误: {str(e)}")
+            elif kind == 'done':
+                self.processing = False
+                self.log("所有文件处理完成!")
+                self.log(f"总替换次数: {sum(self.total_replacements.values())}")
+                self.status_label.config(text=f"处理完成！共处理 {data} 个文件。")
+                self.show_stats_button.config(state=tk.NORMAL)
+            elif kind == 'error':
+                self.processing = False
+                self.log(f"发生错误: {data}")
+                self.status_label.config(text=f"发生错误: {data}")
+        if self.processing:
+            self.master.after(EVENT_POLL_MS, self.poll_events)
 
     def correct_subtitles(self, text):
-        lines = text.split('\n')
-        corrected_lines = []
-        replacements = Counter()
-        
-        def should_correct(wrong, protected_words):
-            wrong_lower = wrong.lower()
-            for protected in protected_words:
-                protected_lower = protected.lower()
-                if protected_lower in wrong_lower:
-                    if protected_lower != wrong_lower:
-                        return True
-                    return False
-                if wrong_lower in protected_lower:
-                    return False
-            return True
-        
-        sorted_correction_items = sorted(self.correction_dict.items(), key=lambda x: len(x[0]), reverse=True)
-        
-        for line in lines:
-            if '-->' in line:
-                corrected_lines.append(line)
-            else:
-                if re.match(r'^\s*\([^)]*\)\s*$', line):
-                    self.log(f"删除被括号括起来的行: {line}")
-                    continue
-                
-                original_line = line
-                replaced_positions = []  # 使用列表来存储已替换的位置范围
-                
-                for wrong, correct in sorted_correction_items:
-                    if should_correct(wrong, self.protection_dict):
-                        pattern = re.compile(re.escape(wrong), re.IGNORECASE)
-                        
-                        def replace_func(match):
-                            start, end = match.span()
-                            # 检查这个位置是否已经被替换过
-                            if any(start < pos[1] and end > pos[0] for pos in replaced_positions):
-                                return match.group(0)  # 如果已替换过，返回原始文本
-                            
-                            replaced = correct if correct else ''
-                            if match.group(0).isupper():
-                                replaced = replaced.upper()
-                            elif match.group(0).istitle():
-                                replaced = replaced.capitalize()
-                            
-                            # 记录这个位置已被替换
-                            replaced_positions.append((start, end))
-                            return replaced
-
-                        new_line, count = pattern.subn(replace_func, line)
-                        if count > 0:
-                            line = new_line
-                            replacements[(wrong, correct)] += count
-                
-                if line != original_line:
-                    self.log(f"行: '{original_line}' 已更正为: '{line}'")
-                corrected_lines.append(line)
-        
-        return '\n'.join(corrected_lines), replacements
+        # 与后端使用同一个预编译引擎（长词优先、保护词过滤、保持大小写）
+        if self.engine is None:
+            self.engine = CorrectionEngine(self.correction_dict_file, self.protection_dict_file)
+        return self.engine.correct_subtitles(text)
 
     def show_statistics(self):
         stats_window = tk.Toplevel(self.master)
@@ -430,6 +431,11 @@ class SettingsDialog:
         self.window.destroy()
 
 class DictionaryEditor:
+    # 虚拟化列表：Treeview 只显示可见的几十行，其余条目只保存在 self.keys 中；
+    # 搜索使用 dictionary_index 的倒排索引，索引在后台线程中建立并随编辑增量更新
+    SCROLL_UNITS = 3  # 鼠标滚轮每次滚动的行数
+    SEARCH_DELAY_MS = 150  # 输入停止多久后开始搜索
+
     def __init__(self, parent, title, dictionary, save_callback, protection=False):
         self.window = tk.Toplevel(parent)
         self.window.title(title)
@@ -438,10 +444,31 @@ class DictionaryEditor:
         self.dictionary = dictionary
         self.save_callback = save_callback
         self.protection = protection
+        self.fields = (TERM_FIELD,) if protection else SEARCH_FIELDS
+
+        self.keys = []  # 当前视图（全部条目或搜索结果）中的词条，按词典顺序
+        self.rendered = []  # 当前显示在 Treeview 中的词条
+        self.offset = 0
+        self.visible_rows = 15
+        self.selected_key = None
+        self.search_job = None
+
+        self.index = TermIndex()
+        self.index_built = threading.Event()
+        self.index_ready = False
         
         self.create_widgets()
         self.load_dictionary()
 
+        # 用副本建立索引，避免后台线程遍历时主线程修改词典
+        threading.Thread(target=self.build_index, args=(dict(dictionary),), daemon=True).start()
+        self.window.after(EVENT_POLL_MS, self.poll_index)
+
+    def build_index(self, snapshot):
+        # 在后台线程中运行
+        self.index.sync(snapshot)
+        self.index_built.set()
+
     def create_widgets(self):
         frame = ttk.Frame(self.window, padding="20")
         frame.pack(fill=tk.BOTH, expand=True)
@@ -454,13 +481,34 @@ class DictionaryEditor:
         ttk.Label(search_frame, text="搜索:").pack(side=tk.LEFT, padx=(0, 5))
         self.search_entry = ttk.Entry(search_frame)
         self.search_entry.pack(side=tk.LEFT, expand=True, fill=tk.X)
+        self.search_entry.bind("<KeyRelease>", self.schedule_search)
         ttk.Button(search_frame, text="搜索", command=self.search_entries).pack(side=tk.RIGHT, padx=(5, 0))
+
+        self.count_label = ttk.Label(frame, text="")
+        self.count_label.pack(anchor=tk.W, pady=(0, 5))
         
+        # 列表高度随窗口变化，只创建可见行
+        self.list_frame = ttk.Frame(frame)
+        self.list_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
         columns = ('保护词',) if self.protection else ('错误词', '正确词')
-        self.tree = ttk.Treeview(frame, columns=columns, show='headings')
+        self.tree = ttk.Treeview(self.list_frame, columns=columns, show='headings',
+                                 height=self.visible_rows, selectmode='browse')
         for col in columns:
             self.tree.heading(col, text=col)
-        self.tree.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+        self.scrollbar = ttk.Scrollbar(self.list_frame, orient=tk.VERTICAL, command=self.on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+        self.tree.bind("<Up>", lambda e: self.move_selection(-1))
+        self.tree.bind("<Down>", lambda e: self.move_selection(1))
+        self.tree.bind("<Prior>", lambda e: self.move_selection(-self.visible_rows))
+        self.tree.bind("<Next>", lambda e: self.move_selection(self.visible_rows))
+        for widget in (self.tree, self.scrollbar):
+            widget.bind("<MouseWheel>", self.on_wheel)
+            widget.bind("<Button-4>", self.on_wheel)
+            widget.bind("<Button-5>", self.on_wheel)
+        self.list_frame.bind("<Configure>", self.on_resize)
         
         button_frame = ttk.Frame(frame)
         button_frame.pack(fill=tk.X, pady=(0, 10))
@@ -470,23 +518,125 @@ class DictionaryEditor:
         ttk.Button(button_frame, text="删除", command=self.delete_entry).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="保存", command=self.save_dictionary).pack(side=tk.RIGHT, padx=5)
 
+    def poll_index(self):
+        if not self.index_built.is_set():
+            self.window.after(EVENT_POLL_MS, self.poll_index)
+            return
+        # 补上建立索引期间的编辑
+        self.index.sync(self.dictionary)
+        self.index_ready = True
+        if self.search_entry.get():
+            self.load_dictionary()
+
     def load_dictionary(self):
-        self.tree.delete(*self.tree.get_children())
-        for key, value in self.dictionary.items():
-            if self.protection:
-                self.tree.insert('', 'end', values=(key,))
-            else:
-                self.tree.insert('', 'end', values=(key, value))
+        # 重新计算当前视图：有搜索词时显示搜索结果，否则显示全部条目
+        query = self.search_entry.get().strip()
+        if query and self.index_ready:
+            matches, _ = self.index.search(query, self.fields)
+            self.keys = [term for term, _ in matches]
+        else:
+            self.keys = list(self.dictionary)
+        self.render()
 
     def search_entries(self):
-        search_term = self.search_entry.get().lower()
+        if self.search_job is not None:
+            self.window.after_cancel(self.search_job)
+            self.search_job = None
+        self.offset = 0
+        self.load_dictionary()
+
+    def schedule_search(self, event=None):
+        if self.search_job is not None:
+            self.window.after_cancel(self.search_job)
+        self.search_job = self.window.after(self.SEARCH_DELAY_MS, self.search_entries)
+
+    def render(self):
+        # 只为可见的行创建 Treeview 条目
+        total = len(self.keys)
+        self.offset = max(0, min(self.offset, total - self.visible_rows))
+        self.rendered = self.keys[self.offset:self.offset + self.visible_rows]
         self.tree.delete(*self.tree.get_children())
-        for key, value in self.dictionary.items():
-            if search_term in key.lower() or (not self.protection and search_term in value.lower()):
-                if self.protection:
-                    self.tree.insert('', 'end', values=(key,))
-                else:
-                    self.tree.insert('', 'end', values=(key, value))
+        for row, key in enumerate(self.rendered):
+            values = (key,) if self.protection else (key, self.dictionary.get(key, ''))
+            self.tree.insert('', 'end', iid=str(row), values=values)
+            if key == self.selected_key:
+                self.tree.selection_set(str(row))
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.visible_rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+        if self.search_entry.get().strip() and not self.index_ready:
+            self.count_label.config(text=f"正在建立索引… 共 {len(self.dictionary)} 条")
+        elif total != len(self.dictionary):
+            self.count_label.config(text=f"匹配 {total} 条 / 共 {len(self.dictionary)} 条")
+        else:
+            self.count_label.config(text=f"共 {total} 条")
+
+    def scroll_to(self, offset):
+        self.offset = offset
+        self.render()
+
+    def on_scroll(self, action, value, unit=None):
+        if action == 'moveto':
+            self.scroll_to(int(float(value) * len(self.keys)))
+        elif action == 'scroll':
+            step = self.visible_rows if unit == 'pages' else 1
+            self.scroll_to(self.offset + int(value) * step)
+
+    def on_wheel(self, event):
+        if event.num == 4 or getattr(event, 'delta', 0) > 0:
+            self.scroll_to(self.offset - self.SCROLL_UNITS)
+        else:
+            self.scroll_to(self.offset + self.SCROLL_UNITS)
+        return "break"
+
+    def on_resize(self, event):
+        rowheight = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        rows = max(1, (event.height - rowheight) // rowheight)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.tree.configure(height=rows)
+            self.render()
+
+    def on_select(self, event=None):
+        selected = self.tree.selection()
+        if selected and int(selected[0]) < len(self.rendered):
+            self.selected_key = self.rendered[int(selected[0])]
+
+    def move_selection(self, step):
+        if not self.keys:
+            return "break"
+        try:
+            position = self.keys.index(self.selected_key) + step
+        except ValueError:
+            position = self.offset
+        position = max(0, min(position, len(self.keys) - 1))
+        self.selected_key = self.keys[position]
+        self.show_position(position)
+        return "break"
+
+    def show_position(self, position):
+        # 滚动到指定位置，使其可见
+        if position < self.offset:
+            self.offset = position
+        elif position >= self.offset + self.visible_rows:
+            self.offset = position - self.visible_rows + 1
+        self.render()
+
+    def update_index(self, action, term, value=''):
+        # 索引建立前的编辑会在 poll_index 中一次性补上
+        if self.index_ready:
+            self.index.apply_edit(action, term, value, self.dictionary)
+
+    def show_key(self, key):
+        self.selected_key = key
+        self.load_dictionary()
+        if key in self.dictionary:
+            try:
+                self.show_position(self.keys.index(key))
+            except ValueError:
+                pass
 
     def add_entry(self):
         if self.protection:
@@ -495,44 +645,48 @@ class DictionaryEditor:
             AddEntryDialog(self.window, self.add_entry_callback)
 
     def add_entry_callback(self, wrong, correct):
+        action = 'update' if wrong in self.dictionary else 'add'
         self.dictionary[wrong] = correct
-        self.load_dictionary()
+        self.update_index(action, wrong, correct)
+        self.show_key(wrong)
 
     def add_protection_entry_callback(self, word):
+        action = 'update' if word in self.dictionary else 'add'
         self.dictionary[word] = ""
-        self.load_dictionary()
+        self.update_index(action, word)
+        self.show_key(word)
 
     def edit_entry(self):
-        selected = self.tree.selection()
-        if not selected:
+        if self.selected_key not in self.dictionary:
             messagebox.showwarning("警告", "请先选择一个条目")
             return
-        item = self.tree.item(selected[0])
         if self.protection:
-            old_word = item['values'][0]
-            EditProtectionEntryDialog(self.window, old_word, self.edit_protection_entry_callback)
+            EditProtectionEntryDialog(self.window, self.selected_key, self.edit_protection_entry_callback)
         else:
-            old_wrong, old_correct = item['values']
-            EditEntryDialog(self.window, old_wrong, old_correct, self.edit_entry_callback)
+            EditEntryDialog(self.window, self.selected_key, self.dictionary[self.selected_key],
+                            self.edit_entry_callback)
 
     def edit_entry_callback(self, old_wrong, new_wrong, new_correct):
         del self.dictionary[old_wrong]
+        self.update_index('delete', old_wrong)
         self.dictionary[new_wrong] = new_correct
-        self.load_dictionary()
+        self.update_index('add', new_wrong, new_correct)
+        self.show_key(new_wrong)
 
     def edit_protection_entry_callback(self, old_word, new_word):
         del self.dictionary[old_word]
+        self.update_index('delete', old_word)
         self.dictionary[new_word] = ""
-        self.load_dictionary()
+        self.update_index('add', new_word)
+        self.show_key(new_word)
 
     def delete_entry(self):
-        selected = self.tree.selection()
-        if not selected:
+        if self.selected_key not in self.dictionary:
             messagebox.showwarning("警告", "请先选择一个条目")
             return
-        item = self.tree.item(selected[0])
-        word = item['values'][0]
-        del self.dictionary[word]
+        del self.dictionary[self.selected_key]
+        self.update_index('delete', self.selected_key)
+        self.selected_key = None
         self.load_dictionary()
 
     def save_dictionary(self):
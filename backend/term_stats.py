@@ -0,0 +1,178 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Tuple, Any, Optional
+
+from compiled_dictionary import fold
+
+logger = logging.getLogger(__name__)
+
+# Width of a time bucket; hits are aggregated per bucket
+BUCKET_SECONDS = int(os.environ.get('TERM_STATS_BUCKET_SECONDS', '86400'))
+
+# Lines per file sampled for the bigram frequencies that drive the adaptive index
+SAMPLE_LINES = int(os.environ.get('TERM_STATS_SAMPLE_LINES', '200'))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS term_hits (
+    bucket INTEGER NOT NULL,
+    term TEXT NOT NULL,
+    hits INTEGER NOT NULL,
+    PRIMARY KEY (bucket, term)
+);
+CREATE TABLE IF NOT EXISTS bigram_lines (
+    bigram TEXT PRIMARY KEY,
+    lines INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class TermStats:
+    """
+    Persistent hit counts per correction term, aggregated in time buckets.
+
+    Every processed file adds its replacement counts to the bucket of the current
+    time. The store also counts, over a sample of processed lines, how many lines
+    contain each folded character bigram; the adaptive index uses these to key each
+    term by the bigram that is rarest in real subtitles.
+
+    The data lives in SQLite so that all workers write to the same aggregate.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open (and create if needed) the statistics database.
+
+        Args:
+            path (str): Path of the SQLite database
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+            connection.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('created_at', ?)",
+                               (str(time.time()),))
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    @property
+    def tracking_since(self) -> float:
+        """Time the statistics started being collected."""
+        with self._connect() as connection:
+            row = connection.execute("SELECT value FROM meta WHERE key = 'created_at'").fetchone()
+        return float(row[0]) if row else time.time()
+
+    def record(self, replacements: Dict[Tuple[str, str], int], text: str = None, timestamp: float = None):
+        """
+        Add the replacement counts of a file, and sample its lines for bigram frequencies.
+
+        Args:
+            replacements (Dict[Tuple[str, str], int]): Hits per (wrong, correct)
+            text (str, optional): The processed file content
+            timestamp (float, optional): Time of the hits; defaults to now
+        """
+        bucket = int((timestamp or time.time()) // BUCKET_SECONDS)
+        hits = Counter()
+        for key, count in replacements.items():
+            hits[key[0] if isinstance(key, tuple) else str(key)] += count
+
+        bigrams = Counter()
+        if text:
+            lines = [line for line in text.split('\n') if line.strip() and '-->' not in line]
+            step = max(1, len(lines) // SAMPLE_LINES)
+            for line in lines[::step]:
+                folded = fold(line)
+                bigrams.update({folded[i:i + 2] for i in range(len(folded) - 1)})
+
+        if not hits and not bigrams:
+            return
+        try:
+            with self._lock, self._connect() as connection:
+                connection.executemany(
+                    "INSERT INTO term_hits (bucket, term, hits) VALUES (?, ?, ?) "
+                    "ON CONFLICT (bucket, term) DO UPDATE SET hits = hits + excluded.hits",
+                    [(bucket, term, count) for term, count in hits.items()]
+                )
+                connection.executemany(
+                    "INSERT INTO bigram_lines (bigram, lines) VALUES (?, ?) "
+                    "ON CONFLICT (bigram) DO UPDATE SET lines = lines + excluded.lines",
+                    list(bigrams.items())
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Error recording term statistics: {str(e)}")
+
+    def _since_bucket(self, days: Optional[float]) -> int:
+        if days is None:
+            return 0
+        return int((time.time() - days * 86400) // BUCKET_SECONDS)
+
+    def hits(self, days: float = None) -> Dict[str, int]:
+        """
+        Total hits per term.
+
+        Args:
+            days (float, optional): Only count the last N days
+
+        Returns:
+            Dict[str, int]: Hits per term, most hit first
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT term, SUM(hits) AS total FROM term_hits WHERE bucket >= ? GROUP BY term ORDER BY total DESC",
+                (self._since_bucket(days),)
+            ).fetchall()
+        return dict(rows)
+
+    def series(self, term: str, days: float = None) -> List[Dict[str, Any]]:
+        """
+        Hits of a term per time bucket.
+
+        Args:
+            term (str): The term
+            days (float, optional): Only the last N days
+
+        Returns:
+            List[Dict[str, Any]]: Bucket start time and hits, oldest first
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT bucket, hits FROM term_hits WHERE term = ? AND bucket >= ? ORDER BY bucket",
+                (term, self._since_bucket(days))
+            ).fetchall()
+        return [{"start": bucket * BUCKET_SECONDS, "hits": hits} for bucket, hits in rows]
+
+    def zero_hits(self, terms: Iterable[str], days: float = None) -> List[str]:
+        """
+        Terms without any hit.
+
+        Args:
+            terms (Iterable[str]): Terms to check, e.g. the correction dictionary
+            days (float, optional): Only count hits of the last N days
+
+        Returns:
+            List[str]: Terms with zero hits, in the given order
+        """
+        hit = self.hits(days)
+        return [term for term in terms if not hit.get(term)]
+
+    def bigram_frequencies(self) -> Dict[str, int]:
+        """Number of sampled lines containing each folded bigram."""
+        with self._connect() as connection:
+            return dict(connection.execute("SELECT bigram, lines FROM bigram_lines").fetchall())
@@ -0,0 +1,144 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of events kept per task; older events are dropped
+DEFAULT_CAPACITY = int(os.environ.get('TRACE_CAPACITY', '20000'))
+
+# Fraction of sampled (per-term) events that are recorded
+DEFAULT_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', '1.0'))
+
+# Number of finished task traces kept in memory
+MAX_TRACES = 50
+
+
+class TaskTrace:
+    """
+    Ring buffer of trace events for a single task.
+
+    Events are stored as (timestamp, name, format, args) tuples and only formatted
+    when the trace is dumped, so recording an event never builds a string.
+    """
+
+    def __init__(self, task_id: str, capacity: int = DEFAULT_CAPACITY, sample_rate: float = DEFAULT_SAMPLE_RATE):
+        self.task_id = task_id
+        self.sample_rate = sample_rate
+        self.events = deque(maxlen=capacity)
+        self.recorded = 0
+        self.started_at = time.time()
+
+    def event(self, name: str, fmt: str = '', *args):
+        """Record an event unconditionally."""
+        self.recorded += 1
+        self.events.append((time.time(), name, fmt, args))
+
+    def sample(self, name: str, fmt: str = '', *args):
+        """Record a high-volume event subject to the sample rate."""
+        if self.sample_rate >= 1.0 or random.random() < self.sample_rate:
+            self.recorded += 1
+            self.events.append((time.time(), name, fmt, args))
+
+    def dump(self) -> Dict[str, Any]:
+        """
+        Format the buffered events.
+
+        Returns:
+            Dict[str, Any]: Trace metadata and the formatted events, oldest first
+        """
+        events = []
+        for timestamp, name, fmt, args in list(self.events):
+            try:
+                message = fmt % args if args else fmt
+            except (TypeError, ValueError):
+                message = f"{fmt} {args!r}"
+            events.append({
+                "t": round(timestamp - self.started_at, 6),
+                "event": name,
+                "message": message
+            })
+        return {
+            "task_id": self.task_id,
+            "sample_rate": self.sample_rate,
+            "recorded": self.recorded,
+            "dropped": self.recorded - len(events),
+            "events": events
+        }
+
+
+class Tracer:
+    """
+    Per-thread structured tracing.
+
+    Hot code fetches the active trace once with current() and guards every event
+    with "if trace is not None", so a disabled tracer costs one attribute lookup per
+    call and nothing per line or per term.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._traces: "OrderedDict[str, TaskTrace]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[TaskTrace]:
+        """Return the trace active on this thread, or None when tracing is off."""
+        return getattr(self._local, 'trace', None)
+
+    def start(self, task_id: str, capacity: int = DEFAULT_CAPACITY,
+              sample_rate: float = DEFAULT_SAMPLE_RATE) -> TaskTrace:
+        """
+        Start tracing a task on the current thread.
+
+        Args:
+            task_id (str): Task being traced
+            capacity (int): Ring buffer size
+            sample_rate (float): Fraction of sampled events to record
+
+        Returns:
+            TaskTrace: The new trace
+        """
+        trace = TaskTrace(task_id, capacity, sample_rate)
+        with self._lock:
+            self._traces[task_id] = trace
+            while len(self._traces) > MAX_TRACES:
+                self._traces.popitem(last=False)
+        self._local.trace = trace
+        return trace
+
+    def stop(self) -> Optional[TaskTrace]:
+        """Stop tracing on the current thread and return the finished trace."""
+        trace = self.current()
+        self._local.trace = None
+        return trace
+
+    def get(self, task_id: str) -> Optional[TaskTrace]:
+        with self._lock:
+            return self._traces.get(task_id)
+
+    def save(self, trace: TaskTrace, path: str) -> bool:
+        """
+        Write a formatted trace to a JSON file so other workers can serve it.
+
+        Args:
+            trace (TaskTrace): Trace to write
+            path (str): Output file path
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(trace.dump(), f, ensure_ascii=False)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving trace for task {trace.task_id}: {str(e)}")
+            return False
+
+
+tracer = Tracer()
@@ -0,0 +1,243 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Set
+
+logger = logging.getLogger(__name__)
+
+# Seconds without a chunk after which an upload is abandoned; matches the cleanup of upload files
+UPLOAD_SESSION_TIMEOUT = float(os.environ.get('UPLOAD_SESSION_TIMEOUT', '3600'))
+
+# Files and bytes per file accepted in one resumable upload
+UPLOAD_MAX_FILES = int(os.environ.get('UPLOAD_MAX_FILES', '500'))
+UPLOAD_MAX_FILE_SIZE = int(os.environ.get('UPLOAD_MAX_FILE_SIZE', str(64 * 1024 * 1024)))
+
+# Seconds between checks for newly completed files while a task waits for its upload
+UPLOAD_POLL_INTERVAL = 0.5
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+MANIFEST_SUFFIX = '_upload.json'
+
+
+class UploadOffsetError(ValueError):
+    """A chunk starting past the data received so far."""
+
+    def __init__(self, received: int):
+        super().__init__(f"Chunk must start at or before byte {received}")
+        self.received = received
+
+
+class UploadChecksumError(ValueError):
+    """A completed file whose SHA-256 does not match the one declared; it has to be sent again."""
+
+
+class UploadSession:
+    """
+    A resumable upload of a batch of files.
+
+    The files are declared when the upload is initiated and then sent in chunks, in
+    any order and over any number of requests. Chunks are written straight into the
+    upload folder: each file grows in a .part file that is renamed to its final path
+    once all its bytes have arrived (and match the declared SHA-256, if any), so a
+    task can start correcting it while the rest of the batch is still coming.
+
+    All state is in the upload folder (a JSON manifest plus the partial files), so any
+    web worker can take any chunk, and the bytes received so far are simply the size
+    of the partial file.
+    """
+
+    def __init__(self, folder: str, upload_id: str):
+        """
+        Open an upload session.
+
+        Args:
+            folder (str): Upload folder
+            upload_id (str): The upload (and task) id
+        """
+        self.folder = folder
+        self.upload_id = upload_id
+        self.manifest_path = os.path.join(folder, f"{upload_id}{MANIFEST_SUFFIX}")
+        self._manifest = None
+
+    @classmethod
+    def create(cls, folder: str, upload_id: str, files: List[Dict[str, Any]]) -> 'UploadSession':
+        """
+        Start an upload.
+
+        Args:
+            folder (str): Upload folder
+            upload_id (str): The upload (and task) id
+            files (List[Dict[str, Any]]): name, size, path (final file) and optional sha256 of each file
+
+        Returns:
+            UploadSession: The new session
+        """
+        session = cls(folder, upload_id)
+        session._write_manifest({'upload_id': upload_id, 'created_at': time.time(), 'files': files})
+        for entry in files:
+            if entry['size'] == 0:
+                open(entry['path'], 'wb').close()
+        return session
+
+    def _write_manifest(self, manifest: Dict[str, Any]):
+        temp_path = f"{self.manifest_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(temp_path, self.manifest_path)
+        self._manifest = manifest
+
+    def exists(self) -> bool:
+        return os.path.exists(self.manifest_path)
+
+    @property
+    def manifest(self) -> Dict[str, Any]:
+        if self._manifest is None:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self._manifest = json.load(f)
+        return self._manifest
+
+    def file(self, index: int) -> Dict[str, Any]:
+        """
+        Get a declared file.
+
+        Raises:
+            IndexError: If the upload has no such file
+        """
+        files = self.manifest['files']
+        if not 0 <= index < len(files):
+            raise IndexError(f"Upload {self.upload_id} has no file {index}")
+        return files[index]
+
+    def is_complete(self, index: int) -> bool:
+        return os.path.exists(self.file(index)['path'])
+
+    def received(self, index: int) -> int:
+        """Bytes of a file received so far."""
+        entry = self.file(index)
+        if os.path.exists(entry['path']):
+            return entry['size']
+        try:
+            return os.path.getsize(f"{entry['path']}.part")
+        except OSError:
+            return 0
+
+    def paths(self) -> List[str]:
+        """The manifest and the complete and partial files of the upload."""
+        paths = [self.manifest_path]
+        for entry in self.manifest['files']:
+            paths.extend((entry['path'], f"{entry['path']}.part"))
+        return paths
+
+    def idle_seconds(self) -> float:
+        """Seconds since the last chunk (or the start of the upload)."""
+        try:
+            return time.time() - os.path.getmtime(self.manifest_path)
+        except OSError:
+            return float('inf')
+
+    def write_chunk(self, index: int, start: int, stream, length: int) -> int:
+        """
+        Write a chunk of a file.
+
+        A chunk may overlap data already received, e.g. when a client resends a
+        chunk whose response it did not get, but must not leave a gap. If the stream
+        ends early the bytes that did arrive are kept.
+
+        Args:
+            index (int): The file
+            start (int): Offset of the chunk in the file
+            stream: Readable stream of the chunk
+            length (int): Length of the chunk
+
+        Returns:
+            int: Bytes of the file received after the chunk
+
+        Raises:
+            IndexError: If the upload has no such file
+            UploadOffsetError: If the chunk starts past the bytes received
+            UploadChecksumError: If the completed file does not match its SHA-256
+            ValueError: If the chunk extends past the declared size
+        """
+        entry = self.file(index)
+        if self.is_complete(index):
+            return entry['size']
+        received = self.received(index)
+        if start > received:
+            raise UploadOffsetError(received)
+        if start + length > entry['size']:
+            raise ValueError(f"Chunk ends past the declared size of {entry['name']} ({entry['size']} bytes)")
+
+        part_path = f"{entry['path']}.part"
+        fd = os.open(part_path, os.O_RDWR | os.O_CREAT, 0o644)
+        with os.fdopen(fd, 'r+b') as f:
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                block = stream.read(min(COPY_BUFFER_SIZE, remaining))
+                if not block:
+                    break
+                f.write(block)
+                remaining -= len(block)
+        os.utime(self.manifest_path)
+
+        received = os.path.getsize(part_path)
+        if received == entry['size']:
+            self._complete(entry, part_path)
+        return received
+
+    def _complete(self, entry: Dict[str, Any], part_path: str):
+        if entry.get('sha256'):
+            digest = hashlib.sha256()
+            with open(part_path, 'rb') as f:
+                for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b''):
+                    digest.update(block)
+            if digest.hexdigest() != entry['sha256'].lower():
+                os.remove(part_path)
+                raise UploadChecksumError(f"SHA-256 of {entry['name']} does not match; send it again")
+        try:
+            os.replace(part_path, entry['path'])
+        except FileNotFoundError:
+            # Completed by a concurrent request
+            pass
+        logger.info(f"Upload {self.upload_id}: received {entry['name']} ({entry['size']} bytes)")
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Bytes received of every file, for a client resuming the upload."""
+        return [{
+            'index': index,
+            'name': entry['name'],
+            'size': entry['size'],
+            'received': self.received(index),
+            'complete': self.is_complete(index)
+        } for index, entry in enumerate(self.manifest['files'])]
+
+
+def live_upload_files(folder: str) -> Set[str]:
+    """
+    Paths of the uploads in a folder that received a chunk within UPLOAD_SESSION_TIMEOUT.
+
+    Only the manifest is touched by every chunk; files completed early keep their own
+    modification time, so file age alone does not tell whether an upload is still live.
+
+    Args:
+        folder (str): Upload folder
+
+    Returns:
+        Set[str]: Absolute paths of the live uploads' files
+    """
+    paths = set()
+    for filename in os.listdir(folder):
+        if not filename.endswith(MANIFEST_SUFFIX):
+            continue
+        session = UploadSession(folder, filename[:-len(MANIFEST_SUFFIX)])
+        if session.idle_seconds() > UPLOAD_SESSION_TIMEOUT:
+            continue
+        try:
+            paths.update(os.path.abspath(path) for path in session.paths())
+        except (OSError, ValueError):
+            # Finished or replaced while being read
+            continue
+    return paths
@@ -0,0 +1,418 @@
+"""
+Watch-folder daemon that corrects SRT files as they arrive.
+
+    python watch_folder.py /data/ingest --output-dir /data/corrected
+    python watch_folder.py /data/ingest /data/ingest2 --state watch_state.json --settle 5
+
+New and changed *.srt files below the watched directories are corrected once they have
+stopped changing for --settle seconds, so files that are still being written are not
+picked up. Changes are noticed through inotify on Linux and by polling elsewhere (or
+with --polling). The state file records every corrected file with its size and mtime,
+so after a restart only files that are new or changed since are processed.
+
+The daemon follows dictionary edits made through the web app: it checks the shared
+version stamp before every file and reloads in the background when it changed.
+"""
+import argparse
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import select
+import signal
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from correction_engine import CorrectionEngine
+from engine_registry import registry as engine_registry
+from batch_correct import OUTPUT_SUFFIX, DEFAULT_CORRECTION_DICT, DEFAULT_PROTECTION_DICT, output_path_for
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_STATE_FILE = os.path.join(BACKEND_DIR, 'dictionaries', 'watch_state.json')
+DEFAULT_VERSION_FILE = os.path.join(BACKEND_DIR, 'dictionaries', 'dictionary.version')
+DEFAULT_SETTLE_SECONDS = 2.0   # A file must be unchanged this long before it is corrected
+DEFAULT_POLL_INTERVAL = 5.0    # Seconds between directory scans when polling
+
+# inotify event masks (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF
+_EVENT = struct.Struct('iIII')
+
+
+def is_input(path: str) -> bool:
+    """Check if a path is an SRT file to correct (and not an output of this tool)."""
+    stem, suffix = os.path.splitext(os.path.basename(path))
+    return suffix.lower() == '.srt' and not stem.endswith(OUTPUT_SUFFIX) and not stem.startswith('.')
+
+
+def scan(roots: List[str], exclude: Optional[str] = None) -> Dict[str, Tuple[int, float]]:
+    """
+    List the SRT files below the roots with their size and mtime.
+
+    Args:
+        roots (List[str]): Watched directories
+        exclude (str, optional): Directory to leave out, e.g. the output directory
+
+    Returns:
+        Dict[str, Tuple[int, float]]: (size, mtime) per absolute path
+    """
+    files = {}
+    for root in roots:
+        for directory, subdirectories, names in os.walk(root):
+            if exclude is not None:
+                subdirectories[:] = [name for name in subdirectories
+                                     if os.path.join(directory, name) != exclude]
+            for name in names:
+                path = os.path.join(directory, name)
+                if is_input(path):
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    files[path] = (stat.st_size, stat.st_mtime)
+    return files
+
+
+class PollingWatcher:
+    """Finds changed files by rescanning the watched directories at a fixed interval."""
+
+    name = 'polling'
+
+    def __init__(self, roots: List[str], exclude: Optional[str] = None, interval: float = DEFAULT_POLL_INTERVAL):
+        self.roots = roots
+        self.exclude = exclude
+        self.interval = interval
+        self._known = scan(roots, exclude)
+
+    def wait(self, timeout: float) -> Optional[Set[str]]:
+        """
+        Wait for changes.
+
+        Args:
+            timeout (float): Maximum seconds to wait
+
+        Returns:
+            Optional[Set[str]]: Paths that changed, or None if everything must be rescanned
+        """
+        time.sleep(min(timeout, self.interval))
+        current = scan(self.roots, self.exclude)
+        changed = {path for path, signature in current.items() if self._known.get(path) != signature}
+        self._known = current
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """
+    Finds changed files through Linux inotify, watching every directory below the roots.
+
+    Directories created later are watched as they appear. If the kernel's event queue
+    overflows, wait() asks for a full rescan.
+    """
+
+    name = 'inotify'
+
+    def __init__(self, roots: List[str], exclude: Optional[str] = None):
+        """
+        Start watching.
+
+        Raises:
+            OSError: If inotify is not available
+        """
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify is not available")
+        self._libc = libc
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.exclude = exclude
+        self._directories: Dict[int, str] = {}
+        for root in roots:
+            self._watch_tree(root)
+
+    def _watch_tree(self, root: str) -> Set[str]:
+        """Watch a directory and its subdirectories; returns the SRT files already in them."""
+        files = set()
+        for directory, subdirectories, names in os.walk(root):
+            if self.exclude is not None:
+                subdirectories[:] = [name for name in subdirectories
+                                     if os.path.join(directory, name) != self.exclude]
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+            if wd < 0:
+                logger.warning(f"Cannot watch {directory}: {os.strerror(ctypes.get_errno())}")
+                continue
+            self._directories[wd] = directory
+            files.update(os.path.join(directory, name) for name in names if is_input(name))
+        return files
+
+    def wait(self, timeout: float) -> Optional[Set[str]]:
+        """
+        Wait for changes.
+
+        Args:
+            timeout (float): Maximum seconds to wait
+
+        Returns:
+            Optional[Set[str]]: Paths that changed, or None if everything must be rescanned
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0')
+                offset += _EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                if mask & IN_IGNORED:
+                    self._directories.pop(wd, None)
+                    continue
+                directory = self._directories.get(wd)
+                if directory is None or not name:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name))
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and path != self.exclude:
+                        # Files may have been written before the watch was added
+                        changed.update(self._watch_tree(path))
+                elif is_input(path):
+                    changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+class WatchState:
+    """
+    Files the daemon has corrected, persisted as JSON.
+
+    A file counts as done while its size and mtime are those recorded when it was
+    corrected.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.files: Dict[str, Dict[str, Any]] = json.load(f).get('files', {})
+        except FileNotFoundError:
+            self.files = {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable watch state {path}: {str(e)}")
+            self.files = {}
+
+    def is_done(self, path: str, signature: Tuple[int, float]) -> bool:
+        entry = self.files.get(path)
+        return entry is not None and (entry['size'], entry['mtime']) == tuple(signature)
+
+    def record(self, path: str, signature: Tuple[int, float], result: Dict[str, Any]):
+        """Record a corrected (or failed) file and save the state."""
+        with self._lock:
+            self.files[path] = {
+                "size": signature[0],
+                "mtime": signature[1],
+                "output": result.get('corrected_file'),
+                "status": 'failed' if 'error' in result else 'completed',
+                "error": result.get('error'),
+                "total_replacements": result.get('total_replacements', 0),
+                "processed_at": time.time()
+            }
+            self.save()
+
+    def forget_missing(self, existing: Set[str]) -> int:
+        """Drop the entries of files that no longer exist."""
+        with self._lock:
+            missing = [path for path in self.files if path not in existing]
+            for path in missing:
+                del self.files[path]
+            if missing:
+                self.save()
+            return len(missing)
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"files": self.files}, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+
+class FolderDaemon:
+    """Corrects the files reported by a watcher once they have settled."""
+
+    def __init__(self, roots: List[str], source: CorrectionEngine, state: WatchState,
+                 output_dir: Optional[str] = None, settle: float = DEFAULT_SETTLE_SECONDS,
+                 polling: bool = False, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 engine_name: str = 'reference'):
+        """
+        Initialize the daemon.
+
+        Args:
+            roots (List[str]): Watched directories
+            source (CorrectionEngine): Engine owning the dictionaries, checked for updates before every file
+            state (WatchState): Persistent record of corrected files
+            output_dir (str, optional): Directory mirroring the watched trees; next to the inputs if omitted
+            settle (float): Seconds a file must stay unchanged before it is corrected
+            polling (bool): Poll even if inotify is available
+            poll_interval (float): Seconds between scans when polling
+            engine_name (str): Registered engine used to correct files
+        """
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.source = source
+        self.engine_name = engine_name
+        self.state = state
+        self.output_dir = os.path.abspath(output_dir) if output_dir else None
+        self.settle = settle
+        self._stop = threading.Event()
+        # path -> (size, mtime, time the signature was first seen)
+        self._pending: Dict[str, Tuple[int, float, float]] = {}
+
+        self.watcher = None
+        if not polling:
+            try:
+                self.watcher = InotifyWatcher(self.roots, self.output_dir)
+            except OSError as e:
+                logger.info(f"inotify unavailable ({str(e)}), polling instead")
+        if self.watcher is None:
+            self.watcher = PollingWatcher(self.roots, self.output_dir, poll_interval)
+        self.stats = {"watcher": self.watcher.name, "corrected": 0, "failed": 0, "started_at": time.time()}
+
+    def stop(self):
+        self._stop.set()
+
+    def _root_of(self, path: str) -> str:
+        return next((root for root in self.roots if path.startswith(root + os.sep)), None)
+
+    def _mark(self, paths: Set[str]):
+        now = time.time()
+        for path in paths:
+            if self.output_dir is not None and path.startswith(self.output_dir + os.sep):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                self._pending.pop(path, None)
+                continue
+            if self.state.is_done(path, (stat.st_size, stat.st_mtime)):
+                continue
+            previous = self._pending.get(path)
+            if previous is None or previous[:2] != (stat.st_size, stat.st_mtime):
+                self._pending[path] = (stat.st_size, stat.st_mtime, now)
+
+    def _rescan(self):
+        files = scan(self.roots, self.output_dir)
+        forgotten = self.state.forget_missing(set(files))
+        if forgotten:
+            logger.info(f"Forgot {forgotten} files that no longer exist")
+        self._mark({path for path, signature in files.items() if not self.state.is_done(path, signature)})
+
+    def _process_settled(self):
+        now = time.time()
+        for path, (size, mtime, since) in list(self._pending.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del self._pending[path]
+                continue
+            signature = (stat.st_size, stat.st_mtime)
+            if signature != (size, mtime):
+                # Still being written
+                self._pending[path] = signature + (now,)
+                continue
+            if now - since < self.settle:
+                continue
+
+            del self._pending[path]
+            self.source.check_for_updates()
+            root = self._root_of(path)
+            output_path = output_path_for(Path(path), Path(root) if root else None,
+                                          Path(self.output_dir) if self.output_dir else None)
+            os.makedirs(output_path.parent, exist_ok=True)
+            engine = engine_registry.get(self.engine_name, self.source)
+            result = engine.process_file(path, str(output_path))
+            self.state.record(path, signature, result)
+            if 'error' in result:
+                self.stats['failed'] += 1
+                logger.error(f"Failed to correct {path}: {result['error']}")
+            else:
+                self.stats['corrected'] += 1
+                logger.info(f"Corrected {path} -> {output_path} ({result.get('total_replacements', 0)} replacements)")
+
+    def run(self):
+        """Correct pending files, then keep watching until stop() is called."""
+        logger.info(f"Watching {', '.join(self.roots)} with {self.watcher.name}")
+        self._rescan()
+        try:
+            while not self._stop.is_set():
+                self._process_settled()
+                timeout = self.settle / 2 if self._pending else 1.0
+                changed = self.watcher.wait(timeout)
+                if changed is None:
+                    logger.warning("Watcher lost events, rescanning")
+                    self._rescan()
+                else:
+                    self._mark(changed)
+        finally:
+            self.watcher.close()
+            logger.info(f"Stopped watching: {self.stats['corrected']} corrected, {self.stats['failed']} failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Correct SRT files dropped into watched directories")
+    parser.add_argument('directories', nargs='+', help="Directories to watch")
+    parser.add_argument('--output-dir', help="Write outputs here, mirroring the watched directories")
+    parser.add_argument('--state', default=DEFAULT_STATE_FILE, help="State file recording corrected files")
+    parser.add_argument('--settle', type=float, default=DEFAULT_SETTLE_SECONDS,
+                        help="Seconds a file must be unchanged before it is corrected")
+    parser.add_argument('--polling', action='store_true', help="Poll even if inotify is available")
+    parser.add_argument('--interval', type=float, default=DEFAULT_POLL_INTERVAL, help="Polling interval in seconds")
+    parser.add_argument('--engine', default='reference', choices=engine_registry.names(), help="Correction engine")
+    parser.add_argument('--correction-dict', default=DEFAULT_CORRECTION_DICT, help="Correction dictionary")
+    parser.add_argument('--protection-dict', default=DEFAULT_PROTECTION_DICT, help="Protection dictionary")
+    parser.add_argument('--version-file', default=DEFAULT_VERSION_FILE,
+                        help="Dictionary version stamp shared with the web app")
+    args = parser.parse_args()
+
+    for directory in args.directories:
+        if not os.path.isdir(directory):
+            parser.error(f"Not a directory: {directory}")
+
+    source = CorrectionEngine(args.correction_dict, args.protection_dict, version_file=args.version_file)
+    source.warm_up()
+    daemon = FolderDaemon(args.directories, source, WatchState(args.state), args.output_dir,
+                          args.settle, args.polling, args.interval, args.engine)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: daemon.stop())
+    daemon.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,18 @@
 import sys
 import os
+import gc
 
 # Add the current directory to the path so that imports work correctly
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+# Importing the app loads the dictionaries and warms up the correction engine. Run with
+# gunicorn --preload this happens once in the master and the forked workers share it.
 from app import app
 
+# Keep the garbage collector from touching (and so copying) the objects created above
+# in every worker
+if hasattr(gc, 'freeze'):
+    gc.freeze()
+
 if __name__ == "__main__":
     app.run()
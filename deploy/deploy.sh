@@ -113,7 +113,7 @@ After=network.target
 User=www-data
 Group=www-data
 WorkingDirectory=${APP_DIR}/backend
-ExecStart=${APP_DIR}/venv/bin/gunicorn --workers 4 --bind 127.0.0.1:5002 wsgi:app
+ExecStart=${APP_DIR}/venv/bin/gunicorn --workers 4 --preload --bind 127.0.0.1:5002 wsgi:app
 Restart=always
 Environment="PATH=${APP_DIR}/venv/bin"
 Environment="PYTHONPATH=${APP_DIR}"
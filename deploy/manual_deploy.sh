@@ -53,7 +53,7 @@ cat > ${APP_DIR}/start.sh << EOF
 #!/bin/bash
 source ${APP_DIR}/venv/bin/activate
 cd ${APP_DIR}/backend
-gunicorn --workers 4 --bind 127.0.0.1:5002 wsgi:app
+gunicorn --workers 4 --preload --bind 127.0.0.1:5002 wsgi:app
 EOF
 
 chmod +x ${APP_DIR}/start.sh
@@ -620,7 +620,7 @@ function App() {
                 <input
                   type="file"
                   multiple
-                  accept=".srt"
+                  accept=".srt,.zip,.tar.gz,.tgz,.srt.gz"
                   onChange={handleFileChange}
                   className="hidden"
                   id="file-upload"